@@ -0,0 +1,52 @@
+"""
+Compara o tempo de carregamento do snapshot em Excel (formato antigo) com o
+snapshot Parquet publicado pelo ETL, com e sem projeção de colunas.
+
+Uso: python benchmarks/benchmark_carregamento.py [n_linhas ...]
+"""
+import os
+import sys
+import time
+import tempfile
+import pandas as pd
+
+from dados_sinteticos import gerar_snapshot
+from etl import transform
+from analysis import data_loader
+
+
+def _cronometrar(funcao, repeticoes: int = 3) -> float:
+    """Retorna o menor tempo (em segundos) entre as repetições."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def executar(n_linhas: int):
+    print(f"\n--- {n_linhas} linhas ---")
+    df = gerar_snapshot(n_linhas)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_excel = os.path.join(pasta, "prod_gstc.xlsx")
+        caminho_parquet = os.path.join(pasta, "prod_gstc.parquet")
+
+        df.to_excel(caminho_excel, index=False)
+        transform.converter_colunas_categoricas(df.copy()).to_parquet(caminho_parquet, index=False)
+
+        t_excel = _cronometrar(lambda: pd.read_excel(caminho_excel, parse_dates=data_loader.COLUNAS_DE_DATA), repeticoes=1)
+        t_parquet = _cronometrar(lambda: pd.read_parquet(caminho_parquet))
+        t_projecao = _cronometrar(lambda: pd.read_parquet(caminho_parquet, columns=['Data_Extracao']))
+
+        print(f"  Excel (read_excel):            {t_excel * 1000:10.1f} ms  ({os.path.getsize(caminho_excel) / 1e6:.1f} MB)")
+        print(f"  Parquet (completo):            {t_parquet * 1000:10.1f} ms  ({os.path.getsize(caminho_parquet) / 1e6:.1f} MB)")
+        print(f"  Parquet (só 'Data_Extracao'):  {t_projecao * 1000:10.1f} ms")
+        print(f"  Ganho (completo):              {t_excel / t_parquet:10.1f}x")
+
+
+if __name__ == "__main__":
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000]
+    for n in tamanhos:
+        executar(n)
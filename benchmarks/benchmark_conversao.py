@@ -0,0 +1,53 @@
+"""
+Compara a conversão de datas/horas anterior (cada célula interpretada e
+Início/Fim montados por concatenação de texto) com 'etl.conversao', que
+interpreta cada texto distinto uma única vez e soma data + hora como
+timedelta.
+
+Uso: python benchmarks/benchmark_conversao.py [n_linhas ...]
+"""
+import sys
+import time
+import pandas as pd
+
+from dados_sinteticos import gerar_export_bruto
+from etl.contracts import ContratoDadosBrutos
+from etl.conversao import converter_tipos
+
+COLUNAS_DATA_HORA = ['Data', 'Início', 'Fim', 'Data Limite', 'Data Abertura']
+
+
+def converter_datas_por_celula(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementação anterior, mantida aqui apenas como referência de desempenho."""
+    df = df.copy()
+    formato_completo = '%d/%m/%Y %H:%M:%S'
+    formato_ano_curto = '%d/%m/%y'
+    for col in ['Data Limite', 'Data Abertura']:
+        df[col] = pd.to_datetime(df[col], format=formato_completo, errors='coerce')
+    df['Data'] = pd.to_datetime(df['Data'], format=formato_ano_curto, errors='coerce')
+    df['Início'] = pd.to_datetime(df['Data'].dt.strftime('%Y-%m-%d') + ' ' + df['Início'].astype(str).str.strip(), errors='coerce')
+    df['Fim'] = pd.to_datetime(df['Data'].dt.strftime('%Y-%m-%d') + ' ' + df['Fim'].astype(str).str.strip(), errors='coerce')
+    return df
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == "__main__":
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [1_000_000]
+    for n in tamanhos:
+        df = gerar_export_bruto(n)[COLUNAS_DATA_HORA]
+        t_celula, anterior = _cronometrar(lambda: converter_datas_por_celula(df))
+        t_distintos, novo = _cronometrar(lambda: converter_tipos(df, ContratoDadosBrutos))
+
+        # Mesmo resultado, exceto nas atividades que viraram a meia-noite
+        virou_o_dia = novo['Fim'] != anterior['Fim']
+        assert (novo['Fim'][virou_o_dia] - anterior['Fim'][virou_o_dia] == pd.Timedelta(days=1)).all()
+        for col in ['Data', 'Início', 'Data Limite', 'Data Abertura']:
+            pd.testing.assert_series_equal(novo[col], anterior[col], check_dtype=False)
+
+        print(f"{n:>9} linhas | por célula: {t_celula:7.2f} s | valores distintos: {t_distintos:7.3f} s | "
+              f"ganho: {t_celula / t_distintos:5.1f}x | Fim ajustado (+1 dia): {int(virou_o_dia.sum())}")
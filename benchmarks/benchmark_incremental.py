@@ -0,0 +1,62 @@
+"""
+Compara a transformação completa com a incremental (só linhas novas ou
+alteradas são revalidadas, convertidas e enriquecidas) após uma extração
+com ~1% de linhas alteradas, 0,5% removidas e 0,5% novas.
+
+Uso: python benchmarks/benchmark_incremental.py [n_linhas ...]
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+from dados_sinteticos import gerar_export_bruto
+from etl import historico, publicacao, transform
+
+
+def _simular_nova_extracao(bruto: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = len(bruto)
+    bruto = bruto.copy()
+    alteradas = rng.choice(n, n // 100, replace=False)
+    bruto.loc[alteradas, 'Status da Atividade'] = 'Concluído'
+    novas = gerar_export_bruto(n // 200, seed=seed + 1)
+    novas['Ordem de Serviço'] = 'N' + novas['Ordem de Serviço']
+    return pd.concat([bruto.iloc[: n - n // 200], novas], ignore_index=True)
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcao()
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as pasta:
+        publicacao.CAMINHO_DATA = pasta
+        publicacao.CAMINHO_SNAPSHOTS = os.path.join(pasta, "snapshots")
+        publicacao.CAMINHO_MANIFESTO = os.path.join(pasta, "prod_gstc.manifest.json")
+        historico.CAMINHO_HISTORICO = os.path.join(pasta, "historico")
+        caminho_csv = os.path.join(pasta, "prod_coi.csv")
+        fontes = [(caminho_csv, True)]
+
+        for n in tamanhos:
+            bruto = gerar_export_bruto(n)
+            bruto.to_csv(caminho_csv, index=False)
+            _cronometrar(lambda: transform.run_transformation(False, fontes, incremental=False))  # snapshot base
+
+            # A incremental parte do snapshot base; a completa reprocessa o mesmo arquivo do zero
+            _simular_nova_extracao(bruto).to_csv(caminho_csv, index=False)
+            t_incremental = _cronometrar(lambda: transform.run_transformation(False, fontes, incremental=True))
+            delta = publicacao.ler_manifesto()['delta']
+            t_completa = _cronometrar(lambda: transform.run_transformation(False, fontes, incremental=False))
+
+            print(f"{n:>9} linhas | completa: {t_completa:7.2f} s | incremental: {t_incremental:7.2f} s | "
+                  f"ganho: {t_completa / t_incremental:4.1f}x | {delta['inseridas']} inseridas, "
+                  f"{delta['atualizadas']} atualizadas, {delta['removidas']} removidas")
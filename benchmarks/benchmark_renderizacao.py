@@ -0,0 +1,108 @@
+"""
+Compara a montagem anterior das respostas em texto (iterrows + '+=' linha a
+linha, e o resumo por equipe refiltrando a contagem a cada tipo de OS) com
+'analysis.renderizacao', que monta cada campo para a coluna inteira e une as
+linhas com str.join, em blocos de n linhas.
+
+Uso: python benchmarks/benchmark_renderizacao.py [n_linhas ...]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+from dados_sinteticos import gerar_snapshot
+
+# Os handlers do bot importam 'logging_utils' pelo diretório do próprio bot
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "bot"))
+
+from analysis import produtividade, servicos
+from analysis.renderizacao import renderizar_bloco, renderizar_grupos
+from bot.bot_inconsistencias import _formatar_inconsistencias_texto
+
+
+def formatar_bloco_vencimentos(df_bloco: pd.DataFrame) -> str:
+    """Implementação anterior de 'gerar_resumo_vencimentos_texto', mantida como referência."""
+    texto = ""
+    for _, os in df_bloco.iterrows():
+        texto += f"  - `{os['Instalação']}` (Equipe: {os['Recurso']})\n"
+        texto += f"    - *Tipo:* {os['Tipo de Atividade']}\n"
+        texto += f"    - *Status:* {os['Status da Atividade']}\n"
+        texto += f"    - *Cidade:* {os['Cidade']}\n"
+    return texto
+
+
+def formatar_inconsistencias_iterrows(df_resultado: pd.DataFrame, titulo: str) -> str:
+    """Implementação anterior de '_formatar_inconsistencias_texto', mantida como referência."""
+    resposta = f"\n*{titulo} ({len(df_resultado)} encontrada(s)):*\n"
+    resposta += "-----------------------------------\n"
+    for _, linha in df_resultado.iterrows():
+        resposta += f"  - *OS:* `{linha['Ordem de Serviço']}`\n"
+        resposta += f"    - *Equipe:* {linha['Recurso']}\n"
+        resposta += f"    - *Cidade:* {linha['Cidade']}\n"
+        resposta += f"    - *Tipo de OS:* {linha['Tipo de Atividade']}\n"
+        if 'Observação' in linha:
+            resposta += f"    - *Observação:* _{linha['Observação']}_\n"
+        resposta += "\n"
+    return resposta
+
+
+def resumo_por_tipo_refiltrando(contagem_detalhada: pd.DataFrame) -> str:
+    """Parte aninhada anterior de 'gerar_resumo_por_equipe', mantida como referência."""
+    resposta = ""
+    for tipo_os in contagem_detalhada['Tipo de Atividade'].unique():
+        total_tipo_os = contagem_detalhada[contagem_detalhada['Tipo de Atividade'] == tipo_os]['Quantidade'].sum()
+        resposta += f"\n- *{tipo_os}* (Total: {total_tipo_os})\n"
+        status_deste_tipo = contagem_detalhada[contagem_detalhada['Tipo de Atividade'] == tipo_os]
+        for _, linha in status_deste_tipo.iterrows():
+            resposta += f"    • {linha['Status da Atividade']}: {linha['Quantidade']}\n"
+    return resposta
+
+
+def resumo_por_tipo_agrupado(contagem_detalhada: pd.DataFrame) -> str:
+    """Parte aninhada atual de 'gerar_resumo_por_equipe'."""
+    contagem_detalhada = contagem_detalhada.assign(
+        Total=contagem_detalhada.groupby('Tipo de Atividade', observed=True)['Quantidade'].transform('sum'))
+    return renderizar_grupos(contagem_detalhada, 'Tipo de Atividade',
+                             "\n- *{Tipo de Atividade}* (Total: {Total})\n",
+                             "    • {Status da Atividade}: {Quantidade}\n")
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == "__main__":
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [10_000]
+    for n in tamanhos:
+        bloco = gerar_snapshot(n)
+        colunas_inconsistencias = ['Ordem de Serviço', 'Recurso', 'Cidade', 'Tipo de Atividade', 'Observação']
+
+        # Sem caracteres especiais nos dados, o texto é idêntico ao anterior
+        t_antes, antes = _cronometrar(lambda: formatar_bloco_vencimentos(bloco))
+        t_depois, depois = _cronometrar(lambda: renderizar_bloco(bloco, servicos.MODELO_OS_VENCIMENTO))
+        assert antes == depois
+        print(f"{n:>9} linhas | vencimentos    | iterrows: {t_antes:7.3f} s | vetorizado: {t_depois:7.3f} s | "
+              f"ganho: {t_antes / t_depois:6.1f}x")
+
+        inconsistencias = bloco[colunas_inconsistencias]
+        t_antes, antes = _cronometrar(lambda: formatar_inconsistencias_iterrows(inconsistencias, "Teste"))
+        t_depois, depois = _cronometrar(lambda: _formatar_inconsistencias_texto(inconsistencias, "Teste"))
+        assert antes == depois
+        print(f"{n:>9} linhas | inconsistências | iterrows: {t_antes:7.3f} s | vetorizado: {t_depois:7.3f} s | "
+              f"ganho: {t_antes / t_depois:6.1f}x")
+
+        # Resumo por tipo de OS de uma equipe com todas as linhas do bloco (contagem Tipo × Status)
+        equipe = bloco.assign(Recurso='RS-BENCH-001')
+        contagem = equipe[equipe['is_produtivo']].groupby(['Tipo de Atividade', 'Status da Atividade'], observed=True).size().reset_index(name='Quantidade')
+        t_antes, antes = _cronometrar(lambda: resumo_por_tipo_refiltrando(contagem))
+        t_depois, depois = _cronometrar(lambda: resumo_por_tipo_agrupado(contagem))
+        assert antes == depois and produtividade.gerar_resumo_por_equipe(equipe, 'RS-BENCH-001').endswith(depois)
+        print(f"{n:>9} linhas | resumo equipe   | refiltrando: {t_antes:7.3f} s | vetorizado: {t_depois:7.3f} s | "
+              f"ganho: {t_antes / t_depois:6.1f}x ({len(contagem)} grupos Tipo × Status)")
+
+        # Nomes e observações com caracteres especiais passam a ser escapados
+        especial = inconsistencias.head(1).assign(Recurso='RS_X*1', Observação='cliente_ausente')
+        print(_formatar_inconsistencias_texto(especial, "Exemplo com caracteres especiais"))
@@ -0,0 +1,42 @@
+"""
+Compara a validação de contrato linha a linha (Pydantic + iterrows, versão
+anterior) com a validação colunar de 'etl.contracts.validar_dados'.
+
+Uso: python benchmarks/benchmark_validacao.py [n_linhas ...]
+"""
+import sys
+import time
+import pandas as pd
+from pydantic import BaseModel, ValidationError
+
+from dados_sinteticos import gerar_export_bruto
+from etl.contracts import ContratoDadosBrutos, validar_dados
+
+
+def validar_dados_por_linha(df: pd.DataFrame, modelo_contrato: BaseModel, nome_arquivo: str):
+    """Implementação anterior, mantida aqui apenas como referência de desempenho."""
+    df_para_validar = df.astype(object).where(pd.notnull(df), None)
+    erros = []
+    for index, row in df_para_validar.iterrows():
+        try:
+            modelo_contrato.model_validate(row.to_dict())
+        except ValidationError as e:
+            erros.append(f"  - Erro na linha {index + 2}: {e}")
+    if erros:
+        raise ValueError(f"Validação do contrato '{modelo_contrato.__name__}' falhou.")
+    return True
+
+
+def _cronometrar(funcao) -> float:
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for n in tamanhos:
+        df = gerar_export_bruto(n)
+        t_linha = _cronometrar(lambda: validar_dados_por_linha(df, ContratoDadosBrutos, "sintetico.csv"))
+        t_colunar = _cronometrar(lambda: validar_dados(df, ContratoDadosBrutos, "sintetico.csv"))
+        print(f"{n:>9} linhas | por linha: {t_linha:8.2f} s | colunar: {t_colunar:8.3f} s | ganho: {t_linha / t_colunar:6.1f}x")
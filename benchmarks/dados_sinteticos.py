@@ -0,0 +1,104 @@
+"""
+Gerador de dados sintéticos com o mesmo formato dos exports do SIGA,
+usado pelos scripts de benchmark desta pasta.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# --- Bloco de código para encontrar a pasta 'src' e permitir a execução autônoma ---
+try:
+    caminho_src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis import mappings
+
+STATUS = ['Concluído', 'Não Concluído', 'Pendente', 'Deslocamento', 'Iniciado', 'Cancelado']
+ATIVIDADES = sorted(mappings.ATIVIDADES_ANEXO_IV) + [
+    'CORTEBT - Corte Baixa Tensão', 'FISCALIZ - Fiscalização', 'Intervalo para almoço', 'Indisponibilidade'
+]
+CIDADES = sorted(mappings.MAPEAMENTO_SECCIONAL)
+CODIGOS_EQUIPE = sorted(mappings.MAPEAMENTO_EQUIPES)
+CODIGOS_PROCESSO = ['C0', 'F0', 'L0', 'E0', 'A0']
+
+
+def gerar_export_bruto(n_linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Gera um DataFrame só de textos, como o CSV exportado pelo SIGA."""
+    rng = np.random.default_rng(seed)
+    dias = pd.date_range('2025-01-01', periods=30, freq='D')
+
+    data = dias[rng.integers(0, len(dias), n_linhas)]
+    minutos_inicio = rng.integers(7 * 60, 23 * 60, n_linhas)  # plantões noturnos viram o dia
+    minutos_fim = minutos_inicio + rng.integers(10, 120, n_linhas)
+    data_limite = data + pd.to_timedelta(rng.integers(-3 * 24 * 60, 3 * 24 * 60, n_linhas), unit='min')
+
+    recursos = np.array([
+        f"RS-{eq}-{proc}{i:02d}M" for eq in CODIGOS_EQUIPE for proc in CODIGOS_PROCESSO for i in range(1, 5)
+    ])
+
+    def _hhmm(minutos):
+        minutos = minutos % (24 * 60)
+        return pd.Series(minutos // 60).astype(str).str.zfill(2) + ':' + pd.Series(minutos % 60).astype(str).str.zfill(2)
+
+    def _decimal(valores):
+        return pd.Series(np.round(valores, 6)).astype(str).str.replace('.', ',', regex=False)
+
+    df = pd.DataFrame({
+        "Recurso": recursos[rng.integers(0, len(recursos), n_linhas)],
+        "Data": pd.Series(data).dt.strftime('%d/%m/%y'),
+        "Status da Atividade": np.array(STATUS)[rng.integers(0, len(STATUS), n_linhas)],
+        "Cidade": np.array(CIDADES)[rng.integers(0, len(CIDADES), n_linhas)],
+        "Início": _hhmm(minutos_inicio),
+        "Fim": _hhmm(minutos_fim),
+        "Duração": _hhmm(minutos_fim - minutos_inicio),
+        "Tempo de Deslocamento": _hhmm(rng.integers(0, 60, n_linhas)),
+        "Tipo de Atividade": np.array(ATIVIDADES)[rng.integers(0, len(ATIVIDADES), n_linhas)],
+        "Ordem de Serviço": pd.Series(rng.permutation(n_linhas) + 10_000_000).astype(str),
+        "Abrangência": "URBANA",
+        "Tipo de Natureza - Text": "",
+        "Tipo de Causa - Text": "",
+        "SubTipo de Causa - Text": "",
+        "Tipo de Conclusão Executada": "",
+        "Tipo de Conclusão": "",
+        "Tipo de Conclusão Não Executada": "",
+        "Latitude": _decimal(rng.uniform(-32.5, -30.0, n_linhas)),
+        "Longitude": _decimal(rng.uniform(-54.5, -51.5, n_linhas)),
+        "Posição na Rota": pd.Series(rng.integers(1, 40, n_linhas)).astype(str),
+        "Status da Coordenada": "Válida",
+        "Área de Deslocamento": "",
+        "Data Limite": pd.Series(data_limite).dt.strftime('%d/%m/%Y %H:%M:%S'),
+        "Data Abertura": pd.Series(data - pd.Timedelta(days=5)).dt.strftime('%d/%m/%Y %H:%M:%S'),
+        "Valor Total Contrato": "",
+        "Valor": _decimal(rng.uniform(10, 500, n_linhas).round(2)),
+        "Code": "",
+        "Número Ocorrência": "",
+        "Número da Nota": "",
+        "Número de Clientes Interrompidos": pd.Series(rng.integers(0, 10, n_linhas)).astype(str),
+        "Medidor Retirado": "",
+        "Medidor Instalado": "",
+        "Observação": "Sem observações",
+        "Tipo de Indisponibilidade": "",
+        "Instalação": pd.Series(rng.integers(1_000_000, 9_999_999, n_linhas)).astype(str),
+    })
+    return df
+
+
+def gerar_snapshot(n_linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Gera um DataFrame já transformado, com o formato do snapshot publicado pelo ETL."""
+    from etl import transform
+    from etl.contracts import ContratoDadosBrutos
+    from etl.conversao import converter_tipos
+
+    df = converter_tipos(gerar_export_bruto(n_linhas, seed), ContratoDadosBrutos)
+    df['Data_Extracao'] = pd.Timestamp('2025-01-30 10:00:00')
+
+    df = transform.definir_processo(df)
+    df = transform.definir_seccional(df)
+    df = transform.definir_seccional_equipe(df)
+    df = transform.definir_anexo_iv(df)
+    df = transform.definir_colunas_derivadas(df)
+    return df
@@ -0,0 +1,103 @@
+import pandas as pd
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+import os
+import sys
+
+# --- Bloco de Inicialização para Execução Autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis.utils import adicionar_colunas_derivadas
+from analysis.consulta import FiltroConsulta, filtrar
+
+# Tabelas agregadas materializadas pelo ETL a cada snapshot (arquivos ao lado do
+# Parquet, listados no manifesto). Os resumos do bot respondem a partir delas,
+# percorrendo grupos em vez de linhas.
+CONTAGEM_STATUS = 'contagem_status'
+CONTAGEM_ALERTAS = 'contagem_alertas'
+
+DIMENSOES_STATUS = ['Seccional', 'Processo', 'Recurso', 'Tipo de Atividade', 'Status da Atividade']
+
+
+def construir_contagem_status(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Quantidade de atividades por Seccional × Processo × Recurso × Tipo de
+    Atividade × Status da Atividade, já com as colunas derivadas de cada grupo
+    ('categoria_status', chaves normalizadas, 'is_produtivo', ...).
+    """
+    contagem = df.groupby(DIMENSOES_STATUS, observed=True, dropna=False).size().rename('Quantidade').reset_index()
+    contagem = contagem[contagem['Quantidade'] > 0].reset_index(drop=True)
+    return adicionar_colunas_derivadas(contagem)
+
+
+def construir_contagem_alertas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    OS de Anexo IV pendentes contadas por Seccional × Data Limite. As faixas
+    (vencidas, hoje, amanhã) dependem da hora da consulta, por isso são
+    calculadas na leitura, sobre esta tabela.
+    """
+    pendentes = df[(df['Anexo IV'] == 'Sim') & df['is_pendente']]
+    contagem = pendentes.groupby(['seccional_norm', 'Data Limite'], observed=True).size().rename('Quantidade').reset_index()
+    return contagem[contagem['Quantidade'] > 0].reset_index(drop=True)
+
+
+# Nome -> construtor; o ETL grava uma tabela de cada e o data_loader as registra como derivados
+AGREGADOS = {
+    CONTAGEM_STATUS: construir_contagem_status,
+    CONTAGEM_ALERTAS: construir_contagem_alertas,
+}
+
+
+def obter_agregado(df: pd.DataFrame, nome: str) -> pd.DataFrame:
+    """
+    Tabela agregada 'nome' para 'df': a materializada pelo ETL quando 'df' é o
+    snapshot em cache, ou calculada na hora para recortes e outras bases.
+    """
+    from analysis import data_loader
+    return data_loader.obter_derivado(df, nome)
+
+
+def contagem_status_filtrada(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None,
+                             apenas_produtivas: bool = True) -> pd.DataFrame:
+    """Linhas da contagem de status para o filtro (sem as atividades não produtivas, por padrão)."""
+    filtro = filtro or FiltroConsulta()
+    if apenas_produtivas:
+        filtro = replace(filtro, apenas_produtivas=True)
+    return filtrar(obter_agregado(df, CONTAGEM_STATUS), filtro)
+
+
+def somar_por(contagem: pd.DataFrame, coluna: str) -> pd.Series:
+    """Soma de 'Quantidade' por 'coluna', em ordem decrescente (como um value_counts)."""
+    soma = contagem.groupby(coluna, observed=True)['Quantidade'].sum()
+    return soma[soma > 0].sort_values(ascending=False, kind='stable')
+
+
+def contar_alertas_por_faixa(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None,
+                             agora: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Quantidade de OS de Anexo IV pendentes vencidas, vencendo ainda hoje e
+    vencendo amanhã até as 08:00 (mesmos critérios de
+    'servicos.classificar_os_para_alerta'), a partir da contagem por Data Limite.
+    """
+    if agora is None:
+        agora = datetime.now(ZoneInfo("America/Sao_Paulo")).replace(tzinfo=None)
+    inicio_amanha = (agora + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    amanha_as_8 = inicio_amanha.replace(hour=8)
+
+    # A contagem guarda só Seccional (normalizada) e Data Limite; Anexo IV e pendência já são implícitos
+    contagem = filtrar(obter_agregado(df, CONTAGEM_ALERTAS), filtro)
+    data_limite = contagem['Data Limite']
+    quantidade = contagem['Quantidade']
+    # Faixas por comparação de instantes (sem '.dt.date', que converte cada linha em objeto)
+    return {
+        'vencidas': int(quantidade[data_limite < agora].sum()),
+        'vencendo_hoje': int(quantidade[(data_limite >= agora) & (data_limite < inicio_amanha)].sum()),
+        'vencendo_amanha': int(quantidade[(data_limite >= inicio_amanha) & (data_limite <= amanha_as_8)].sum()),
+    }
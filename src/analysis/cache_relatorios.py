@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import inspect
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# --- Bloco de Inicialização para Execução Autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis.consulta import CAMPOS_NORMALIZADOS, FiltroConsulta
+from analysis.utils import normalizar_chave
+
+# Cache das saídas (HTML/texto) dos relatórios, por (snapshot, tipo de
+# relatório, filtros normalizados): até a próxima extração, todos os usuários
+# que pedem o mesmo relatório recebem o mesmo texto, gerado uma vez. Só o
+# snapshot em cache é atendido (recortes e outras bases são gerados na hora).
+#
+# Em memória, as entradas menos usadas saem primeiro quando o total passa do
+# orçamento (CACHE_RELATORIOS_MB). Com CACHE_RELATORIOS_DISCO=sim, cada saída
+# também é gravada em Data/cache_relatorios e sobrevive a reinícios do bot.
+# Relatórios com partes que dependem da hora ("Gerado em", faixas de
+# vencimento) têm validade própria (ttl_segundos), além da troca de snapshot.
+
+ORCAMENTO_PADRAO_MB = 64
+# Validade dos relatórios com "Gerado em" e faixas de vencimento (vencidas / hoje / amanhã)
+TTL_RELATORIOS_COM_HORARIO = 5 * 60
+
+CAMINHO_RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_CACHE_DISCO = os.path.join(CAMINHO_RAIZ_PROJETO, "Data", "cache_relatorios")
+
+# Distingue "não está no cache" de um relatório cujo resultado é None (ex.: mapa sem coordenadas)
+_AUSENTE = object()
+
+
+def normalizar_argumento(valor: Any) -> Any:
+    """Forma canônica (e hashable) de um argumento de relatório para compor a chave."""
+    if isinstance(valor, FiltroConsulta):
+        # Filtro sem critérios equivale a nenhum filtro
+        return tuple(sorted(
+            (campo, normalizar_chave(criterio) if campo in CAMPOS_NORMALIZADOS else criterio)
+            for campo, criterio in valor.criterios().items()
+        )) or None
+    if isinstance(valor, str):
+        return valor.strip()
+    return valor
+
+
+class CacheRelatorios:
+    """LRU em memória com orçamento em bytes, validade por entrada e camada opcional em disco."""
+
+    def __init__(self, orcamento_bytes: int, caminho_disco: Optional[str] = None):
+        self.orcamento_bytes = orcamento_bytes
+        self.caminho_disco = caminho_disco
+        self._entradas: "OrderedDict[tuple, tuple]" = OrderedDict()  # chave -> (valor, tamanho, expira_em)
+        self._bytes = 0
+        self._snapshot_id: Optional[str] = None
+        self._trava = threading.Lock()
+        self._estatisticas = {'hits': 0, 'hits_disco': 0, 'misses': 0, 'expiradas': 0, 'removidas_lru': 0}
+        if caminho_disco:
+            os.makedirs(caminho_disco, exist_ok=True)
+
+    @staticmethod
+    def _tamanho(valor: Any) -> int:
+        return len(valor.encode('utf-8')) if isinstance(valor, str) else 0
+
+    def _arquivo(self, chave: tuple) -> str:
+        # O snapshot no início do nome permite apagar as versões antigas sem ler os arquivos
+        resumo = hashlib.sha256(repr(chave).encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.caminho_disco, f"{self._prefixo(chave[0])}{resumo}.json")
+
+    @staticmethod
+    def _prefixo(snapshot_id: str) -> str:
+        return hashlib.sha256(str(snapshot_id).encode('utf-8')).hexdigest()[:16] + "__"
+
+    def _trocar_snapshot(self, snapshot_id: str):
+        """Nova versão da base: descarta tudo o que foi gerado a partir das anteriores."""
+        if snapshot_id == self._snapshot_id:
+            return
+        self._snapshot_id = snapshot_id
+        self._entradas.clear()
+        self._bytes = 0
+        if self.caminho_disco:
+            for nome in os.listdir(self.caminho_disco):
+                if not nome.startswith(self._prefixo(snapshot_id)):
+                    try:
+                        os.remove(os.path.join(self.caminho_disco, nome))
+                    except OSError:
+                        pass
+
+    def obter(self, chave: tuple) -> Any:
+        """Valor em cache para 'chave' (o primeiro item é o snapshot), ou _AUSENTE."""
+        agora = time.time()
+        with self._trava:
+            self._trocar_snapshot(chave[0])
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                valor, tamanho, expira_em = entrada
+                if expira_em is None or expira_em > agora:
+                    self._entradas.move_to_end(chave)
+                    self._estatisticas['hits'] += 1
+                    return valor
+                del self._entradas[chave]
+                self._bytes -= tamanho
+                self._estatisticas['expiradas'] += 1
+
+        valor = self._ler_disco(chave, agora)
+        with self._trava:
+            if valor is _AUSENTE:
+                self._estatisticas['misses'] += 1
+            else:
+                self._estatisticas['hits_disco'] += 1
+        return valor
+
+    def guardar(self, chave: tuple, valor: Any, ttl_segundos: Optional[float] = None):
+        """Guarda 'valor' (em memória e, se ativo, em disco), removendo os menos usados acima do orçamento."""
+        expira_em = time.time() + ttl_segundos if ttl_segundos else None
+        tamanho = self._tamanho(valor)
+        with self._trava:
+            self._trocar_snapshot(chave[0])
+            self._guardar_em_memoria(chave, valor, tamanho, expira_em)
+        self._gravar_disco(chave, valor, expira_em)
+
+    def _guardar_em_memoria(self, chave: tuple, valor: Any, tamanho: int, expira_em: Optional[float]):
+        if tamanho > self.orcamento_bytes:
+            return
+        anterior = self._entradas.pop(chave, None)
+        if anterior is not None:
+            self._bytes -= anterior[1]
+        self._entradas[chave] = (valor, tamanho, expira_em)
+        self._bytes += tamanho
+        while self._bytes > self.orcamento_bytes:
+            _, (_, tamanho_removido, _) = self._entradas.popitem(last=False)
+            self._bytes -= tamanho_removido
+            self._estatisticas['removidas_lru'] += 1
+
+    def _ler_disco(self, chave: tuple, agora: float) -> Any:
+        if not self.caminho_disco:
+            return _AUSENTE
+        caminho = self._arquivo(chave)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            return _AUSENTE
+        if registro['chave'] != repr(chave) or (registro['expira_em'] is not None and registro['expira_em'] <= agora):
+            return _AUSENTE
+        with self._trava:
+            self._guardar_em_memoria(chave, registro['valor'], self._tamanho(registro['valor']), registro['expira_em'])
+        return registro['valor']
+
+    def _gravar_disco(self, chave: tuple, valor: Any, expira_em: Optional[float]):
+        if not self.caminho_disco:
+            return
+        caminho = self._arquivo(chave)
+        caminho_temp = f"{caminho}.tmp"
+        try:
+            with open(caminho_temp, 'w', encoding='utf-8') as f:
+                json.dump({'chave': repr(chave), 'expira_em': expira_em, 'valor': valor}, f, ensure_ascii=False)
+            os.replace(caminho_temp, caminho)
+        except OSError as e:
+            print(f"[AVISO] Não foi possível gravar o relatório em cache no disco: {e}")
+
+    def limpar(self):
+        """Esvazia a memória (o disco é limpo na próxima troca de snapshot)."""
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+            self._snapshot_id = None
+
+    def estatisticas(self) -> Dict[str, object]:
+        with self._trava:
+            return {**self._estatisticas, 'entradas': len(self._entradas), 'bytes': self._bytes,
+                    'orcamento_bytes': self.orcamento_bytes, 'disco': bool(self.caminho_disco)}
+
+
+_cache: Optional[CacheRelatorios] = None
+_trava_criacao = threading.Lock()
+
+
+def obter_cache() -> CacheRelatorios:
+    """
+    Cache do processo, criado no primeiro uso: as variáveis do .env só são
+    carregadas depois do import (ver bot/main.py).
+    """
+    global _cache
+    with _trava_criacao:
+        if _cache is None:
+            orcamento_mb = float(os.getenv("CACHE_RELATORIOS_MB") or ORCAMENTO_PADRAO_MB)
+            disco = (os.getenv("CACHE_RELATORIOS_DISCO") or "nao").strip().lower() in ("1", "true", "sim")
+            _cache = CacheRelatorios(int(orcamento_mb * 1024 * 1024), CAMINHO_CACHE_DISCO if disco else None)
+        return _cache
+
+
+def em_cache(tipo: str, ttl_segundos: Optional[float] = None) -> Callable:
+    """
+    Decorador para funções de relatório 'f(df, *args, **kwargs)': a saída para
+    o snapshot em cache fica guardada por (snapshot, 'tipo', argumentos
+    normalizados), por até 'ttl_segundos' (sem TTL, até a troca de snapshot).
+    """
+    def decorador(funcao: Callable) -> Callable:
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def envoltorio(df, *args, **kwargs):
+            from analysis import data_loader
+            # Só o snapshot vigente: handlers ainda na versão anterior geram o relatório na hora
+            snapshot_id = data_loader.identificar_snapshot(df)
+            if snapshot_id is None or snapshot_id != data_loader.estatisticas_cache()['snapshot_id']:
+                return funcao(df, *args, **kwargs)
+
+            # Mesma chave com argumentos posicionais, nomeados ou omitidos (valor padrão)
+            argumentos = assinatura.bind(df, *args, **kwargs)
+            argumentos.apply_defaults()
+            chave = (snapshot_id, tipo, tuple((nome, normalizar_argumento(valor))
+                                              for nome, valor in list(argumentos.arguments.items())[1:]))
+            cache = obter_cache()
+            valor = cache.obter(chave)
+            if valor is _AUSENTE:
+                valor = funcao(df, *args, **kwargs)
+                cache.guardar(chave, valor, ttl_segundos)
+            return valor
+        return envoltorio
+    return decorador
+
+
+def estatisticas() -> Dict[str, object]:
+    """Contadores do cache de relatórios."""
+    return obter_cache().estatisticas()
@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Optional
+import os
+import sys
+
+# --- Bloco de Inicialização para Execução Autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis.utils import normalizar_chave
+
+# Camada de consulta sobre o snapshot: um índice por coluna de filtro, montado
+# uma vez por versão (derivado do data_loader). Cada valor aponta para as
+# posições das suas linhas; os indicadores 'is_*' já são máscaras booleanas.
+# Um filtro combina os critérios por E bit a bit, sem comparar texto por linha.
+INDICE_FILTROS = 'indice_filtros'
+
+# Campo do filtro -> coluna indexada
+COLUNAS_POR_CAMPO = {
+    'seccional': 'seccional_norm',
+    'seccional_equipe': 'seccional_equipe_norm',
+    'processo': 'processo_norm',
+    'recurso': 'Recurso',
+    'categoria_status': 'categoria_status',
+    'anexo_iv': 'Anexo IV',
+}
+# Campos cuja coluna guarda a chave normalizada (o valor pedido é normalizado antes da busca)
+CAMPOS_NORMALIZADOS = {'seccional', 'seccional_equipe', 'processo'}
+# Campo do filtro -> coluna booleana
+INDICADORES_POR_CAMPO = {
+    'apenas_produtivas': 'is_produtivo',
+    'apenas_equipes_rs': 'is_equipe_rs',
+    'apenas_pendentes': 'is_pendente',
+}
+
+
+@dataclass(frozen=True)
+class FiltroConsulta:
+    """
+    Critérios de um relatório, combinados por E. Campos vazios (None/False)
+    não filtram. Seccional, seccional da equipe e processo são comparados sem
+    espaços nas bordas e sem caixa; os demais, pelo valor exato.
+    """
+    seccional: Optional[str] = None
+    seccional_equipe: Optional[str] = None
+    processo: Optional[str] = None
+    recurso: Optional[str] = None
+    categoria_status: Optional[str] = None
+    anexo_iv: Optional[str] = None
+    apenas_produtivas: bool = False
+    apenas_equipes_rs: bool = False
+    apenas_pendentes: bool = False
+
+    def criterios(self) -> Dict[str, Any]:
+        """Somente os campos preenchidos."""
+        return {campo.name: getattr(self, campo.name) for campo in fields(self) if getattr(self, campo.name)}
+
+
+def _posicoes_por_valor(serie: pd.Series) -> Dict[str, np.ndarray]:
+    """{valor: posições das linhas com esse valor}, agrupando os códigos da coluna uma única vez."""
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype('category')
+    codigos = serie.cat.codes.to_numpy()
+    ordem = np.argsort(codigos, kind='stable').astype(np.int32)
+    # Nulos (código -1) ficam no início da ordem e não entram em nenhum valor
+    contagens = np.bincount(codigos[codigos >= 0], minlength=len(serie.cat.categories))
+    ordem = ordem[len(codigos) - contagens.sum():]
+    blocos = np.split(ordem, np.cumsum(contagens)[:-1]) if len(contagens) else []
+    return {str(valor): bloco for valor, bloco in zip(serie.cat.categories, blocos)}
+
+
+def construir_indice_filtros(df: pd.DataFrame, campos: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Índice de filtros de 'df' (todos os campos presentes, ou só 'campos'):
+    posições por valor das colunas de COLUNAS_POR_CAMPO e as máscaras das
+    colunas de INDICADORES_POR_CAMPO.
+    """
+    campos = set(COLUNAS_POR_CAMPO) | set(INDICADORES_POR_CAMPO) if campos is None else set(campos)
+    indice = {'linhas': len(df), 'posicoes': {}, 'indicadores': {}}
+    for campo, coluna in COLUNAS_POR_CAMPO.items():
+        if campo in campos and coluna in df.columns:
+            indice['posicoes'][campo] = _posicoes_por_valor(df[coluna])
+    for campo, coluna in INDICADORES_POR_CAMPO.items():
+        if campo in campos and coluna in df.columns:
+            indice['indicadores'][campo] = df[coluna].to_numpy(dtype=bool)
+    return indice
+
+
+def _obter_indice(df: pd.DataFrame, filtro: FiltroConsulta) -> Dict[str, Any]:
+    """O índice do snapshot em cache; para recortes e outras bases, só os campos do filtro."""
+    from analysis import data_loader
+    if data_loader.identificar_snapshot(df) is not None:
+        return data_loader.obter_derivado(df, INDICE_FILTROS)
+    return construir_indice_filtros(df, filtro.criterios())
+
+
+def mascara(df: pd.DataFrame, filtro: Optional[FiltroConsulta]) -> np.ndarray:
+    """Máscara booleana das linhas de 'df' que atendem a todos os critérios de 'filtro'."""
+    criterios = filtro.criterios() if filtro else {}
+    resultado = np.ones(len(df), dtype=bool)
+    if not criterios:
+        return resultado
+
+    indice = _obter_indice(df, filtro)
+    for campo, valor in criterios.items():
+        if campo in INDICADORES_POR_CAMPO:
+            if campo not in indice['indicadores']:
+                raise KeyError(f"Coluna '{INDICADORES_POR_CAMPO[campo]}' ausente; não é possível filtrar por '{campo}'.")
+            resultado &= indice['indicadores'][campo]
+            continue
+        if campo not in indice['posicoes']:
+            raise KeyError(f"Coluna '{COLUNAS_POR_CAMPO[campo]}' ausente; não é possível filtrar por '{campo}'.")
+        chave = normalizar_chave(valor) if campo in CAMPOS_NORMALIZADOS else str(valor)
+        linhas_do_valor = np.zeros(len(df), dtype=bool)
+        linhas_do_valor[indice['posicoes'][campo].get(chave, [])] = True
+        resultado &= linhas_do_valor
+    return resultado
+
+
+def filtrar(df: pd.DataFrame, filtro: Optional[FiltroConsulta]) -> pd.DataFrame:
+    """Linhas de 'df' que atendem a 'filtro' (sem filtro, o próprio 'df')."""
+    if filtro is None or not filtro.criterios():
+        return df
+    return df[mascara(df, filtro)]
+
+
+# --- Índice de identificadores (Ordem de Serviço / Instalação) ---
+# Dicionário chave normalizada -> posições das linhas, também derivado do
+# snapshot: buscar uma OS não depende do tamanho da base.
+INDICE_IDENTIFICADORES = 'indice_identificadores'
+
+def normalizar_os(valores: pd.Series) -> pd.Series:
+    """Número da OS como texto, sem espaços nas bordas."""
+    return valores.astype(str).str.strip()
+
+
+def normalizar_instalacao(valores: pd.Series) -> pd.Series:
+    """Instalação como texto, sem espaços e sem o '.0' de números lidos como float."""
+    return valores.astype(str).str.strip().str.split('.').str[0]
+
+
+# Campo -> (coluna, normalização aplicada tanto à coluna quanto ao termo buscado)
+IDENTIFICADORES = {
+    'os': ('Ordem de Serviço', normalizar_os),
+    'instalacao': ('Instalação', normalizar_instalacao),
+}
+
+
+def _indice_hash(serie: pd.Series, normalizar) -> Dict[str, Any]:
+    """
+    {'chaves': {chave: código}, 'ordem', 'limites'}: as posições da chave de
+    código c são ordem[limites[c]:limites[c + 1]]. A normalização roda só nos
+    valores distintos; nulos não entram no índice.
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    chaves = normalizar(pd.Series(distintos, dtype=object))
+    # Valores brutos diferentes com a mesma chave normalizada ('123' e ' 123') viram um só código
+    codigos_chave, chaves_unicas = pd.factorize(chaves, use_na_sentinel=True)
+    codigos = np.append(codigos_chave, -1)[codigos]
+    ordem = np.argsort(codigos, kind='stable').astype(np.int32)
+    contagens = np.bincount(codigos[codigos >= 0], minlength=len(chaves_unicas))
+    return {
+        'chaves': dict(zip(chaves_unicas, range(len(chaves_unicas)))),
+        'ordem': ordem[len(codigos) - contagens.sum():],
+        'limites': np.concatenate(([0], np.cumsum(contagens))),
+    }
+
+
+def construir_indice_identificadores(df: pd.DataFrame) -> Dict[str, Any]:
+    """Índice de hash de cada identificador de IDENTIFICADORES presente em 'df' (não altera 'df')."""
+    return {
+        campo: _indice_hash(df[coluna], normalizar)
+        for campo, (coluna, normalizar) in IDENTIFICADORES.items() if coluna in df.columns
+    }
+
+
+def localizar(df: pd.DataFrame, identificador: str, campos: Iterable[str] = ('os',)) -> np.ndarray:
+    """
+    Posições (em ordem crescente) das linhas de 'df' cujo identificador, em
+    qualquer um dos 'campos' ('os', 'instalacao'), é igual a 'identificador'
+    normalizado. No snapshot em cache, a busca é um acesso ao dicionário.
+    """
+    from analysis import data_loader
+    if data_loader.identificar_snapshot(df) is not None:
+        indice = data_loader.obter_derivado(df, INDICE_IDENTIFICADORES)
+    else:
+        indice = construir_indice_identificadores(df[[IDENTIFICADORES[campo][0] for campo in campos]])
+
+    encontradas = []
+    for campo in campos:
+        coluna, normalizar = IDENTIFICADORES[campo]
+        if campo not in indice:
+            raise KeyError(f"Coluna '{coluna}' ausente; não é possível buscar por '{campo}'.")
+        chave = normalizar(pd.Series([identificador], dtype=object)).iloc[0]
+        codigo = indice[campo]['chaves'].get(chave)
+        if codigo is not None:
+            limites = indice[campo]['limites']
+            encontradas.append(indice[campo]['ordem'][limites[codigo]:limites[codigo + 1]])
+    if not encontradas:
+        return np.array([], dtype=np.int32)
+    return np.unique(np.concatenate(encontradas))
+
+
+# --- Índice de alertas (Anexo IV pendente ordenado por Data Limite) ---
+# As faixas de vencimento dependem da hora da consulta; com as datas já
+# ordenadas, cada faixa é um intervalo contíguo encontrado por busca binária.
+INDICE_ALERTAS = 'indice_alertas'
+FAIXAS_ALERTA = ['vencidas', 'vencendo_hoje', 'vencendo_amanha']
+
+
+def _datas_em_ns(serie: pd.Series) -> np.ndarray:
+    """Data Limite como int64 (ns); nulos viram NaT, que não entram no índice."""
+    return pd.to_datetime(serie).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def construir_indice_alertas(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Posições das OS de Anexo IV pendentes com Data Limite, em ordem crescente
+    de Data Limite ('todas') e separadas por seccional normalizada
+    ('por_seccional'), cada uma com o array de datas correspondente.
+    """
+    datas = _datas_em_ns(df['Data Limite'])
+    em_alerta = ((df['Anexo IV'] == 'Sim').to_numpy(dtype=bool) & df['is_pendente'].to_numpy(dtype=bool)
+                 & (datas != np.iinfo(np.int64).min))
+    posicoes = np.flatnonzero(em_alerta)
+    posicoes = posicoes[np.argsort(datas[posicoes], kind='stable')].astype(np.int32)
+
+    # Sub-índices: a ordenação estável por seccional preserva a ordem por data dentro de cada uma
+    por_seccional = {}
+    for seccional, bloco in _posicoes_por_valor(df['seccional_norm'].iloc[posicoes]).items():
+        posicoes_seccional = posicoes[bloco]
+        por_seccional[seccional] = {'posicoes': posicoes_seccional, 'datas': datas[posicoes_seccional]}
+    return {
+        'todas': {'posicoes': posicoes, 'datas': datas[posicoes]},
+        'por_seccional': por_seccional,
+    }
+
+
+def faixas_de_alerta(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None,
+                     agora: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+    """
+    Posições (ordenadas por Data Limite) das OS de Anexo IV pendentes de 'df'
+    em cada faixa de FAIXAS_ALERTA, para o instante 'agora' (sem fuso):
+    vencidas (antes de agora), vencendo hoje (de agora até a meia-noite) e
+    vencendo amanhã até as 08:00. Não copia nem altera 'df'.
+    """
+    from analysis import data_loader
+    if agora is None:
+        agora = pd.Timestamp.now(tz="America/Sao_Paulo").tz_localize(None)
+    agora = pd.Timestamp(agora)
+    inicio_amanha = (agora + pd.Timedelta(days=1)).normalize()
+    amanha_as_8 = inicio_amanha + pd.Timedelta(hours=8)
+
+    if data_loader.identificar_snapshot(df) is not None:
+        indice = data_loader.obter_derivado(df, INDICE_ALERTAS)
+    else:
+        indice = construir_indice_alertas(df)
+
+    # Seccional pelo sub-índice; os demais critérios (Anexo IV e pendência já são implícitos) por máscara
+    filtro = filtro or FiltroConsulta()
+    if filtro.seccional:
+        vazio = {'posicoes': np.array([], dtype=np.int32), 'datas': np.array([], dtype=np.int64)}
+        base = indice['por_seccional'].get(normalizar_chave(filtro.seccional), vazio)
+    else:
+        base = indice['todas']
+    posicoes, datas = base['posicoes'], base['datas']
+
+    restante = FiltroConsulta(**{**filtro.criterios(), 'seccional': None, 'anexo_iv': None, 'apenas_pendentes': False})
+    if restante.criterios():
+        selecionadas = mascara(df, restante)[posicoes]
+        posicoes, datas = posicoes[selecionadas], datas[selecionadas]
+
+    inicio_hoje, inicio_amanha = np.searchsorted(
+        datas, [agora.as_unit('ns').value, inicio_amanha.as_unit('ns').value], side='left')
+    fim_amanha = np.searchsorted(datas, amanha_as_8.as_unit('ns').value, side='right')
+    intervalos = [(0, inicio_hoje), (inicio_hoje, inicio_amanha), (inicio_amanha, fim_amanha)]
+    return {faixa: posicoes[inicio:fim] for faixa, (inicio, fim) in zip(FAIXAS_ALERTA, intervalos)}
@@ -1,41 +1,400 @@
+import numpy as np
 import pandas as pd
 import os
+import io
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 
-def carregar_dados() -> pd.DataFrame:
+from analysis import agregados, consulta, espacial
+from analysis.utils import adicionar_colunas_derivadas
+
+# --- CONFIGURAÇÃO DE CAMINHOS ---
+CAMINHO_RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_DATA = os.path.join(CAMINHO_RAIZ_PROJETO, "Data")
+
+# O manifesto (publicado pelo ETL) aponta para o snapshot Parquet vigente
+CAMINHO_MANIFESTO = os.path.join(CAMINHO_DATA, "prod_gstc.manifest.json")
+CAMINHO_EXCEL_LEGADO = os.path.join(CAMINHO_DATA, "prod_gstc.xlsx")
+
+# Colunas que devem ser lidas como datas quando a fonte for o Excel legado
+COLUNAS_DE_DATA = ['Data', 'Início', 'Fim', 'Data Limite', 'Data Abertura', 'Data_Extracao']
+COLUNAS_DE_COORDENADAS = ['Latitude', 'Longitude']
+
+
+class _Snapshot:
+    """
+    Versão carregada da base: identidade do arquivo de origem, o DataFrame
+    compartilhado e as estruturas derivadas (índices, agregados) calculadas
+    uma única vez para esta versão.
+    """
+
+    def __init__(self, identidade: tuple, snapshot_id: str, df: pd.DataFrame):
+        self.identidade = identidade
+        self.snapshot_id = snapshot_id
+        self.df = df
+        self.derivados: Dict[str, Any] = {}
+        self.trava_derivados = threading.Lock()
+
+
+# --- CACHE DE PROCESSO ---
+_snapshot_atual: Optional[_Snapshot] = None
+# Versão imediatamente anterior, mantida para os handlers que ainda a estão usando
+_snapshot_anterior: Optional[_Snapshot] = None
+_trava_cache = threading.Lock()
+_trava_recarga = threading.Lock()
+_estatisticas = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+# (identidade do manifesto, metadados) da última leitura feita por obter_metadados
+_metadados_cache: Optional[tuple] = None
+
+# Quando o observador em segundo plano está ativo, os handlers nunca recarregam
+# o arquivo: recebem a versão atual e a troca é feita pelo observador.
+_observador_ativo = False
+
+# Construtores de estruturas derivadas, executados pelo observador antes da troca
+_construtores_derivados: Dict[str, Callable[[pd.DataFrame], Any]] = {}
+
+
+def _identidade_arquivo(caminho: str) -> tuple:
+    """Identidade barata do arquivo: caminho, data de modificação e tamanho."""
+    info = os.stat(caminho)
+    return (caminho, info.st_mtime_ns, info.st_size)
+
+
+def _hash_arquivo(caminho: str) -> str:
+    """Hash do conteúdo, usado como id quando a fonte é o Excel legado (sem manifesto)."""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def ler_manifesto() -> Optional[dict]:
+    """Lê o manifesto do snapshot vigente. Retorna None se ainda não houver um."""
+    if not os.path.exists(CAMINHO_MANIFESTO):
+        return None
+    with open(CAMINHO_MANIFESTO, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def obter_metadados() -> Optional[dict]:
     """
-    Carrega o arquivo Excel final ('prod_gstc.xlsx') e garante que os tipos de
-    dados estejam corretos para a análise.
+    Metadados de frescor da base (última extração, linhas, id do snapshot)
+    lidos do manifesto, sem carregar o DataFrame. O manifesto só é relido
+    quando muda em disco. Sem manifesto (Excel legado), os valores são
+    calculados a partir da base carregada.
+    Retorna None se não houver nenhuma base disponível.
+    """
+    global _metadados_cache
+
+    if os.path.exists(CAMINHO_MANIFESTO):
+        identidade = _identidade_arquivo(CAMINHO_MANIFESTO)
+        if _metadados_cache is not None and _metadados_cache[0] == identidade:
+            return _metadados_cache[1]
+        manifesto = ler_manifesto()
+        metadados = {
+            'snapshot_id': manifesto['snapshot_id'],
+            'linhas': manifesto['linhas'],
+            'linhas_por_seccional': manifesto.get('linhas_por_seccional', {}),
+            'data_extracao': datetime.fromisoformat(manifesto['data_extracao']) if manifesto.get('data_extracao') else None,
+            'publicado_em': datetime.fromisoformat(manifesto['publicado_em']),
+        }
+        _metadados_cache = (identidade, metadados)
+        return metadados
+
+    df = carregar_dados(colunas=['Data_Extracao'])
+    if df.empty:
+        return None
+    ultima_extracao = df['Data_Extracao'].max()
+    return {
+        'snapshot_id': identificar_snapshot(df) or df.attrs.get('snapshot_id'),
+        'linhas': len(df),
+        'linhas_por_seccional': {},
+        'data_extracao': ultima_extracao.to_pydatetime() if pd.notna(ultima_extracao) else None,
+        'publicado_em': None,
+    }
+
+
+def _ler_excel_legado(colunas: Optional[List[str]] = None) -> pd.DataFrame:
+    """Lê o 'prod_gstc.xlsx' antigo, usado apenas enquanto não houver snapshot publicado."""
+    from etl.conversao import converter_decimal
+
+    datas = [c for c in COLUNAS_DE_DATA if colunas is None or c in colunas]
+    df = pd.read_excel(CAMINHO_EXCEL_LEGADO, usecols=colunas, parse_dates=datas)
+    # O Excel antigo guardava as coordenadas como texto; o snapshot já as traz como float
+    for col in COLUNAS_DE_COORDENADAS:
+        if col in df.columns:
+            df[col] = converter_decimal(df[col], {})
+    return df
+
+
+def _ler_arquivo(caminho: str, hash_esperado: Optional[str]) -> pd.DataFrame:
+    """Lê o arquivo de dados completo, conferindo o hash informado no manifesto."""
+    if not caminho.endswith('.parquet'):
+        print("[AVISO] Nenhum snapshot publicado. Lendo o Excel legado 'prod_gstc.xlsx'.")
+        return _ler_excel_legado()
+
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    if hash_esperado and hashlib.sha256(conteudo).hexdigest() != hash_esperado:
+        raise ValueError(f"Hash do snapshot '{os.path.basename(caminho)}' não confere com o manifesto.")
+    # Tipos (datas, categorias) já vêm gravados no próprio Parquet
+    return pd.read_parquet(io.BytesIO(conteudo), engine='pyarrow')
+
+
+def _proteger_contra_escrita(df: pd.DataFrame):
+    """
+    Marca os arrays do snapshot como somente leitura. Sem Copy-on-Write, as
+    cópias rasas entregues por carregar_dados compartilham esses arrays: uma
+    escrita em uma delas (ex.: df.loc[...] = valor) levanta ValueError em vez
+    de alterar a base dos demais handlers. Novas colunas e reatribuições
+    (df['col'] = ...) continuam valendo só para a cópia.
+    """
+    # O pandas não expõe os blocos publicamente; colunas de extensão (datas,
+    # categorias, inteiros anuláveis) guardam os dados em arrays internos.
+    for valores in df._mgr.arrays:
+        for array in (valores, getattr(valores, '_ndarray', None), getattr(valores, '_codes', None),
+                      getattr(valores, '_data', None), getattr(valores, '_mask', None)):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+
+
+def _carregar_nova_versao(fonte: dict, pre_derivar: bool) -> _Snapshot:
+    """Lê o arquivo e monta um novo snapshot (sem publicá-lo no cache)."""
+    caminho, identidade, snapshot_id = fonte['caminho'], fonte['identidade'], fonte['snapshot_id']
+    print(f"Carregando base de dados de '{os.path.basename(caminho)}'...")
+    df = _ler_arquivo(caminho, fonte.get('hash'))
+    # Excel legado e snapshots anteriores às colunas derivadas: calculadas aqui, uma vez
+    base_sem_derivadas = 'categoria_status' not in df.columns
+    if base_sem_derivadas:
+        df = adicionar_colunas_derivadas(df)
+    df.attrs['snapshot_id'] = snapshot_id
+    _proteger_contra_escrita(df)
+    snapshot = _Snapshot(identidade, snapshot_id, df)
+
+    # Tabelas agregadas materializadas pelo ETL entram prontas como derivados
+    # (as de uma base sem colunas derivadas são recalculadas sob demanda)
+    for nome, agregado in ({} if base_sem_derivadas else fonte.get('agregados', {})).items():
+        try:
+            snapshot.derivados[nome] = _ler_arquivo(os.path.join(CAMINHO_DATA, agregado['arquivo']), agregado.get('hash_sha256'))
+        except Exception as e:
+            print(f"[AVISO] Falha ao ler o agregado '{nome}' ({e}); ele será calculado sob demanda.")
+
+    if pre_derivar:
+        for nome, construtor in list(_construtores_derivados.items()):
+            if nome in snapshot.derivados:
+                continue
+            try:
+                snapshot.derivados[nome] = construtor(df)
+            except Exception as e:
+                # Falha em um derivado não impede a troca; ele será calculado sob demanda
+                print(f"[AVISO] Falha ao pré-calcular '{nome}': {e}")
+
+    print(f"Base de dados carregada com sucesso ({len(df)} linhas).")
+    return snapshot
+
+
+def _publicar(snapshot: _Snapshot):
+    """Troca atômica do snapshot atual. Quem já tem a versão anterior continua com ela."""
+    global _snapshot_atual, _snapshot_anterior
+    with _trava_cache:
+        if _snapshot_atual is None:
+            _estatisticas['misses'] += 1
+        else:
+            _estatisticas['reloads'] += 1
+        _snapshot_anterior = _snapshot_atual
+        _snapshot_atual = snapshot
+
+
+def _verificar_fonte() -> Optional[dict]:
+    """
+    Compara a fonte em disco com o snapshot atual. Com manifesto, a versão é
+    identificada pelo 'snapshot_id' publicado pelo ETL, sem reler o Parquet.
+    Retorna a descrição da nova versão (caminho, identidade, snapshot_id, hash)
+    ou None se nada mudou.
+    """
+    snapshot = _snapshot_atual
+
+    if os.path.exists(CAMINHO_MANIFESTO):
+        identidade = _identidade_arquivo(CAMINHO_MANIFESTO)
+        if snapshot is not None and snapshot.identidade == identidade:
+            return None
+        manifesto = ler_manifesto()
+        fonte = {
+            'caminho': os.path.join(CAMINHO_DATA, manifesto['arquivo']),
+            'identidade': identidade,
+            'snapshot_id': manifesto['snapshot_id'],
+            'hash': manifesto.get('hash_sha256'),
+            'agregados': manifesto.get('agregados') or {},
+        }
+    elif os.path.exists(CAMINHO_EXCEL_LEGADO):
+        identidade = _identidade_arquivo(CAMINHO_EXCEL_LEGADO)
+        if snapshot is not None and snapshot.identidade == identidade:
+            return None
+        fonte = {
+            'caminho': CAMINHO_EXCEL_LEGADO,
+            'identidade': identidade,
+            'snapshot_id': _hash_arquivo(CAMINHO_EXCEL_LEGADO),
+        }
+    else:
+        raise FileNotFoundError(f"Nenhum snapshot publicado em {CAMINHO_MANIFESTO}")
+
+    if snapshot is not None and snapshot.snapshot_id == fonte['snapshot_id']:
+        # Mesma versão (manifesto regravado/arquivo tocado): só atualiza a identidade
+        snapshot.identidade = fonte['identidade']
+        return None
+    return fonte
+
+
+def _obter_snapshot() -> _Snapshot:
+    """
+    Retorna o snapshot em cache, relendo o arquivo apenas quando o ETL
+    publicou uma nova versão. Se a nova versão não puder ser lida, continua
+    servindo a anterior em vez de devolver uma base vazia.
+    """
+    snapshot = _snapshot_atual
+    if _observador_ativo and snapshot is not None:
+        # A troca de versão é responsabilidade do observador em segundo plano
+        with _trava_cache:
+            _estatisticas['hits'] += 1
+        return snapshot
+
+    with _trava_recarga:
+        try:
+            fonte = _verificar_fonte()
+            if fonte is not None:
+                snapshot = _carregar_nova_versao(fonte, pre_derivar=False)
+                _publicar(snapshot)
+                return snapshot
+        except Exception as e:
+            if _snapshot_atual is None:
+                raise
+            print(f"[AVISO] Falha ao carregar a nova versão ({e}). Mantendo o snapshot atual.")
+
+        with _trava_cache:
+            _estatisticas['hits'] += 1
+        return _snapshot_atual
+
+
+def recarregar_se_necessario() -> bool:
+    """
+    Usada pelo observador em segundo plano (fora do loop de eventos do bot).
+    Se o ETL publicou um novo snapshot, carrega, pré-calcula as estruturas
+    derivadas registradas e só então troca a versão atual.
+    Retorna True se houve troca.
+    """
+    global _observador_ativo
+    _observador_ativo = True
+
+    if not _trava_recarga.acquire(blocking=False):
+        return False  # Outra recarga já está em andamento
+    try:
+        fonte = _verificar_fonte()
+        if fonte is None:
+            return False
+        _publicar(_carregar_nova_versao(fonte, pre_derivar=True))
+        return True
+    finally:
+        _trava_recarga.release()
+
+
+def carregar_dados(colunas: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Retorna a base de produção (snapshot apontado pelo manifesto) a partir de um cache
+    compartilhado pelo processo inteiro. O arquivo só é relido quando o ETL
+    publica um novo snapshot, sempre por inteiro: 'colunas' é só um atalho
+    para receber um recorte (uma cópia apenas dessas colunas) da base em cache.
+
+    Sem 'colunas', o DataFrame devolvido é uma cópia rasa do snapshot, sem
+    duplicar os dados. Novas colunas ficam locais; com Copy-on-Write (ativado
+    pelo bot em bot/main.py) qualquer escrita também fica local, e sem ele os
+    dados compartilhados são somente leitura (ver _proteger_contra_escrita).
 
     Esta função é projetada para NUNCA retornar None. Em caso de qualquer erro,
     retorna um DataFrame vazio.
     """
-    print("Carregando base de dados de 'prod_gstc.xlsx'...")
-    
     try:
-        # Encontra o caminho do arquivo de dados de forma robusta
-        caminho_script = os.path.abspath(__file__)
-        caminho_analysis = os.path.dirname(caminho_script)
-        caminho_src = os.path.dirname(caminho_analysis)
-        caminho_raiz_projeto = os.path.dirname(caminho_src)
-        caminho_dados = os.path.join(caminho_raiz_projeto, "Data", "prod_gstc.xlsx")
-
-        if not os.path.exists(caminho_dados):
-            raise FileNotFoundError(f"Arquivo de dados não encontrado em {caminho_dados}")
-
-        # Define as colunas que devem ser lidas como datas
-        colunas_de_data = [
-            'Data', 'Início', 'Fim', 'Data Limite', 'Data Abertura', 'Data_Extracao'
-        ]
-
-        # Lê o Excel, já convertendo as datas para otimizar
-        df = pd.read_excel(caminho_dados, parse_dates=colunas_de_data)
-        
-        print(f"Base de dados carregada com sucesso ({len(df)} linhas).")
-        return df
+        df = _obter_snapshot().df
+        if colunas is not None:
+            return df[[c for c in colunas if c in df.columns]]
+        return df.copy(deep=False)
 
     except Exception as e:
         # Se qualquer erro ocorrer (arquivo não encontrado, erro de leitura, etc.),
         # imprime o erro e retorna um DataFrame vazio.
         print(f"ERRO CRÍTICO ao carregar os dados: {e}")
         print("Retornando um DataFrame vazio.")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+
+def estatisticas_cache() -> Dict[str, object]:
+    """Contadores de acerto/falha/recarga do cache e o id do snapshot atual."""
+    with _trava_cache:
+        estatisticas = dict(_estatisticas)
+        estatisticas['snapshot_id'] = _snapshot_atual.snapshot_id if _snapshot_atual else None
+    return estatisticas
+
+
+def registrar_derivado(nome: str, construtor: Callable[[pd.DataFrame], Any]):
+    """
+    Registra uma estrutura derivada do snapshot (índice, tabela agregada...).
+    Ela é calculada uma única vez por versão: pelo observador, antes da troca,
+    ou na primeira consulta.
+    """
+    _construtores_derivados[nome] = construtor
+
+
+def _snapshot_do_dataframe(df: pd.DataFrame) -> Optional[_Snapshot]:
+    """
+    Retorna o snapshot (atual ou o imediatamente anterior) do qual 'df' é uma
+    cópia sem filtro de linhas, ou None.
+    """
+    snapshot_id = df.attrs.get('snapshot_id')
+    for snapshot in (_snapshot_atual, _snapshot_anterior):
+        if snapshot is None or snapshot.snapshot_id != snapshot_id:
+            continue
+        if len(df) == len(snapshot.df) and df.index.equals(snapshot.df.index):
+            return snapshot
+    return None
+
+
+def identificar_snapshot(df: pd.DataFrame) -> Optional[str]:
+    """Id do snapshot ao qual 'df' corresponde, ou None se for um recorte/outra base."""
+    snapshot = _snapshot_do_dataframe(df)
+    return snapshot.snapshot_id if snapshot else None
+
+
+def obter_derivado(df: pd.DataFrame, nome: str) -> Any:
+    """
+    Retorna a estrutura derivada 'nome' para 'df'. Se 'df' for um snapshot
+    em cache, o resultado é reaproveitado entre chamadas; caso contrário (recortes,
+    bases de teste) é calculado na hora, sem cache.
+    """
+    construtor = _construtores_derivados[nome]
+    snapshot = _snapshot_do_dataframe(df)
+    if snapshot is None:
+        return construtor(df)
+
+    with snapshot.trava_derivados:
+        if nome not in snapshot.derivados:
+            snapshot.derivados[nome] = construtor(snapshot.df)
+        return snapshot.derivados[nome]
+
+
+# Tabelas agregadas publicadas pelo ETL; sem o arquivo (ex.: Excel legado), são calculadas sob demanda
+for _nome, _construtor in agregados.AGREGADOS.items():
+    registrar_derivado(_nome, _construtor)
+
+# Índice das colunas de filtro (posições por valor), montado uma vez por snapshot
+registrar_derivado(consulta.INDICE_FILTROS, consulta.construir_indice_filtros)
+# Índice de hash de Ordem de Serviço / Instalação -> posições das linhas
+registrar_derivado(consulta.INDICE_IDENTIFICADORES, consulta.construir_indice_identificadores)
+# OS de Anexo IV pendentes ordenadas por Data Limite (faixas de alerta por busca binária)
+registrar_derivado(consulta.INDICE_ALERTAS, consulta.construir_indice_alertas)
+# Grades espaciais: serviços pendentes (mapa de proximidade) e última posição das equipes
+registrar_derivado(espacial.INDICE_PENDENTES, espacial.construir_indice_pendentes)
+registrar_derivado(espacial.INDICE_EQUIPES, espacial.construir_indice_equipes)
@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+import os
+import sys
+
+# --- Bloco de Inicialização para Execução Autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+# Distâncias e índice espacial em grade. Os pontos são agrupados em células de
+# TAMANHO_CELULA_GRAUS × TAMANHO_CELULA_GRAUS; uma busca dos k mais próximos
+# percorre as células em anéis a partir da célula da consulta e para assim que
+# nenhum ponto ainda não visto pode estar mais perto que o k-ésimo encontrado.
+RAIO_TERRA_KM = 6371
+KM_POR_GRAU_LATITUDE = RAIO_TERRA_KM * np.pi / 180
+TAMANHO_CELULA_GRAUS = 0.05  # ~5,5 km de latitude
+# Limite de elementos de cada bloco da matriz de distâncias em lote (~16 MB em float64)
+ELEMENTOS_POR_BLOCO = 2_000_000
+
+# Derivados do snapshot: serviços pendentes com coordenadas e última posição de cada equipe
+INDICE_PENDENTES = 'indice_espacial_pendentes'
+INDICE_EQUIPES = 'indice_espacial_equipes'
+
+# Atividades que marcam a equipe no local: iniciadas ou concluídas (com ou sem execução)
+STATUS_POSICAO_EQUIPE = ['iniciado', 'concluído', 'não concluído']
+# Equipes cuja atividade atual tem estes status estão ocupadas (fora das sugestões em lote)
+STATUS_EQUIPE_OCUPADA = ['iniciado', 'deslocamento']
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Distância em km (fórmula de haversine), vetorizada: aceita escalares ou
+    arrays e segue as regras de broadcasting do NumPy.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(valor, dtype=float)) for valor in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def mais_proximos_em_lote(lat_origens, lon_origens, lat_destinos, lon_destinos, k: int,
+                          elementos_por_bloco: int = ELEMENTOS_POR_BLOCO) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Para cada origem, os índices e as distâncias (km) dos 'k' destinos mais
+    próximos, em ordem de distância: matrizes (origens × k). A matriz
+    origens × destinos é calculada por broadcasting, em blocos de linhas de
+    até 'elementos_por_bloco' células. Destinos sem coordenadas são ignorados;
+    se houver menos de 'k', as colunas restantes ficam com índice -1 e
+    distância NaN.
+    """
+    lat_origens, lon_origens = np.asarray(lat_origens, dtype=float), np.asarray(lon_origens, dtype=float)
+    lat_destinos, lon_destinos = np.asarray(lat_destinos, dtype=float), np.asarray(lon_destinos, dtype=float)
+    validos = np.flatnonzero(~(np.isnan(lat_destinos) | np.isnan(lon_destinos)))
+    lat_destinos, lon_destinos = lat_destinos[validos], lon_destinos[validos]
+
+    indices = np.full((len(lat_origens), k), -1, dtype=np.int64)
+    distancias = np.full((len(lat_origens), k), np.nan)
+    k_efetivo = min(k, len(validos))
+    if k_efetivo == 0:
+        return indices, distancias
+
+    linhas_por_bloco = max(1, elementos_por_bloco // len(validos))
+    for inicio in range(0, len(lat_origens), linhas_por_bloco):
+        fim = min(inicio + linhas_por_bloco, len(lat_origens))
+        bloco = haversine_km(lat_origens[inicio:fim, None], lon_origens[inicio:fim, None],
+                             lat_destinos[None, :], lon_destinos[None, :])
+        # argpartition separa os k menores de cada linha em O(destinos); só eles são ordenados
+        if k_efetivo < bloco.shape[1]:
+            menores = np.argpartition(bloco, k_efetivo - 1, axis=1)[:, :k_efetivo]
+        else:
+            menores = np.broadcast_to(np.arange(bloco.shape[1]), bloco.shape)
+        distancias_menores = np.take_along_axis(bloco, menores, axis=1)
+        ordem = np.argsort(distancias_menores, axis=1, kind='stable')
+        indices[inicio:fim, :k_efetivo] = validos[np.take_along_axis(menores, ordem, axis=1)]
+        distancias[inicio:fim, :k_efetivo] = np.take_along_axis(distancias_menores, ordem, axis=1)
+
+    sem_coordenadas = np.isnan(lat_origens) | np.isnan(lon_origens)
+    indices[sem_coordenadas], distancias[sem_coordenadas] = -1, np.nan
+    return indices, distancias
+
+
+def construir_grade(latitudes, longitudes, posicoes=None,
+                    tamanho_celula: float = TAMANHO_CELULA_GRAUS) -> Dict[str, Any]:
+    """
+    Índice em grade dos pontos com coordenadas válidas. 'posicoes' identifica
+    cada ponto (ex.: posição da linha no snapshot); o padrão é 0..n-1.
+    Os pontos ficam ordenados por célula, e cada célula ocupada guarda o
+    intervalo [início, fim) dos seus pontos.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    posicoes = np.arange(len(latitudes)) if posicoes is None else np.asarray(posicoes)
+    validas = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    latitudes, longitudes, posicoes = latitudes[validas], longitudes[validas], posicoes[validas]
+
+    linhas = np.floor(latitudes / tamanho_celula).astype(np.int64)
+    colunas = np.floor(longitudes / tamanho_celula).astype(np.int64)
+    ordem = np.lexsort((colunas, linhas))
+    linhas, colunas = linhas[ordem], colunas[ordem]
+
+    inicio_celula = np.ones(len(linhas), dtype=bool)
+    inicio_celula[1:] = (linhas[1:] != linhas[:-1]) | (colunas[1:] != colunas[:-1])
+    inicios = np.flatnonzero(inicio_celula)
+    return {
+        'tamanho_celula': tamanho_celula,
+        'latitudes': latitudes[ordem],
+        'longitudes': longitudes[ordem],
+        'posicoes': posicoes[ordem],
+        'celula_linhas': linhas[inicios],
+        'celula_colunas': colunas[inicios],
+        'inicios': inicios,
+        'fins': np.append(inicios[1:], len(linhas)),
+        # Latitude mais distante do equador: onde a célula é mais estreita (limite conservador)
+        'latitude_critica': float(np.abs(latitudes).max()) if len(latitudes) else 0.0,
+    }
+
+
+def _distancia_minima_aneis(grade: Dict[str, Any], latitude: float, aneis: int) -> float:
+    """Menor distância possível até um ponto a pelo menos 'aneis' células completas de distância."""
+    if aneis <= 0:
+        return 0.0
+    tamanho = grade['tamanho_celula']
+    latitude_critica = min(max(grade['latitude_critica'], abs(latitude)) + tamanho, 90.0)
+    deslocamento = aneis * tamanho
+    ao_longo_do_meridiano = deslocamento * KM_POR_GRAU_LATITUDE
+    ao_longo_do_paralelo = float(haversine_km(latitude_critica, 0.0, latitude_critica, deslocamento))
+    return min(ao_longo_do_meridiano, ao_longo_do_paralelo)
+
+
+def vizinhos_mais_proximos(grade: Dict[str, Any], latitude: float, longitude: float, k: int,
+                           raio_km: Optional[float] = None,
+                           excluir: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Os até 'k' pontos da grade mais próximos de (latitude, longitude),
+    opcionalmente só os a no máximo 'raio_km' e sem as 'posicoes' em
+    'excluir'. Retorna (posições, distâncias em km), em ordem de distância.
+    Só as células dos anéis necessários são visitadas.
+    """
+    vazio = (np.array([], dtype=grade['posicoes'].dtype), np.array([], dtype=float))
+    if k <= 0 or len(grade['inicios']) == 0:
+        return vazio
+
+    tamanho = grade['tamanho_celula']
+    linha0, coluna0 = np.floor(latitude / tamanho), np.floor(longitude / tamanho)
+    # Anel (distância de Chebyshev em células) de cada célula ocupada
+    anel_por_celula = np.maximum(np.abs(grade['celula_linhas'] - linha0), np.abs(grade['celula_colunas'] - coluna0))
+    ordem_celulas = np.argsort(anel_por_celula, kind='stable')
+    aneis_ordenados = anel_por_celula[ordem_celulas]
+    fronteiras = np.flatnonzero(np.diff(aneis_ordenados)) + 1
+    grupos = np.split(ordem_celulas, fronteiras)
+    aneis = [int(aneis_ordenados[0])] + [int(aneis_ordenados[f]) for f in fronteiras]
+
+    posicoes_vistas, distancias_vistas = [], []
+    melhores_pos, melhores_dist = vazio
+    for i, celulas in enumerate(grupos):
+        pontos = np.concatenate([np.arange(grade['inicios'][c], grade['fins'][c]) for c in celulas])
+        distancias = haversine_km(latitude, longitude, grade['latitudes'][pontos], grade['longitudes'][pontos])
+        posicoes = grade['posicoes'][pontos]
+        manter = np.ones(len(pontos), dtype=bool)
+        if excluir is not None and len(excluir):
+            manter &= ~np.isin(posicoes, excluir)
+        if raio_km is not None:
+            manter &= distancias <= raio_km
+        posicoes_vistas.append(posicoes[manter])
+        distancias_vistas.append(distancias[manter])
+
+        todas_pos, todas_dist = np.concatenate(posicoes_vistas), np.concatenate(distancias_vistas)
+        ordem = np.argsort(todas_dist, kind='stable')[:k]
+        melhores_pos, melhores_dist = todas_pos[ordem], todas_dist[ordem]
+
+        if i + 1 == len(grupos):
+            break
+        # Pontos ainda não vistos estão a pelo menos (próximo anel - 1) células completas
+        limite = _distancia_minima_aneis(grade, latitude, aneis[i + 1] - 1)
+        if raio_km is not None and limite > raio_km:
+            break
+        if len(melhores_dist) == k and melhores_dist[-1] <= limite:
+            break
+    return melhores_pos, melhores_dist
+
+
+def construir_indice_pendentes(df: pd.DataFrame) -> Dict[str, Any]:
+    """Grade dos serviços pendentes com coordenadas; cada ponto guarda a posição da linha em 'df'."""
+    pendentes = df['is_pendente'].to_numpy(dtype=bool)
+    posicoes = np.flatnonzero(pendentes)
+    return construir_grade(df['Latitude'].to_numpy(dtype=float)[posicoes],
+                           df['Longitude'].to_numpy(dtype=float)[posicoes], posicoes)
+
+
+def construir_indice_equipes(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Última posição conhecida de cada equipe 'RS-': coordenadas da atividade
+    iniciada/concluída mais recente (pelo Fim ou, sem ele, pelo Início).
+    'equipes' traz uma linha por equipe, com o status da sua atividade mais
+    recente ('Status Atual'); 'grade' indexa essas posições (ponto i = linha i).
+    """
+    equipes_rs = df['is_equipe_rs'].to_numpy(dtype=bool)
+
+    # Atividade atual: a de Início mais recente de cada equipe, qualquer que seja o status
+    atividades = df.loc[equipes_rs & df['Início'].notna().to_numpy(),
+                        ['Recurso', 'Início', 'Status da Atividade', 'Tipo de Atividade']]
+    atuais = (atividades.sort_values(['Recurso', 'Início'], kind='stable')
+              .drop_duplicates('Recurso', keep='last')
+              .rename(columns={'Status da Atividade': 'Status Atual', 'Tipo de Atividade': 'Atividade Atual'}))
+
+    com_posicao = (equipes_rs & df['status_norm'].isin(STATUS_POSICAO_EQUIPE).to_numpy()
+                   & df['Latitude'].notna().to_numpy() & df['Longitude'].notna().to_numpy())
+    posicoes = df.loc[com_posicao, ['Recurso', 'Seccional_Equipe', 'Processo', 'Latitude', 'Longitude',
+                                    'Ordem de Serviço', 'Início', 'Fim']]
+    posicoes = posicoes.assign(Posicao_Em=posicoes['Fim'].fillna(posicoes['Início'])).dropna(subset=['Posicao_Em'])
+    ultimas = (posicoes.drop(columns=['Início', 'Fim'])
+               .sort_values(['Recurso', 'Posicao_Em'], kind='stable')
+               .drop_duplicates('Recurso', keep='last'))
+
+    equipes = ultimas.merge(atuais[['Recurso', 'Status Atual', 'Atividade Atual']], on='Recurso', how='left')
+    equipes = equipes.astype({'Recurso': str}).reset_index(drop=True)
+    return {'equipes': equipes, 'grade': construir_grade(equipes['Latitude'], equipes['Longitude'])}
+
+
+def equipes_mais_proximas(df: pd.DataFrame, latitude: float, longitude: float, k: int,
+                          raio_km: Optional[float] = None) -> pd.DataFrame:
+    """As 'k' equipes cuja última posição conhecida está mais perto do ponto, com 'Distancia_km'."""
+    indice = obter_indice(df, INDICE_EQUIPES)
+    posicoes, distancias = vizinhos_mais_proximos(indice['grade'], latitude, longitude, k, raio_km=raio_km)
+    return indice['equipes'].iloc[posicoes].assign(Distancia_km=distancias).reset_index(drop=True)
+
+
+def obter_indice(df: pd.DataFrame, nome: str) -> Dict[str, Any]:
+    """Índice espacial 'nome' de 'df': o do snapshot em cache ou, para outras bases, montado na hora."""
+    from analysis import data_loader
+    return data_loader.obter_derivado(df, nome)
@@ -12,33 +12,34 @@ try:
 finally:
     if 'sys' in locals(): del sys
 
-from analysis import servicos
+from analysis import agregados
 # Importa as funções auxiliares do novo arquivo de utilitários
-from analysis.utils import gerar_html_base, categorizar_status
+from analysis.utils import gerar_html_base
+from analysis.cache_relatorios import em_cache, TTL_RELATORIOS_COM_HORARIO
 
+@em_cache('gerencial', TTL_RELATORIOS_COM_HORARIO)
 def gerar_relatorio_gerencial_html(df: pd.DataFrame) -> str:
     """Gera um relatório gerencial completo em HTML com múltiplas visões macro."""
     print("\nGerando relatório gerencial completo em HTML...")
 
-    atividades_para_excluir = ["Intervalo para almoço", "Indisponibilidade"]
-    df_produtivo = df[~df['Tipo de Atividade'].isin(atividades_para_excluir)].copy()
-    
+    # Todas as contagens vêm das tabelas agregadas do snapshot (grupos, não linhas)
+    contagem = agregados.contagem_status_filtrada(df)
+
     # 1. Visão Geral de Status
-    contagem_status = df_produtivo['Status da Atividade'].value_counts().reset_index()
+    contagem_status = agregados.somar_por(contagem, 'Status da Atividade').reset_index()
     contagem_status.columns = ['Status', 'Quantidade']
     total_atividades = contagem_status['Quantidade'].sum()
     contagem_status['Percentual (%)'] = ((contagem_status['Quantidade'] / total_atividades) * 100).round(2)
     
     # 2. Resumo por Seccional e Processo
-    df_categorizado_geral = categorizar_status(df_produtivo) 
-    resumo_seccional = pd.pivot_table(df_categorizado_geral, index='Seccional', columns='categoria_status', aggfunc='size', fill_value=0)
-    resumo_processo = pd.pivot_table(df_categorizado_geral[df_categorizado_geral['Processo']!=''], index='Processo', columns='categoria_status', aggfunc='size', fill_value=0)
+    resumo_seccional = pd.pivot_table(contagem, index='Seccional', columns='categoria_status', values='Quantidade', aggfunc='sum', fill_value=0, observed=True)
+    resumo_processo = pd.pivot_table(contagem[contagem['Processo']!=''], index='Processo', columns='categoria_status', values='Quantidade', aggfunc='sum', fill_value=0, observed=True)
 
     # 3. Resumo de Alertas
-    alertas = servicos.classificar_os_para_alerta(df)
+    alertas = agregados.contar_alertas_por_faixa(df)
     resumo_alertas_data = {
         'Tipo de Alerta': ['Vencidas (Ação Imediata)', 'Vencendo Ainda Hoje', 'Vencendo Amanhã (até 08h)'],
-        'Quantidade': [len(alertas['vencidas']), len(alertas['vencendo_hoje']), len(alertas['vencendo_amanha'])]
+        'Quantidade': [alertas['vencidas'], alertas['vencendo_hoje'], alertas['vencendo_amanha']]
     }
     df_alertas = pd.DataFrame(resumo_alertas_data)
 
@@ -1,4 +1,5 @@
 import pandas as pd
+from dataclasses import replace
 from typing import Optional
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -14,28 +15,30 @@ try:
 finally:
     if 'sys' in locals(): del sys
 
-# Importa o módulo de serviços para reutilizar a lógica de alertas
-from analysis import servicos 
 from analysis import mappings
-from analysis.utils import gerar_html_base, categorizar_status
+from analysis import agregados
+from analysis import rotas
+from analysis.utils import gerar_html_base
+from analysis.renderizacao import escapar_markdown, proteger_em_entidade, renderizar_grupos
+from analysis.consulta import FiltroConsulta, filtrar, mascara
+from analysis.cache_relatorios import em_cache, TTL_RELATORIOS_COM_HORARIO
+
+def gerar_resumo_produtividade(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None) -> str:
+    """Gera um resumo simples de produtividade por status para o bot, a partir da contagem agregada."""
+    filtro = filtro or FiltroConsulta()
+    seccional, processo = filtro.seccional, filtro.processo
+    contagem = agregados.contagem_status_filtrada(df, filtro)
 
-def gerar_resumo_produtividade(df: pd.DataFrame, seccional: Optional[str] = None, processo: Optional[str] = None) -> str:
-    """Filtra e gera um resumo simples de produtividade por status para o bot."""
-    atividades_para_excluir = ["Intervalo para almoço", "Indisponibilidade"]
-    df_filtrado = df[~df['Tipo de Atividade'].isin(atividades_para_excluir)].copy()
-    
     filtros_aplicados = []
     if seccional:
-        df_filtrado = df_filtrado[df_filtrado['Seccional'].str.strip().str.upper() == seccional.strip().upper()]
         filtros_aplicados.append(f"Seccional = '{seccional}'")
     if processo:
-        df_filtrado = df_filtrado[df_filtrado['Processo'].str.strip().str.upper() == processo.strip().upper()]
         filtros_aplicados.append(f"Processo = '{processo}'")
-    if df_filtrado.empty:
+    total_atividades = int(contagem['Quantidade'].sum())
+    if total_atividades == 0:
         return f"Nenhuma atividade produtiva encontrada para os filtros: {', '.join(filtros_aplicados)}." if filtros_aplicados else "Nenhuma atividade produtiva encontrada."
     
-    contagem_status = df_filtrado['Status da Atividade'].value_counts()
-    total_atividades = len(df_filtrado)
+    contagem_status = agregados.somar_por(contagem, 'Status da Atividade')
     titulo_filtro = f"para filtros: {', '.join(filtros_aplicados)}" if filtros_aplicados else "geral"
     resposta = f"📊 *Resumo de Produtividade ({titulo_filtro})*\n\n"
     resposta += f"Total de Atividades: *{total_atividades}*\n-----------------------------------\n"
@@ -45,32 +48,22 @@ def gerar_resumo_produtividade(df: pd.DataFrame, seccional: Optional[str] = None
     return resposta
 
 
-def gerar_relatorio_principal_html(df: pd.DataFrame,
-                                   seccional: Optional[str] = None,
-                                   processo: Optional[str] = None) -> str:
+@em_cache('produtividade_principal', TTL_RELATORIOS_COM_HORARIO)
+def gerar_relatorio_principal_html(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None) -> str:
     """Gera o HTML para a página principal com o resumo e os links para os detalhes."""
+    filtro = filtro or FiltroConsulta()
+    seccional, processo = filtro.seccional, filtro.processo
     print(f"\nGerando relatório INTERATIVO com filtros: Seccional='{seccional or 'Todas'}', Processo='{processo or 'Todos'}'...")
 
-    df_filtrado = df.copy()
-    if seccional:
-        df_filtrado = df_filtrado[df_filtrado['Seccional'].str.strip().str.upper() == seccional.strip().upper()]
-    if processo:
-        df_filtrado = df_filtrado[df_filtrado['Processo'].str.strip().str.upper() == processo.strip().upper()]
-
-    df_equipes = df_filtrado[df_filtrado['Recurso'].str.startswith('RS-', na=False)].copy()
-    atividades_para_excluir = ["Intervalo para almoço", "Indisponibilidade"]
-    df_produtivo = df_equipes[~df_equipes['Tipo de Atividade'].isin(atividades_para_excluir)].copy()
-    df_produtivo = df_produtivo[df_produtivo['Processo'] != 'CORTE MOTO']
+    # Contagem agregada do snapshot: só equipes 'RS-', sem atividades não produtivas e sem CORTE MOTO
+    contagem = agregados.contagem_status_filtrada(df, replace(filtro, apenas_equipes_rs=True))
+    contagem = contagem[contagem['processo_norm'] != 'CORTE MOTO']
     
-    if df_produtivo.empty:
+    if contagem.empty:
         return gerar_html_base("Relatório de Produtividade", "<h1>Relatório de Produtividade</h1><p>Nenhuma atividade produtiva encontrada para os filtros aplicados.</p>")
-        
-    df_categorizado = categorizar_status(df_produtivo)
 
-    if df_categorizado.empty:
-        return gerar_html_base("Relatório de Produtividade", "<h1>Relatório de Produtividade</h1><p>Nenhuma atividade com status relevante encontrada.</p>")
-
-    relatorio = df_categorizado.groupby(['Processo', 'Recurso'])['categoria_status'].value_counts().unstack(fill_value=0)
+    relatorio = pd.pivot_table(contagem, index=['Processo', 'Recurso'], columns='categoria_status', values='Quantidade',
+                               aggfunc='sum', fill_value=0, observed=True)
     for cat in ['Concluído', 'Não Concluído', 'Pendentes', 'Cancelado']:
         if cat not in relatorio.columns: relatorio[cat] = 0
     relatorio['Total'] = relatorio['Concluído'] + relatorio['Não Concluído']
@@ -94,13 +87,10 @@ def gerar_relatorio_principal_html(df: pd.DataFrame,
 
 def gerar_relatorio_detalhado_equipe_html(df: pd.DataFrame, nome_equipe: str) -> str:
     """Gera o HTML para a página de detalhes de uma única equipe."""
-    df_equipe = df[df['Recurso'] == nome_equipe].copy()
-    atividades_para_excluir = ["Intervalo para almoço", "Indisponibilidade"]
-    df_produtivo = df_equipe[~df_equipe['Tipo de Atividade'].isin(atividades_para_excluir)].copy()
-    df_categorizado = categorizar_status(df_produtivo)
+    df_categorizado = filtrar(df, FiltroConsulta(recurso=nome_equipe, apenas_produtivas=True))
     if df_categorizado.empty:
         return gerar_html_base(f"Detalhes - {nome_equipe}", f"<h2>Detalhes da Equipe: {nome_equipe}</h2><p>Nenhuma atividade produtiva com status relevante encontrada.</p>")
-    detalhe = df_categorizado.groupby(['Tipo de Atividade'])['categoria_status'].value_counts().unstack(fill_value=0)
+    detalhe = df_categorizado.groupby(['Tipo de Atividade'], observed=True)['categoria_status'].value_counts().unstack(fill_value=0)
     for cat in ['Concluído', 'Não Concluído', 'Pendentes', 'Cancelado']:
         if cat not in detalhe.columns: detalhe[cat] = 0
     detalhe['Total'] = detalhe['Concluído'] + detalhe['Não Concluído']
@@ -123,19 +113,17 @@ def gerar_relatorio_detalhado_equipe_html(df: pd.DataFrame, nome_equipe: str) ->
 def gerar_relatorio_gerencial_html(df: pd.DataFrame) -> str:
     """Gera um relatório gerencial completo em HTML com múltiplas visões macro."""
     print("\nGerando relatório gerencial completo em HTML...")
-    atividades_para_excluir = ["Intervalo para almoço", "Indisponibilidade"]
-    df_produtivo = df[~df['Tipo de Atividade'].isin(atividades_para_excluir)].copy()
-    contagem_status = df_produtivo['Status da Atividade'].value_counts().reset_index()
+    contagem = agregados.contagem_status_filtrada(df)
+    contagem_status = agregados.somar_por(contagem, 'Status da Atividade').reset_index()
     contagem_status.columns = ['Status', 'Quantidade']
     total_atividades = contagem_status['Quantidade'].sum()
     contagem_status['Percentual (%)'] = ((contagem_status['Quantidade'] / total_atividades) * 100).round(2)
-    df_categorizado_geral = categorizar_status(df_produtivo) 
-    resumo_seccional = pd.pivot_table(df_categorizado_geral, index='Seccional', columns='categoria_status', aggfunc='size', fill_value=0)
-    resumo_processo = pd.pivot_table(df_categorizado_geral[df_categorizado_geral['Processo']!=''], index='Processo', columns='categoria_status', aggfunc='size', fill_value=0)
-    alertas = servicos.classificar_os_para_alerta(df)
+    resumo_seccional = pd.pivot_table(contagem, index='Seccional', columns='categoria_status', values='Quantidade', aggfunc='sum', fill_value=0, observed=True)
+    resumo_processo = pd.pivot_table(contagem[contagem['Processo']!=''], index='Processo', columns='categoria_status', values='Quantidade', aggfunc='sum', fill_value=0, observed=True)
+    alertas = agregados.contar_alertas_por_faixa(df)
     resumo_alertas_data = {
         'Tipo de Alerta': ['Vencidas (Ação Imediata)', 'Vencendo Ainda Hoje', 'Vencendo Amanhã (até 08h)'],
-        'Quantidade': [len(alertas['vencidas']), len(alertas['vencendo_hoje']), len(alertas['vencendo_amanha'])]
+        'Quantidade': [alertas['vencidas'], alertas['vencendo_hoje'], alertas['vencendo_amanha']]
     }
     df_alertas = pd.DataFrame(resumo_alertas_data)
     fuso_horario_brasil = ZoneInfo("America/Sao_Paulo"); agora = datetime.now(fuso_horario_brasil)
@@ -149,42 +137,34 @@ def gerar_relatorio_gerencial_html(df: pd.DataFrame) -> str:
 
 ## --- FUNÇÕES PARA O DRILL-DOWN POR EQUIPE (RESTAURADAS) --- ##
 
-def obter_equipes_por_filtro(df: pd.DataFrame, seccional: str, processo: Optional[str] = None) -> list:
+def obter_equipes_por_filtro(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None) -> list:
     """
-    Retorna uma lista de equipes (Recursos) únicos com base nos filtros de
-    seccional DA EQUIPE e, opcionalmente, de processo.
+    Retorna uma lista de equipes 'RS-' (Recursos) únicas que atendem ao filtro
+    (tipicamente seccional DA EQUIPE e, opcionalmente, processo).
     """
-    df_filtrado = df.copy()
-    
-    df_filtrado = df_filtrado[df_filtrado['Seccional_Equipe'].str.strip().str.upper() == seccional.strip().upper()]
-    
-    if processo:
-        df_filtrado = df_filtrado[df_filtrado['Processo'].str.strip().str.upper() == processo.strip().upper()]
-    
-    df_filtrado = df_filtrado[df_filtrado['Recurso'].str.startswith('RS-', na=False)]
+    # Só a coluna 'Recurso' das linhas selecionadas é materializada
+    recursos = df['Recurso'][mascara(df, replace(filtro or FiltroConsulta(), apenas_equipes_rs=True))]
 
-    if df_filtrado.empty:
+    if recursos.empty:
         return []
 
-    return sorted(df_filtrado['Recurso'].unique())
+    return sorted(recursos.unique())
 
 
+@em_cache('mapa_equipe')
 def gerar_mapa_por_equipe_html(df: pd.DataFrame, nome_equipe: str) -> Optional[str]:
     """
     Gera um mapa HTML interativo para uma equipe específica, com pinos coloridos
-    de acordo com o status da atividade.
+    de acordo com o status da atividade e a rota sugerida para as OS pendentes
+    (ver 'rotas.sugerir_rota').
     """
     print(f"\nGerando mapa de atividades para a equipe: {nome_equipe}...")
 
     # 1. FILTRAGEM DOS DADOS
-    df_equipe = df[df['Recurso'] == nome_equipe].copy()
+    df_equipe = filtrar(df, FiltroConsulta(recurso=nome_equipe)).copy()
     
-    # Remove linhas onde a latitude ou longitude são nulas ou inválidas
+    # Remove linhas sem coordenadas (Latitude/Longitude já chegam como float do ETL)
     df_equipe.dropna(subset=['Latitude', 'Longitude'], inplace=True)
-    df_equipe = df_equipe[pd.to_numeric(df_equipe['Latitude'], errors='coerce').notna()]
-    df_equipe = df_equipe[pd.to_numeric(df_equipe['Longitude'], errors='coerce').notna()]
-    df_equipe['Latitude'] = df_equipe['Latitude'].astype(float)
-    df_equipe['Longitude'] = df_equipe['Longitude'].astype(float)
 
     if df_equipe.empty:
         print("  - Nenhuma atividade com coordenadas válidas encontrada para esta equipe.")
@@ -215,7 +195,31 @@ def gerar_mapa_por_equipe_html(df: pd.DataFrame, nome_equipe: str) -> Optional[s
             icon=folium.Icon(color=cor_pin) # Define a cor do marcador
         ).add_to(mapa)
 
-    # 4. SALVAR O MAPA EM UMA STRING HTML
+    # 4. ROTA SUGERIDA PARA AS OS PENDENTES (linha a partir da posição da equipe)
+    rota = rotas.sugerir_rota(df, nome_equipe)
+    if rota:
+        pontos = [rota['origem']] + rota['paradas'][['Latitude', 'Longitude']].values.tolist()
+        folium.Marker(
+            location=rota['origem'],
+            tooltip=f"Início da rota: {rota['descricao_origem']}",
+            icon=folium.Icon(color='black', icon='home')
+        ).add_to(mapa)
+        folium.PolyLine(
+            pontos, color='blue', weight=3, opacity=0.7,
+            tooltip=f"Rota sugerida: {len(rota['paradas'])} OS, {rota['km_sugerida']:.1f} km"
+        ).add_to(mapa)
+        quadro = f"""
+        <div style="position: fixed; top: 10px; right: 10px; z-index: 9999; background: white;
+                    padding: 8px 12px; border: 1px solid #999; border-radius: 4px; font-size: 13px;">
+            <b>Rota sugerida ({len(rota['paradas'])} OS pendentes)</b><br>
+            Sugerida: {rota['km_sugerida']:.1f} km<br>
+            Atual (Posição na Rota): {rota['km_atual']:.1f} km<br>
+            <b>Economia estimada: {rota['km_economizados']:.1f} km</b>
+        </div>
+        """
+        mapa.get_root().html.add_child(folium.Element(quadro))
+
+    # 5. SALVAR O MAPA EM UMA STRING HTML
     map_html_path = 'mapa_temp.html'
     mapa.save(map_html_path)
     with open(map_html_path, 'r', encoding='utf-8') as f:
@@ -230,15 +234,14 @@ def gerar_resumo_por_equipe(df: pd.DataFrame, nome_equipe: str) -> str:
     Gera um resumo para uma única equipe, com contagem por tipo de OS,
     detalhando os status de cada tipo.
     """
-    df_equipe = df[df['Recurso'] == nome_equipe].copy()
-    
-    atividades_para_excluir = ["Intervalo para almoço", "Indisponibilidade"]
-    df_produtivo = df_equipe[~df_equipe['Tipo de Atividade'].isin(atividades_para_excluir)]
+    df_produtivo = filtrar(df, FiltroConsulta(recurso=nome_equipe, apenas_produtivas=True))
 
     if df_produtivo.empty:
         return f"Nenhuma atividade produtiva encontrada para a equipe `{nome_equipe}`."
 
-    contagem_detalhada = df_produtivo.groupby(['Tipo de Atividade', 'Status da Atividade']).size().reset_index(name='Quantidade')
+    contagem_detalhada = df_produtivo.groupby(['Tipo de Atividade', 'Status da Atividade'], observed=True).size().reset_index(name='Quantidade')
+    # Total por tipo sobre a própria contagem (sem refiltrar a tabela a cada tipo)
+    contagem_detalhada['Total'] = contagem_detalhada.groupby('Tipo de Atividade', observed=True)['Quantidade'].transform('sum')
     
     # --- ALTERAÇÃO APLICADA AQUI ---
     # Garante que a coluna 'Cidade' só contenha texto antes de ordenar
@@ -247,22 +250,16 @@ def gerar_resumo_por_equipe(df: pd.DataFrame, nome_equipe: str) -> str:
     total_atividades = len(df_produtivo)
     info_equipe = df_produtivo.iloc[0]
 
-    resposta = f"👤 *Resumo da Equipe:* `{nome_equipe}`\n"
-    resposta += f"*- Seccional da Equipe:* {info_equipe['Seccional_Equipe']}\n"
-    resposta += f"*- Processo:* {info_equipe['Processo']}\n\n"
+    resposta = f"👤 *Resumo da Equipe:* `{proteger_em_entidade(nome_equipe, '`')}`\n"
+    resposta += f"*- Seccional da Equipe:* {escapar_markdown(info_equipe['Seccional_Equipe'])}\n"
+    resposta += f"*- Processo:* {escapar_markdown(info_equipe['Processo'])}\n\n"
     
-    resposta += f"🏙️ *Cidades de Atuação:*\n_{cidades_atuacao}_\n\n"
+    resposta += f"🏙️ *Cidades de Atuação:*\n_{proteger_em_entidade(cidades_atuacao, '_')}_\n\n"
     
     resposta += f"🛠️ *Resumo de Atividades ({total_atividades} no total):*\n"
     resposta += "-----------------------------------\n"
-    
-    for tipo_os in contagem_detalhada['Tipo de Atividade'].unique():
-        total_tipo_os = contagem_detalhada[contagem_detalhada['Tipo de Atividade'] == tipo_os]['Quantidade'].sum()
-        resposta += f"\n- *{tipo_os}* (Total: {total_tipo_os})\n"
-        
-        status_deste_tipo = contagem_detalhada[contagem_detalhada['Tipo de Atividade'] == tipo_os]
-        
-        for _, linha in status_deste_tipo.iterrows():
-            resposta += f"    • {linha['Status da Atividade']}: {linha['Quantidade']}\n"
+    resposta += renderizar_grupos(contagem_detalhada, 'Tipo de Atividade',
+                                  "\n- *{Tipo de Atividade}* (Total: {Total})\n",
+                                  "    • {Status da Atividade}: {Quantidade}\n")
             
     return resposta
\ No newline at end of file
@@ -0,0 +1,128 @@
+import re
+import string
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+import os
+import sys
+
+# --- Bloco de Inicialização para Execução Autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+# Montagem das respostas em texto (Markdown do Telegram) a partir de DataFrames.
+# Um bloco é descrito por um modelo no formato de str.format, com nomes de
+# coluna entre chaves (ex.: "  - `{Instalação}` ({Recurso})\n"). Cada campo é
+# montado para a coluna inteira de uma vez, e as linhas são unidas com
+# str.join, sem iterrows nem concatenação linha a linha.
+#
+# Os valores são escapados conforme a posição no modelo: fora de entidades, os
+# caracteres especiais recebem '\'; dentro de uma entidade (onde o Telegram
+# não aceita escape), o marcador que a fecharia é substituído.
+
+# Caracteres especiais do Markdown do Telegram
+_ESPECIAIS = re.compile(r'([_*`\[])')
+_MARCADORES = re.compile(r'(?<!\\)(```|[*_`])')
+# Substituto do marcador de fechamento dentro de cada entidade
+_SUBSTITUTOS = {'`': "'", '```': "'''", '*': ' ', '_': ' '}
+
+
+def _como_texto(valores) -> pd.Series:
+    """Valores como texto, do mesmo jeito que um f-string os mostraria."""
+    if not isinstance(valores, pd.Series):
+        valores = pd.Series(valores)
+    return valores.astype(object).astype(str)
+
+
+def escapar_markdown(valor):
+    """Escapa os caracteres especiais do Markdown do Telegram em um valor ou em uma Series."""
+    if isinstance(valor, pd.Series):
+        return _como_texto(valor).str.replace(_ESPECIAIS, r'\\\1', regex=True)
+    return _ESPECIAIS.sub(r'\\\1', str(valor))
+
+
+def proteger_em_entidade(valor, entidade: str) -> str:
+    """Valor a ser colocado dentro de uma entidade ('`', '*', '_'): troca o marcador que a fecharia."""
+    return str(valor).replace(entidade, _SUBSTITUTOS[entidade])
+
+
+def entidade_aberta(texto: str, aberta: Optional[str] = None) -> Optional[str]:
+    """Entidade aberta após 'texto', partindo de 'aberta' (o Markdown do Telegram não aninha entidades)."""
+    for marcador in _MARCADORES.findall(texto):
+        if aberta is None:
+            aberta = marcador
+        elif marcador == aberta:
+            aberta = None
+    return aberta
+
+
+def _compilar_modelo(modelo: str) -> List[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+    """[(texto literal, coluna, formato, entidade em que o campo está)] de um modelo str.format."""
+    partes, aberta = [], None
+    for literal, coluna, formato, _ in string.Formatter().parse(modelo):
+        aberta = entidade_aberta(literal, aberta)
+        partes.append((literal, coluna, formato, aberta if coluna is not None else None))
+    return partes
+
+
+def _campo(valores: pd.Series, formato: Optional[str], entidade: Optional[str]) -> np.ndarray:
+    """Coluna formatada e protegida conforme a entidade em que aparece no modelo."""
+    # Só os valores distintos são formatados e escapados; as linhas recebem o texto do seu valor
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        codigos = valores.cat.codes.to_numpy()
+        distintos = pd.Series(list(valores.cat.categories) + [np.nan], dtype=object)
+    else:
+        codigos, distintos = pd.factorize(valores, use_na_sentinel=False)
+        distintos = pd.Series(distintos, dtype=object)
+    return _formatar(distintos, formato, entidade)[codigos]
+
+
+def _formatar(valores: pd.Series, formato: Optional[str], entidade: Optional[str]) -> np.ndarray:
+    """Texto de cada valor, com o 'formato' de str.format, protegido para a 'entidade'."""
+    if formato:
+        texto = valores.map(lambda valor: format(valor, formato)).astype(str)
+    else:
+        texto = _como_texto(valores)
+    if entidade is None:
+        texto = texto.str.replace(_ESPECIAIS, r'\\\1', regex=True)
+    else:
+        texto = texto.str.replace(entidade, _SUBSTITUTOS[entidade], regex=False)
+    return texto.to_numpy(dtype=object)
+
+
+def renderizar_linhas(df: pd.DataFrame, modelo: str) -> np.ndarray:
+    """Texto de cada linha de 'df' pelo 'modelo' (um array de strings, na ordem de 'df')."""
+    resultado = np.full(len(df), '', dtype=object)
+    for literal, coluna, formato, entidade in _compilar_modelo(modelo):
+        if literal:
+            resultado = resultado + literal
+        if coluna is not None:
+            resultado = resultado + _campo(df[coluna], formato, entidade)
+    return resultado
+
+
+def renderizar_bloco(df: pd.DataFrame, modelo: str) -> str:
+    """Aplica 'modelo' a todas as linhas de 'df' e une o resultado em um único texto."""
+    if df.empty:
+        return ""
+    return "".join(renderizar_linhas(df, modelo))
+
+
+def renderizar_grupos(df: pd.DataFrame, coluna_grupo: str, modelo_cabecalho: str, modelo_item: str) -> str:
+    """
+    Resumo aninhado: para cada grupo de 'coluna_grupo' (linhas de um mesmo
+    grupo devem estar juntas, ex.: saída de um groupby), o cabeçalho uma vez
+    (com os valores da primeira linha do grupo) seguido dos itens do grupo.
+    """
+    if df.empty:
+        return ""
+    grupos = df[coluna_grupo].to_numpy()
+    inicio_grupo = np.ones(len(df), dtype=bool)
+    inicio_grupo[1:] = grupos[1:] != grupos[:-1]
+    cabecalhos = np.full(len(df), '', dtype=object)
+    cabecalhos[inicio_grupo] = renderizar_linhas(df[inicio_grupo], modelo_cabecalho)
+    return "".join(cabecalhos + renderizar_linhas(df, modelo_item))
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+import os
+import sys
+
+# --- Bloco de Inicialização para Execução Autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis import espacial
+from analysis.consulta import FiltroConsulta, filtrar
+
+# Sugestão de ordem de visita para as OS pendentes de uma equipe: parte da
+# última posição conhecida da equipe, monta a rota pelo vizinho mais próximo e
+# a melhora com 2-opt. A rota é aberta (a equipe não precisa voltar à origem).
+# Tudo sobre uma matriz de distâncias (haversine) calculada uma única vez.
+
+# Limite de trocas 2-opt por rota (na prática a busca converge bem antes)
+MAXIMO_ITERACOES_2OPT = 5_000
+# Melhora mínima (km) para aceitar uma troca; evita oscilar por arredondamento
+TOLERANCIA_KM = 1e-9
+
+
+def matriz_distancias(latitudes, longitudes) -> np.ndarray:
+    """Distâncias (km) entre todos os pares de pontos: matriz n × n."""
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    return espacial.haversine_km(latitudes[:, None], longitudes[:, None], latitudes[None, :], longitudes[None, :])
+
+
+def rota_vizinho_mais_proximo(distancias: np.ndarray, inicio: int = 0) -> np.ndarray:
+    """Ordem de visita começando em 'inicio' e seguindo sempre para o ponto não visitado mais próximo."""
+    n = len(distancias)
+    visitado = np.zeros(n, dtype=bool)
+    rota = np.empty(n, dtype=np.int64)
+    atual = inicio
+    for passo in range(n):
+        rota[passo] = atual
+        visitado[atual] = True
+        if passo < n - 1:
+            atual = int(np.argmin(np.where(visitado, np.inf, distancias[atual])))
+    return rota
+
+
+def melhorar_2opt(rota: np.ndarray, distancias: np.ndarray,
+                  maximo_iteracoes: int = MAXIMO_ITERACOES_2OPT) -> np.ndarray:
+    """
+    Melhora uma rota aberta por 2-opt, mantendo o primeiro ponto fixo. A cada
+    iteração, o ganho de inverter cada trecho rota[i..j] é calculado para
+    todos os pares (i, j) de uma vez, e a melhor inversão é aplicada.
+    """
+    n = len(rota)
+    if n < 3:
+        return rota
+    # Ponto fictício de chegada, a distância zero de todos: torna a rota aberta um ciclo fechado nele
+    estendida = np.zeros((n + 1, n + 1))
+    estendida[:n, :n] = distancias
+    rota = np.append(rota, n)
+
+    i = np.arange(1, n)[:, None]
+    j = np.arange(1, n)[None, :]
+    trocas_validas = j > i
+    for _ in range(maximo_iteracoes):
+        a, b = rota[:-2], rota[1:-1]  # arestas (rota[i-1], rota[i]) para i = 1..n-1
+        c, e = b, rota[2:]            # arestas (rota[j], rota[j+1]) para j = 1..n-1
+        ganho = (estendida[a[:, None], c[None, :]] + estendida[b[:, None], e[None, :]]
+                 - estendida[a, b][:, None] - estendida[c, e][None, :])
+        ganho = np.where(trocas_validas, ganho, 0.0)
+        melhor = int(np.argmin(ganho))
+        if ganho.flat[melhor] > -TOLERANCIA_KM:
+            break
+        inicio, fim = melhor // (n - 1) + 1, melhor % (n - 1) + 1
+        rota[inicio:fim + 1] = rota[inicio:fim + 1][::-1]
+    return rota[:-1]
+
+
+def comprimento_rota(rota: np.ndarray, distancias: np.ndarray) -> float:
+    """Soma das distâncias (km) entre pontos consecutivos da rota aberta."""
+    return float(distancias[rota[:-1], rota[1:]].sum())
+
+
+def sugerir_rota(df: pd.DataFrame, nome_equipe: str) -> Optional[Dict[str, Any]]:
+    """
+    Ordem de visita sugerida para as OS pendentes (com coordenadas) da equipe,
+    comparada com a ordem atual ('Posição na Rota', a partir da mesma origem).
+    A origem é a última posição conhecida da equipe; sem ela, a primeira OS da
+    rota atual. Retorna None se a equipe não tiver OS pendentes com coordenadas.
+    """
+    pendentes = filtrar(df, FiltroConsulta(recurso=nome_equipe, apenas_pendentes=True))
+    pendentes = pendentes.dropna(subset=['Latitude', 'Longitude'])
+    if pendentes.empty:
+        return None
+    # Ordem atual: Posição na Rota crescente (OS sem posição vão para o fim)
+    pendentes = pendentes.sort_values('Posição na Rota', kind='stable', na_position='last')
+
+    equipes = espacial.obter_indice(df, espacial.INDICE_EQUIPES)['equipes']
+    posicao = equipes[equipes['Recurso'] == str(nome_equipe)]
+    if not posicao.empty:
+        origem = (float(posicao['Latitude'].iloc[0]), float(posicao['Longitude'].iloc[0]))
+        descricao_origem = f"última posição da equipe (OS {posicao['Ordem de Serviço'].iloc[0]})"
+    else:
+        origem = (float(pendentes['Latitude'].iloc[0]), float(pendentes['Longitude'].iloc[0]))
+        descricao_origem = "primeira OS da rota atual (posição da equipe desconhecida)"
+
+    # Ponto 0 = origem; pontos 1..n = OS na ordem atual
+    latitudes = np.append(origem[0], pendentes['Latitude'].to_numpy(dtype=float))
+    longitudes = np.append(origem[1], pendentes['Longitude'].to_numpy(dtype=float))
+    distancias = matriz_distancias(latitudes, longitudes)
+
+    rota_atual = np.arange(len(latitudes))
+    rota_sugerida = melhorar_2opt(rota_vizinho_mais_proximo(distancias), distancias)
+    km_atual = comprimento_rota(rota_atual, distancias)
+    km_sugerida = comprimento_rota(rota_sugerida, distancias)
+
+    paradas = pendentes.iloc[rota_sugerida[1:] - 1][['Ordem de Serviço', 'Tipo de Atividade', 'Status da Atividade',
+                                                      'Posição na Rota', 'Latitude', 'Longitude']]
+    paradas.insert(0, 'Ordem Sugerida', np.arange(1, len(paradas) + 1))
+    paradas['Trecho (km)'] = np.round(distancias[rota_sugerida[:-1], rota_sugerida[1:]], 2)
+    print(f"  - Rota sugerida para {nome_equipe}: {len(paradas)} OS, {km_sugerida:.1f} km "
+          f"(rota atual: {km_atual:.1f} km).")
+    return {
+        'paradas': paradas.reset_index(drop=True),
+        'origem': origem,
+        'descricao_origem': descricao_origem,
+        'km_atual': km_atual,
+        'km_sugerida': km_sugerida,
+        'km_economizados': km_atual - km_sugerida,
+    }
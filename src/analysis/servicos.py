@@ -1,12 +1,11 @@
 import pandas as pd
 from typing import Dict, Optional
-from datetime import datetime, time, timedelta
+from datetime import datetime
 from zoneinfo import ZoneInfo
 import os
 import sys
 import numpy as np
 import folium
-from math import radians, sin, cos, sqrt, asin
 
 # --- Bloco de Inicialização para Execução Autônoma ---
 try:
@@ -18,70 +17,85 @@ finally:
 
 # Importa a função auxiliar do nosso módulo de utilitários
 from analysis.utils import gerar_html_base
+from analysis.renderizacao import escapar_markdown, proteger_em_entidade, renderizar_bloco
+from analysis import consulta
+from analysis.consulta import FiltroConsulta, localizar
+from analysis.cache_relatorios import em_cache, TTL_RELATORIOS_COM_HORARIO
 from analysis import mappings
-
-def classificar_os_para_alerta(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+from analysis import agregados
+from analysis import espacial
+
+# Padrões do mapa de proximidade (o bot aceita outros valores de k e raio)
+K_PROXIMIDADE_PADRAO = 3
+K_PROXIMIDADE_MAXIMO = 20
+K_EQUIPES_PADRAO = 5
+K_SUGESTOES_LOTE = 3
+
+# Linhas de cada OS nos resumos em texto (ver 'renderizacao.renderizar_bloco')
+MODELO_OS_VENCIMENTO = (
+    "  - `{Instalação}` (Equipe: {Recurso})\n"
+    "    - *Tipo:* {Tipo de Atividade}\n"
+    "    - *Status:* {Status da Atividade}\n"
+    "    - *Cidade:* {Cidade}\n"
+)
+MODELO_OS_DETALHE = (
+    "✅ *OS Encontrada:* `{Ordem de Serviço}`\n\n"
+    "*Serviço:*\n- *Tipo:* {Tipo de Atividade}\n- *Status:* {Status da Atividade}\n- *Processo:* {Processo}\n\n"
+    "*Localização:*\n- *Cidade:* {Cidade}\n- *Seccional:* {Seccional}\n- *Recurso:* {Recurso}\n\n"
+    "*Prazos:*\n- *Data Limite:* {Data Limite}\n"
+)
+MODELO_NOVO_ALERTA = (
+    "  - `{Ordem de Serviço}` {Tipo de Atividade} - {Cidade} ({Seccional})\n"
+    "    - *Limite:* {Limite} | *Equipe:* {Recurso}\n"
+)
+MODELO_EQUIPE_PROXIMA = (
+    "\n{Ordem}. `{Recurso}` - *{Distancia_km:.2f} km*\n"
+    "    - *Status atual:* {Status Texto}\n"
+    "    - *Última posição:* {Posicao Texto} ({Seccional_Equipe})\n"
+)
+
+def classificar_os_para_alerta(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None) -> Dict[str, pd.DataFrame]:
     """
-    Filtra e classifica OS de Anexo IV pendentes em três categorias:
-    'vencidas', 'vencendo_hoje', e 'vencendo_amanha'.
+    Filtra (pelo 'filtro', se houver) e classifica OS de Anexo IV pendentes em
+    três categorias: 'vencidas', 'vencendo_hoje', e 'vencendo_amanha', cada
+    uma ordenada por Data Limite. As faixas saem do índice de alertas do
+    snapshot (busca binária nas datas ordenadas); 'df' não é alterado.
     """
     print("\nClassificando OS de Anexo IV para alertas...")
     
-    status_pendentes = ['deslocamento', 'pendente', 'iniciado']
     fuso_horario_brasil = ZoneInfo("America/Sao_Paulo")
-    agora = datetime.now(fuso_horario_brasil)
-    
-    agora_naive = agora.replace(tzinfo=None)
-    amanha = agora_naive + timedelta(days=1)
-    amanha_as_8 = amanha.replace(hour=8, minute=0, second=0, microsecond=0)
-    
-    df['Data Limite'] = pd.to_datetime(df['Data Limite'])
-    
-    df_base = df[(df['Anexo IV'] == 'Sim') & (df['Status da Atividade'].str.lower().isin(status_pendentes))].copy()
+    agora_naive = datetime.now(fuso_horario_brasil).replace(tzinfo=None)
 
-    df_vencidas = df_base[df_base['Data Limite'] < agora_naive].sort_values(by='Data Limite')
-    df_vencendo_hoje = df_base[(df_base['Data Limite'] >= agora_naive) & (df_base['Data Limite'].dt.date == agora_naive.date())].sort_values(by='Data Limite')
-    df_vencendo_amanha = df_base[(df_base['Data Limite'].dt.date == amanha.date()) & (df_base['Data Limite'] <= amanha_as_8)].sort_values(by='Data Limite')
+    faixas = consulta.faixas_de_alerta(df, filtro, agora_naive)
+    alertas = {faixa: df.iloc[posicoes] for faixa, posicoes in faixas.items()}
 
-    print(f"  - Encontradas {len(df_vencidas)} OS vencidas.")
-    print(f"  - Encontradas {len(df_vencendo_hoje)} OS vencendo ainda hoje.")
-    print(f"  - Encontradas {len(df_vencendo_amanha)} OS vencendo amanhã até as 08:00.")
+    print(f"  - Encontradas {len(alertas['vencidas'])} OS vencidas.")
+    print(f"  - Encontradas {len(alertas['vencendo_hoje'])} OS vencendo ainda hoje.")
+    print(f"  - Encontradas {len(alertas['vencendo_amanha'])} OS vencendo amanhã até as 08:00.")
     
-    return {
-        "vencidas": df_vencidas,
-        "vencendo_hoje": df_vencendo_hoje,
-        "vencendo_amanha": df_vencendo_amanha
-    }
+    return alertas
 
 
 def buscar_ordem_servico(df: pd.DataFrame, numero_os: str) -> str:
     """Busca por uma Ordem de Serviço específica e retorna seus detalhes."""
     if not numero_os: return "Por favor, forneça um número de Ordem de Serviço."
     termo_busca = str(numero_os).strip()
-    resultado = df[df['Ordem de Serviço'].astype(str).str.strip() == termo_busca]
-    if resultado.empty: return f"❌ Nenhuma OS encontrada com o número: '{termo_busca}'"
-    if len(resultado) > 1: return f"⚠️ Alerta: Encontradas {len(resultado)} OS com o número '{termo_busca}'."
-    servico = resultado.iloc[0]
-    data_limite_formatada = servico['Data Limite'].strftime('%d/%m/%Y %H:%M') if pd.notna(servico['Data Limite']) else 'N/A'
-    resposta = f"✅ *OS Encontrada: `{servico['Ordem de Serviço']}`*\n\n"
-    resposta += f"*Serviço:*\n- *Tipo:* {servico['Tipo de Atividade']}\n- *Status:* {servico['Status da Atividade']}\n- *Processo:* {servico['Processo']}\n\n"
-    resposta += f"*Localização:*\n- *Cidade:* {servico['Cidade']}\n- *Seccional:* {servico['Seccional']}\n- *Recurso:* {servico['Recurso']}\n\n"
-    resposta += f"*Prazos:*\n- *Data Limite:* {data_limite_formatada}\n"
-    return resposta
+    resultado = df.iloc[localizar(df, termo_busca, campos=('os',))]
+    if resultado.empty: return f"❌ Nenhuma OS encontrada com o número: '{escapar_markdown(termo_busca)}'"
+    if len(resultado) > 1: return f"⚠️ Alerta: Encontradas {len(resultado)} OS com o número '{escapar_markdown(termo_busca)}'."
+    data_limite = resultado['Data Limite'].dt.strftime('%d/%m/%Y %H:%M').fillna('N/A')
+    return renderizar_bloco(resultado.assign(**{'Data Limite': data_limite}), MODELO_OS_DETALHE)
 
 
-def gerar_relatorio_vencimentos_anexo_iv(df: pd.DataFrame, seccional: Optional[str] = None) -> str:
+@em_cache('vencimentos_anexo_iv', TTL_RELATORIOS_COM_HORARIO)
+def gerar_relatorio_vencimentos_anexo_iv(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None) -> str:
     """
-    Filtra por Anexo IV e Seccional, classifica os vencimentos e retorna um relatório HTML limpo.
+    Filtra por Anexo IV e pelo filtro (ex.: Seccional), classifica os vencimentos e retorna um relatório HTML limpo.
     """
+    seccional = filtro.seccional if filtro else None
     print(f"\nGerando relatório de vencimentos Anexo IV para a seccional: '{seccional or 'Todas'}'...")
-    
-    df_filtrado = df.copy()
-    
-    if seccional:
-        df_filtrado = df_filtrado[df_filtrado['Seccional'].str.strip().str.upper() == seccional.strip().upper()]
 
-    alertas_classificados = classificar_os_para_alerta(df_filtrado)
+    alertas_classificados = classificar_os_para_alerta(df, filtro)
     
     df_vencidas = alertas_classificados["vencidas"]
     df_hoje = alertas_classificados["vencendo_hoje"]
@@ -119,71 +133,58 @@ def gerar_relatorio_vencimentos_anexo_iv(df: pd.DataFrame, seccional: Optional[s
 
 def gerar_resumo_alertas(df: pd.DataFrame) -> str:
     """
-    Reutiliza a lógica de alertas para fornecer uma contagem rápida e
-    formatada para o menu gerencial.
+    Contagem rápida e formatada dos alertas para o menu gerencial, a partir
+    da contagem agregada por Data Limite (mesmos critérios de
+    'classificar_os_para_alerta').
     """
-    alertas_classificados = classificar_os_para_alerta(df)
-    
-    df_vencidas = alertas_classificados["vencidas"]
-    df_hoje = alertas_classificados["vencendo_hoje"]
-    df_amanha = alertas_classificados["vencendo_amanha"]
-
-    total = len(df_vencidas) + len(df_hoje) + len(df_amanha)
+    alertas = agregados.contar_alertas_por_faixa(df)
+    total = alertas['vencidas'] + alertas['vencendo_hoje'] + alertas['vencendo_amanha']
     
     if total == 0:
         return "✅ *Situação dos Alertas de Vencimento*\n\nNenhuma OS de Anexo IV com vencimento próximo."
 
     resposta = "🚨 *Situação dos Alertas de Vencimento (Anexo IV)*\n\n"
-    resposta += f"🆘 *Vencidas:* {len(df_vencidas)}\n"
-    resposta += f"⚠️ *Vencendo Hoje:* {len(df_hoje)}\n"
-    resposta += f"🗓️ *Vencendo Amanhã (até 08h):* {len(df_amanha)}\n"
+    resposta += f"🆘 *Vencidas:* {alertas['vencidas']}\n"
+    resposta += f"⚠️ *Vencendo Hoje:* {alertas['vencendo_hoje']}\n"
+    resposta += f"🗓️ *Vencendo Amanhã (até 08h):* {alertas['vencendo_amanha']}\n"
     resposta += f"\n*Total de OS em Alerta:* {total}"
     
     return resposta
 
 
-def gerar_resumo_vencimentos_texto(df: pd.DataFrame, seccional: str) -> str:
+def gerar_resumo_vencimentos_texto(df: pd.DataFrame, filtro: FiltroConsulta) -> str:
     """
-    Filtra por Anexo IV e Seccional, classifica os vencimentos e retorna um resumo em TEXTO.
+    Filtra por Anexo IV e pelo filtro (ex.: Seccional), classifica os vencimentos e retorna um resumo em TEXTO.
     """
+    seccional = filtro.seccional or 'Todas'
     print(f"\nGerando resumo de vencimentos em TEXTO para a seccional: '{seccional}'...")
     
-    df_filtrado = df[df['Seccional'].str.strip().str.upper() == seccional.strip().upper()].copy()
-    
-    alertas = classificar_os_para_alerta(df_filtrado)
+    alertas = classificar_os_para_alerta(df, filtro)
     df_vencidas = alertas["vencidas"]
     df_hoje = alertas["vencendo_hoje"]
     df_amanha = alertas["vencendo_amanha"]
     
     total = len(df_vencidas) + len(df_hoje) + len(df_amanha)
+    seccional_texto = escapar_markdown(seccional.upper())
     if total == 0:
-        return f"✅ *Vencimentos Anexo IV - {seccional.upper()}*\n\nNenhuma OS com vencimento próximo encontrada."
+        return f"✅ *Vencimentos Anexo IV - {seccional_texto}*\n\nNenhuma OS com vencimento próximo encontrada."
 
-    resposta = f"🚨 *Vencimentos Anexo IV - {seccional.upper()}* 🚨\n"
-    
-    def formatar_bloco(df_bloco):
-        texto = ""
-        for _, os in df_bloco.iterrows():
-            texto += f"  - `{os['Instalação']}` (Equipe: {os['Recurso']})\n"
-            texto += f"    - *Tipo:* {os['Tipo de Atividade']}\n"
-            texto += f"    - *Status:* {os['Status da Atividade']}\n"
-            texto += f"    - *Cidade:* {os['Cidade']}\n"
-        return texto
+    resposta = f"🚨 *Vencimentos Anexo IV - {seccional_texto}* 🚨\n"
 
     if not df_vencidas.empty:
         resposta += "\n🆘 *VENCIDAS* 🆘\n"
-        resposta += formatar_bloco(df_vencidas)
+        resposta += renderizar_bloco(df_vencidas, MODELO_OS_VENCIMENTO)
             
     if not df_hoje.empty:
         resposta += "\n⚠️ *Vencendo AINDA HOJE* ⚠️\n"
-        resposta += formatar_bloco(df_hoje)
+        resposta += renderizar_bloco(df_hoje, MODELO_OS_VENCIMENTO)
 
     if not df_amanha.empty:
         resposta += "\n🗓️ *Vencendo AMANHÃ (até 08:00)* 🗓️\n"
-        resposta += formatar_bloco(df_amanha)
+        resposta += renderizar_bloco(df_amanha, MODELO_OS_VENCIMENTO)
             
     resposta += "\n-----------------------------------\n"
-    resposta += f"*Resumo Total para {seccional.upper()}:*\n"
+    resposta += f"*Resumo Total para {seccional_texto}:*\n"
     resposta += f"  - Vencidas: *{len(df_vencidas)}*\n"
     resposta += f"  - Vencendo Hoje: *{len(df_hoje)}*\n"
     resposta += f"  - Vencendo Amanhã: *{len(df_amanha)}*\n"
@@ -192,70 +193,77 @@ def gerar_resumo_vencimentos_texto(df: pd.DataFrame, seccional: str) -> str:
     return resposta
 
 
-def _haversine(lat1, lon1, lat2, lon2):
-    """Calcula a distância em km entre dois pontos geográficos."""
-    R = 6371
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
+def detectar_novos_alertas(df: pd.DataFrame, ids_anteriores: Dict[str, set],
+                           faixas: tuple = ('vencidas', 'vencendo_hoje')) -> tuple:
+    """
+    Compara as OS de Anexo IV em cada uma das 'faixas' com as da execução
+    anterior ('ids_anteriores': faixa -> números de OS). Retorna
+    (ids_atuais, novas): os números atuais por faixa, a guardar para a próxima
+    comparação, e as linhas só das OS que entraram em cada faixa. O custo
+    acompanha o tamanho das faixas (índice de alertas), não o da base.
+    """
+    posicoes_por_faixa = consulta.faixas_de_alerta(df)
+    ids_atuais, novas = {}, {}
+    for faixa in faixas:
+        posicoes = posicoes_por_faixa[faixa]
+        ids = df['Ordem de Serviço'].iloc[posicoes].astype(str).to_numpy()
+        ids_atuais[faixa] = set(ids)
+        anteriores = ids_anteriores.get(faixa, set())
+        entraram = np.fromiter((i not in anteriores for i in ids), dtype=bool, count=len(ids))
+        novas[faixa] = df.iloc[posicoes[entraram]]
+    return ids_atuais, novas
+
+
+def gerar_mensagem_novos_alertas(novas: Dict[str, pd.DataFrame], maximo_por_faixa: int = 30) -> str:
+    """Texto (Markdown) com as OS que acabaram de entrar em cada faixa de alerta."""
+    titulos = {'vencidas': "🆘 *Entraram em VENCIDAS*", 'vencendo_hoje': "⚠️ *Passaram a vencer HOJE*"}
+    resposta = "🔔 *Novos alertas de Anexo IV*\n"
+    for faixa, df_faixa in novas.items():
+        if df_faixa.empty:
+            continue
+        resposta += f"\n{titulos.get(faixa, faixa)} ({len(df_faixa)}):\n"
+        exibidas = df_faixa.head(maximo_por_faixa)
+        exibidas = exibidas.assign(Limite=exibidas['Data Limite'].dt.strftime('%d/%m %H:%M').fillna('N/A'))
+        resposta += renderizar_bloco(exibidas, MODELO_NOVO_ALERTA)
+        if len(df_faixa) > maximo_por_faixa:
+            resposta += f"  _... e mais {len(df_faixa) - maximo_por_faixa} OS (veja /anexo_iv)._\n"
+    return resposta
+
 
-def gerar_mapa_proximidade(df: pd.DataFrame, id_referencia: str) -> str:
+def gerar_mapa_proximidade(df: pd.DataFrame, id_referencia: str, k: int = K_PROXIMIDADE_PADRAO,
+                           raio_km: Optional[float] = None) -> str:
     """
-    Gera um mapa HTML mostrando as 3 equipes/serviços pendentes mais próximos
-    de uma OS ou Instalação de referência.
+    Gera um mapa HTML mostrando as 'k' equipes/serviços pendentes mais próximos
+    de uma OS ou Instalação de referência (opcionalmente, só até 'raio_km').
+    A busca usa a grade espacial dos pendentes do snapshot.
     """
     print(f"\nGerando mapa de proximidade para a referência: '{id_referencia}'...")
     
-    # --- ALTERAÇÃO APLICADA AQUI ---
-    
-    # 1. Limpa a entrada do usuário
+    # Busca pelo índice de OS/Instalação do snapshot (normalizado na montagem, sem alterar 'df')
     id_referencia_limpo = str(id_referencia).strip()
-
-    # 2. Normaliza as colunas de busca do DataFrame para garantir a correspondência
-    # Remove o '.0' de números que foram convertidos para float
-    df['Instalação_norm'] = df['Instalação'].astype(str).str.split('.').str[0]
-    df['OS_norm'] = df['Ordem de Serviço'].astype(str).str.strip()
-
-    # 3. Faz a busca usando as colunas normalizadas
-    df_ref = df[
-        (df['OS_norm'] == id_referencia_limpo) |
-        (df['Instalação_norm'] == id_referencia_limpo)
-    ].copy()
-
-    # --- Fim da Alteração ---
+    df_ref = df.iloc[localizar(df, id_referencia_limpo, campos=('os', 'instalacao'))]
 
     if df_ref.empty:
         return f"Referência '{id_referencia}' não encontrada na base de dados."
     
     servico_ref = df_ref.iloc[0]
-    lat_ref = pd.to_numeric(servico_ref['Latitude'], errors='coerce')
-    lon_ref = pd.to_numeric(servico_ref['Longitude'], errors='coerce')
+    lat_ref = servico_ref['Latitude']
+    lon_ref = servico_ref['Longitude']
 
     if pd.isna(lat_ref) or pd.isna(lon_ref):
         return f"A referência '{id_referencia}' não possui coordenadas geográficas válidas."
 
-    status_pendentes = ['deslocamento', 'pendente', 'iniciado']
-    df_candidatos = df[
-        (df['Status da Atividade'].str.lower().isin(status_pendentes)) &
-        (df['Ordem de Serviço'] != servico_ref['Ordem de Serviço'])
-    ].copy()
-    
-    df_candidatos['Latitude'] = pd.to_numeric(df_candidatos['Latitude'], errors='coerce')
-    df_candidatos['Longitude'] = pd.to_numeric(df_candidatos['Longitude'], errors='coerce')
-    df_candidatos.dropna(subset=['Latitude', 'Longitude'], inplace=True)
+    # Candidatos: pendentes com coordenadas, exceto a própria OS de referência
+    grade = espacial.obter_indice(df, espacial.INDICE_PENDENTES)
+    excluir = localizar(df, str(servico_ref['Ordem de Serviço']), campos=('os',))
+    posicoes, distancias = espacial.vizinhos_mais_proximos(grade, lat_ref, lon_ref, k, raio_km=raio_km, excluir=excluir)
 
-    if df_candidatos.empty:
+    if len(posicoes) == 0:
+        if raio_km is not None:
+            return f"Nenhum outro serviço pendente com coordenadas encontrado num raio de {raio_km:g} km."
         return f"Nenhum outro serviço pendente com coordenadas encontrado para comparação."
 
-    df_candidatos['Distancia_km'] = df_candidatos.apply(
-        lambda row: _haversine(lat_ref, lon_ref, row['Latitude'], row['Longitude']),
-        axis=1
-    )
-    
-    df_proximos = df_candidatos.sort_values(by='Distancia_km').head(3)
+    df_proximos = df.iloc[posicoes].assign(Distancia_km=distancias)
 
     mapa = folium.Map(location=[lat_ref, lon_ref], zoom_start=12)
     
@@ -299,4 +307,90 @@ def gerar_mapa_proximidade(df: pd.DataFrame, id_referencia: str) -> str:
         html_content = f.read()
     os.remove(map_html_path)
     
-    return html_content
\ No newline at end of file
+    return html_content
+
+
+def gerar_resposta_equipes_proximas(df: pd.DataFrame, latitude: float, longitude: float,
+                                    k: int = K_EQUIPES_PADRAO, descricao_referencia: str = "sua localização") -> str:
+    """
+    Lista em TEXTO as 'k' equipes cuja última posição conhecida (atividade
+    iniciada/concluída mais recente) está mais perto do ponto, com a
+    distância e o status atual de cada uma.
+    """
+    equipes = espacial.equipes_mais_proximas(df, latitude, longitude, k)
+    if equipes.empty:
+        return "Nenhuma equipe com posição conhecida na base de dados."
+
+    status_atual = equipes['Status Atual'].astype(object)
+    status_texto = status_atual.astype(str) + " (" + equipes['Atividade Atual'].astype(object).astype(str) + ")"
+    equipes = equipes.assign(**{
+        'Ordem': np.arange(1, len(equipes) + 1),
+        'Status Texto': status_texto.where(status_atual.notna(), "sem atividade iniciada"),
+        'Posicao Texto': equipes['Posicao_Em'].dt.strftime('%d/%m %H:%M'),
+    })
+    resposta = f"🚚 *Equipes mais próximas de {descricao_referencia}*\n"
+    return resposta + renderizar_bloco(equipes, MODELO_EQUIPE_PROXIMA)
+
+
+def gerar_resposta_equipes_proximas_da_os(df: pd.DataFrame, id_referencia: str, k: int = K_EQUIPES_PADRAO) -> str:
+    """Como 'gerar_resposta_equipes_proximas', tomando como ponto as coordenadas de uma OS ou Instalação."""
+    id_referencia_limpo = str(id_referencia).strip()
+    df_ref = df.iloc[localizar(df, id_referencia_limpo, campos=('os', 'instalacao'))]
+    if df_ref.empty:
+        return f"Referência '{escapar_markdown(id_referencia_limpo)}' não encontrada na base de dados."
+    servico_ref = df_ref.iloc[0]
+    if pd.isna(servico_ref['Latitude']) or pd.isna(servico_ref['Longitude']):
+        return f"A referência '{escapar_markdown(id_referencia_limpo)}' não possui coordenadas geográficas válidas."
+    return gerar_resposta_equipes_proximas(df, servico_ref['Latitude'], servico_ref['Longitude'], k,
+                                           descricao_referencia=f"OS `{proteger_em_entidade(servico_ref['Ordem de Serviço'], '`')}`")
+
+
+
+def sugerir_equipes_para_alertas(df: pd.DataFrame, filtro: Optional[FiltroConsulta] = None,
+                                 k: int = K_SUGESTOES_LOTE) -> pd.DataFrame:
+    """
+    Para todas as OS de Anexo IV vencidas e vencendo hoje (ver
+    'classificar_os_para_alerta'), as 'k' equipes disponíveis mais próximas
+    pela última posição conhecida. As distâncias de todas as OS a todas as
+    equipes são calculadas de uma vez (matriz em blocos), não OS a OS.
+    """
+    alertas = classificar_os_para_alerta(df, filtro)
+    ordens = pd.concat([
+        alertas['vencidas'].assign(Faixa='Vencida'),
+        alertas['vencendo_hoje'].assign(Faixa='Vence hoje'),
+    ], ignore_index=True)
+
+    equipes = espacial.obter_indice(df, espacial.INDICE_EQUIPES)['equipes']
+    ocupadas = equipes['Status Atual'].astype(str).str.strip().str.lower().isin(espacial.STATUS_EQUIPE_OCUPADA)
+    disponiveis = equipes[~ocupadas.to_numpy()].reset_index(drop=True)
+
+    indices, distancias = espacial.mais_proximos_em_lote(
+        ordens['Latitude'], ordens['Longitude'], disponiveis['Latitude'], disponiveis['Longitude'], k
+    )
+
+    sugestoes = ordens[['Faixa', 'Ordem de Serviço', 'Instalação', 'Tipo de Atividade', 'Data Limite',
+                        'Seccional', 'Cidade', 'Recurso']].rename(columns={'Recurso': 'Equipe Atual'})
+    recursos = disponiveis['Recurso'].to_numpy(dtype=object)
+    for i in range(k):
+        encontrada = indices[:, i] >= 0
+        sugestoes[f'Sugestão {i + 1}'] = np.where(encontrada, recursos[indices[:, i]] if len(recursos) else None, None)
+        sugestoes[f'Distância {i + 1} (km)'] = np.round(distancias[:, i], 2)
+    print(f"  - Sugestões calculadas para {len(sugestoes)} OS e {len(disponiveis)} equipes disponíveis.")
+    return sugestoes
+
+
+def gerar_relatorio_sugestoes_html(sugestoes: pd.DataFrame, filtro: Optional[FiltroConsulta] = None) -> str:
+    """Tabela HTML das sugestões de equipe de 'sugerir_equipes_para_alertas'."""
+    seccional = filtro.seccional if filtro else None
+    titulo = "Sugestão de Equipes - Anexo IV"
+    if sugestoes.empty:
+        return gerar_html_base(titulo, f"<h2>{titulo} - {seccional or 'Todas'}</h2><p>Nenhuma OS de Anexo IV vencida ou vencendo hoje.</p>")
+
+    agora = datetime.now(ZoneInfo("America/Sao_Paulo"))
+    conteudo = f"<h2>{titulo}</h2>"
+    conteudo += f"<h4>Seccional: {seccional or 'Todas'}</h4>"
+    conteudo += f"<h4>Gerado em: {agora.strftime('%d/%m/%Y %H:%M:%S')}</h4>"
+    conteudo += "<p>Equipes disponíveis (fora de deslocamento/execução) mais próximas de cada OS, pela última posição conhecida.</p>"
+    formatters = {'Data Limite': lambda x: x.strftime('%d/%m/%Y %H:%M') if pd.notna(x) else ''}
+    conteudo += sugestoes.to_html(index=False, classes='table', border=1, formatters=formatters, na_rep='-')
+    return gerar_html_base(titulo, conteudo)
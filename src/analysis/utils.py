@@ -1,4 +1,23 @@
+import numpy as np
 import pandas as pd
+from typing import Callable
+
+# Colunas derivadas gravadas pelo ETL em cada snapshot (ver 'adicionar_colunas_derivadas').
+# A camada de análise filtra por elas em vez de refazer strip/upper/lower a cada consulta.
+ATIVIDADES_NAO_PRODUTIVAS = ["Intervalo para almoço", "Indisponibilidade"]
+STATUS_CONCLUIDO = ['concluído']
+STATUS_NAO_CONCLUIDO = ['não concluído']
+STATUS_PENDENTES = ['deslocamento', 'pendente', 'iniciado']
+CATEGORIAS_STATUS = ['Cancelado', 'Concluído', 'Não Concluído', 'Pendentes']  # ordem alfabética, como nas tabelas dinâmicas
+COLUNAS_NORMALIZADAS = {
+    'Seccional': 'seccional_norm',
+    'Seccional_Equipe': 'seccional_equipe_norm',
+    'Processo': 'processo_norm',
+}
+COLUNAS_DERIVADAS = [
+    'status_norm', 'categoria_status', *COLUNAS_NORMALIZADAS.values(),
+    'is_produtivo', 'is_equipe_rs', 'is_pendente',
+]
 
 def gerar_html_base(titulo: str, conteudo_body: str) -> str:
     """
@@ -33,19 +52,83 @@ def gerar_html_base(titulo: str, conteudo_body: str) -> str:
     </html>
     """
 
+def normalizar_chave(valor: str) -> str:
+    """Chave de comparação de seccional/processo: sem espaços nas bordas e em maiúsculas."""
+    return str(valor).strip().upper()
+
+
+def _como_categoria(serie: pd.Series) -> pd.Series:
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    return serie.astype('category')
+
+
+def _mapear_categorias(serie: pd.Series, funcao: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """
+    Aplica 'funcao' (texto -> texto) só às categorias distintas de 'serie' e
+    devolve uma coluna 'category' com o resultado; nulos continuam nulos.
+    """
+    serie = _como_categoria(serie)
+    novos_valores = funcao(serie.cat.categories.to_series(index=None).astype(str))
+    codigos_novos, categorias_novas = pd.factorize(novos_valores, use_na_sentinel=True)
+    # Código -1 (nulo) da coluna original cai no -1 acrescentado ao fim
+    codigos = np.append(codigos_novos, -1)[serie.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=categorias_novas), index=serie.index)
+
+
+def _marcar_categorias(serie: pd.Series, funcao: Callable[[pd.Series], np.ndarray]) -> pd.Series:
+    """Avalia 'funcao' (texto -> bool) por categoria distinta; nulos ficam False."""
+    serie = _como_categoria(serie)
+    por_categoria = np.asarray(funcao(serie.cat.categories.to_series(index=None).astype(str)), dtype=bool)
+    return pd.Series(np.append(por_categoria, False)[serie.cat.codes.to_numpy()], index=serie.index)
+
+
+def adicionar_colunas_derivadas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Acrescenta as colunas derivadas usadas pelos relatórios, calculadas uma vez
+    por snapshot (no ETL, ou ao carregar uma base antiga sem elas):
+      - 'status_norm': status sem espaços nas bordas e em minúsculas
+      - 'categoria_status': Concluído / Não Concluído / Pendentes / Cancelado
+      - 'seccional_norm', 'seccional_equipe_norm', 'processo_norm': chaves de filtro
+      - 'is_produtivo': fora das atividades não produtivas (almoço, indisponibilidade)
+      - 'is_equipe_rs': recurso de equipe 'RS-'
+      - 'is_pendente': status de deslocamento, pendente ou iniciado
+    O texto é tratado por categoria distinta, não por linha.
+    """
+    status_norm = _mapear_categorias(df['Status da Atividade'], lambda s: s.str.strip().str.lower())
+    df['status_norm'] = status_norm
+
+    categoria = pd.Series('Cancelado', index=status_norm.cat.categories)
+    categoria[categoria.index.isin(STATUS_CONCLUIDO)] = 'Concluído'
+    categoria[categoria.index.isin(STATUS_NAO_CONCLUIDO)] = 'Não Concluído'
+    categoria[categoria.index.isin(STATUS_PENDENTES)] = 'Pendentes'
+    codigos = np.append(pd.Categorical(categoria, categories=CATEGORIAS_STATUS).codes, -1)
+    df['categoria_status'] = pd.Categorical.from_codes(
+        codigos[status_norm.cat.codes.to_numpy()], categories=CATEGORIAS_STATUS
+    )
+
+    for coluna, coluna_norm in COLUNAS_NORMALIZADAS.items():
+        if coluna in df.columns:
+            df[coluna_norm] = _mapear_categorias(df[coluna], lambda s: s.str.strip().str.upper())
+
+    df['is_produtivo'] = ~_marcar_categorias(df['Tipo de Atividade'], lambda s: s.isin(ATIVIDADES_NAO_PRODUTIVAS))
+    df['is_equipe_rs'] = _marcar_categorias(df['Recurso'], lambda s: s.str.startswith('RS-'))
+    df['is_pendente'] = status_norm.isin(STATUS_PENDENTES).to_numpy()
+    return df
+
+
 def categorizar_status(df: pd.DataFrame) -> pd.DataFrame:
-    """Função auxiliar centralizada para categorizar os status das atividades."""
+    """
+    Função auxiliar centralizada para categorizar os status das atividades.
+    Bases do snapshot já trazem a 'categoria_status' gravada pelo ETL; as
+    demais (ex.: tabelas agregadas) recebem a coluna aqui.
+    """
+    if 'categoria_status' in df.columns:
+        return df
     df_categorizado = df.copy()
-    status_concluido = ['concluído']
-    status_nao_concluido = ['não concluído']
-    status_pendentes = ['deslocamento', 'pendente', 'iniciado']
-    df_lower_status = df_categorizado['Status da Atividade'].str.lower()
-    
-    # Renomeia a categoria 'Outros' para 'Cancelado'
+    status = _mapear_categorias(df_categorizado['Status da Atividade'], lambda s: s.str.strip().str.lower())
     df_categorizado['categoria_status'] = 'Cancelado'
-    df_categorizado.loc[df_lower_status.isin(status_concluido), 'categoria_status'] = 'Concluído'
-    df_categorizado.loc[df_lower_status.isin(status_nao_concluido), 'categoria_status'] = 'Não Concluído'
-    df_categorizado.loc[df_lower_status.isin(status_pendentes), 'categoria_status'] = 'Pendentes'
-    
-    categorias_relevantes = ['Concluído', 'Não Concluído', 'Pendentes', 'Cancelado']
-    return df_categorizado[df_categorizado['categoria_status'].isin(categorias_relevantes)]
\ No newline at end of file
+    df_categorizado.loc[status.isin(STATUS_CONCLUIDO).to_numpy(), 'categoria_status'] = 'Concluído'
+    df_categorizado.loc[status.isin(STATUS_NAO_CONCLUIDO).to_numpy(), 'categoria_status'] = 'Não Concluído'
+    df_categorizado.loc[status.isin(STATUS_PENDENTES).to_numpy(), 'categoria_status'] = 'Pendentes'
+    return df_categorizado
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+from typing import Dict, Optional
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+
+# Garante que os módulos da pasta 'analysis' possam ser importados
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis import data_loader, mappings, servicos
+from etl.publicacao import gravar_atomicamente
+from bot import envio
+
+logger = logging.getLogger(__name__)
+
+# Números das OS já notificadas em cada faixa, da última execução (sobrevive a reinícios do bot)
+CAMINHO_ESTADO_ALERTAS = os.path.join(data_loader.CAMINHO_DATA, "alertas_anexo_iv_enviados.json")
+FAIXAS_NOTIFICADAS = ('vencidas', 'vencendo_hoje')
+# Chave de MAPEAMENTO_ALERTAS_SECCIONAL cujos destinatários recebem todas as seccionais
+CHAVE_TODAS_SECCIONAIS = 'GERAL'
+
+
+def ler_estado() -> Optional[dict]:
+    """Estado gravado pela execução anterior, ou None se ainda não houver."""
+    if not os.path.exists(CAMINHO_ESTADO_ALERTAS):
+        return None
+    try:
+        with open(CAMINHO_ESTADO_ALERTAS, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Estado dos alertas ilegível ({e}); será recriado sem enviar notificações.")
+        return None
+
+
+def gravar_estado(snapshot_id: Optional[str], ids_por_faixa: Dict[str, set]):
+    """Grava (atomicamente) as OS de cada faixa para a próxima comparação."""
+    estado = {'snapshot_id': snapshot_id, 'ids': {faixa: sorted(ids) for faixa, ids in ids_por_faixa.items()}}
+
+    def _escrever(caminho: str):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False)
+
+    gravar_atomicamente(CAMINHO_ESTADO_ALERTAS, _escrever)
+
+
+def seccionais_por_destinatario() -> Dict[str, Optional[set]]:
+    """chat_id -> seccionais (normalizadas) que ele acompanha; None = todas."""
+    destinatarios: Dict[str, Optional[set]] = {}
+    for seccional, chat_ids in mappings.MAPEAMENTO_ALERTAS_SECCIONAL.items():
+        for chat_id in chat_ids:
+            if seccional.strip().upper() == CHAVE_TODAS_SECCIONAIS:
+                destinatarios[chat_id] = None
+            elif destinatarios.get(chat_id, set()) is not None:
+                destinatarios.setdefault(chat_id, set()).add(seccional.strip().upper())
+    return destinatarios
+
+
+def _calcular_envios() -> Dict[str, str]:
+    """
+    Compara as faixas de alerta do snapshot atual com o estado gravado, grava
+    o novo estado e devolve chat_id -> mensagem só com as OS novas das
+    seccionais de cada destinatário. Sem estado anterior, só grava a base.
+    """
+    df = data_loader.carregar_dados()
+    if df.empty:
+        return {}
+    estado = ler_estado()
+    anteriores = {faixa: set(ids) for faixa, ids in (estado or {}).get('ids', {}).items()}
+    ids_atuais, novas = servicos.detectar_novos_alertas(df, anteriores, FAIXAS_NOTIFICADAS)
+    gravar_estado(data_loader.identificar_snapshot(df), ids_atuais)
+
+    if estado is None:
+        logger.info("Alertas de Anexo IV: primeira execução, estado inicial gravado sem notificações.")
+        return {}
+    if all(df_faixa.empty for df_faixa in novas.values()):
+        return {}
+
+    envios = {}
+    for chat_id, seccionais in seccionais_por_destinatario().items():
+        if seccionais is None:
+            novas_do_chat = novas
+        else:
+            novas_do_chat = {faixa: df_faixa[df_faixa['seccional_norm'].isin(seccionais).to_numpy()]
+                             for faixa, df_faixa in novas.items()}
+        if any(not df_faixa.empty for df_faixa in novas_do_chat.values()):
+            envios[chat_id] = servicos.gerar_mensagem_novos_alertas(novas_do_chat)
+    return envios
+
+
+async def enviar_novos_alertas(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Job executado após cada troca de snapshot: envia aos destinatários de
+    MAPEAMENTO_ALERTAS_SECCIONAL as OS de Anexo IV que entraram nas faixas
+    'vencidas' e 'vencendo hoje' desde a execução anterior.
+    """
+    try:
+        envios = await asyncio.to_thread(_calcular_envios)
+    except Exception as e:
+        logger.error(f"Falha ao calcular os novos alertas de Anexo IV: {e}")
+        return
+
+    # Cada chat tem a sua fila no envio compartilhado: os destinatários recebem em paralelo
+    resultados = await asyncio.gather(
+        *(envio.enviar_texto(context.bot, chat_id, mensagem, parse_mode=ParseMode.MARKDOWN)
+          for chat_id, mensagem in envios.items()),
+        return_exceptions=True,
+    )
+    for chat_id, resultado in zip(envios, resultados):
+        if isinstance(resultado, Exception):
+            logger.error(f"Falha ao enviar alertas de Anexo IV para {chat_id}: {resultado}")
+    if envios:
+        logger.info(f"Alertas de Anexo IV enviados para {len(envios)} destinatário(s).")
@@ -15,6 +15,8 @@ finally:
 
 from analysis.data_loader import carregar_dados
 from analysis import servicos
+from analysis.consulta import FiltroConsulta
+from bot import envio
 
 COMMAND_NAME = "anexo_iv"
 
@@ -29,6 +31,7 @@ async def start_anexo_iv(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         [InlineKeyboardButton("SUL", callback_data="anexo_seccional:SUL")],
         [InlineKeyboardButton("LITORAL SUL", callback_data="anexo_seccional:LITORAL SUL")],
         [InlineKeyboardButton("TODAS (Arquivo HTML)", callback_data="anexo_seccional:TODAS")],
+        [InlineKeyboardButton("SUGERIR EQUIPES (vencidas e hoje)", callback_data="anexo_sugestoes")],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text("🔎 Escolha uma seccional para o resumo de vencimentos de Anexo IV, ou 'TODAS' para o relatório completo:", reply_markup=reply_markup)
@@ -50,7 +53,7 @@ async def generate_and_send_report(update: Update, context: ContextTypes.DEFAULT
         # --- LÓGICA CONDICIONAL APLICADA AQUI ---
         if seccional_escolhida.upper() == 'TODAS':
             # Gera e envia o arquivo HTML completo
-            relatorio_html = servicos.gerar_relatorio_vencimentos_anexo_iv(df, seccional=None)
+            relatorio_html = servicos.gerar_relatorio_vencimentos_anexo_iv(df)
             
             caminho_raiz_projeto = os.path.dirname(os.path.dirname(caminho_src))
             caminho_data = os.path.join(caminho_raiz_projeto, "Data")
@@ -64,8 +67,9 @@ async def generate_and_send_report(update: Update, context: ContextTypes.DEFAULT
                 await context.bot.send_document(chat_id=chat_id, document=relatorio_file)
         else:
             # Gera e envia a mensagem de texto resumida
-            resposta_texto = servicos.gerar_resumo_vencimentos_texto(df, seccional=seccional_escolhida)
-            await context.bot.send_message(chat_id=chat_id, text=resposta_texto, parse_mode=ParseMode.MARKDOWN)
+            resposta_texto = servicos.gerar_resumo_vencimentos_texto(df, FiltroConsulta(seccional=seccional_escolhida))
+            # Em dias cheios o resumo passa do limite do Telegram: o envio divide em partes
+            envio.agendar_texto(update, context, resposta_texto, parse_mode=ParseMode.MARKDOWN)
         
         # Apaga a mensagem do menu ("Gerando relatório...")
         await query.delete_message()
@@ -75,6 +79,39 @@ async def generate_and_send_report(update: Update, context: ContextTypes.DEFAULT
         
     return ConversationHandler.END
 
+async def generate_and_send_suggestions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Envia a tabela de equipes sugeridas para as OS vencidas e vencendo hoje (HTML e CSV)."""
+    query = update.callback_query
+    await query.answer()
+    chat_id = update.effective_chat.id
+
+    await query.edit_message_text(text="Calculando as equipes mais próximas das OS vencidas e vencendo hoje, por favor aguarde...")
+
+    try:
+        df = carregar_dados()
+        sugestoes = servicos.sugerir_equipes_para_alertas(df)
+
+        caminho_raiz_projeto = os.path.dirname(os.path.dirname(caminho_src))
+        caminho_data = os.path.join(caminho_raiz_projeto, "Data")
+        caminho_html = os.path.join(caminho_data, "sugestoes_equipes_anexo_iv.html")
+        caminho_csv = os.path.join(caminho_data, "sugestoes_equipes_anexo_iv.csv")
+
+        with open(caminho_html, 'w', encoding='utf-8') as f:
+            f.write(servicos.gerar_relatorio_sugestoes_html(sugestoes))
+        sugestoes.to_csv(caminho_csv, index=False, sep=';', decimal=',', encoding='utf-8-sig')
+
+        await context.bot.send_message(chat_id=chat_id, text=f"Sugestões para {len(sugestoes)} OS prontas! 👇")
+        for caminho in (caminho_html, caminho_csv):
+            with open(caminho, 'rb') as arquivo:
+                await context.bot.send_document(chat_id=chat_id, document=arquivo)
+
+        await query.delete_message()
+
+    except Exception as e:
+        await context.bot.send_message(chat_id=chat_id, text=f"Ocorreu um erro ao gerar as sugestões: {e}")
+
+    return ConversationHandler.END
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancela a operação."""
     query = update.callback_query
@@ -87,7 +124,10 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 handler = ConversationHandler(
     entry_points=[CommandHandler(COMMAND_NAME, start_anexo_iv)],
     states={
-        SELECTING_SECCIONAL: [CallbackQueryHandler(generate_and_send_report, pattern="^anexo_seccional:")],
+        SELECTING_SECCIONAL: [
+            CallbackQueryHandler(generate_and_send_report, pattern="^anexo_seccional:"),
+            CallbackQueryHandler(generate_and_send_suggestions, pattern="^anexo_sugestoes$"),
+        ],
     },
     fallbacks=[CommandHandler("cancel", cancel)],
     per_message=False
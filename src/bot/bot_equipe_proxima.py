@@ -0,0 +1,82 @@
+from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.ext import ContextTypes, CommandHandler, MessageHandler, ConversationHandler, filters
+from telegram.constants import ParseMode
+import os
+import sys
+from logging_utils import log_command
+
+# Garante que os módulos da pasta 'analysis' possam ser importados
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis.data_loader import carregar_dados
+from analysis import servicos
+from bot import envio
+
+COMMAND_NAME = "equipe_proxima"
+
+AGUARDANDO_REFERENCIA = 0
+
+async def start_equipe_proxima(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Equipes mais próximas de uma localização ou OS."""
+    log_command(update)
+
+    # Atalho: '/equipe_proxima 12345678' responde direto, sem perguntar
+    if context.args:
+        await responder_por_os(update, context, context.args[0])
+        return ConversationHandler.END
+
+    teclado = ReplyKeyboardMarkup(
+        [[KeyboardButton("📍 Enviar minha localização", request_location=True)]],
+        one_time_keyboard=True, resize_keyboard=True
+    )
+    await update.message.reply_text(
+        "🚚 Envie uma localização (📎 > Localização) ou digite o número da OS/Instalação "
+        "para ver as equipes mais próximas. Use /cancel para sair.",
+        reply_markup=teclado
+    )
+    return AGUARDANDO_REFERENCIA
+
+async def responder_por_localizacao(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Recebe uma localização do Telegram e lista as equipes mais próximas dela."""
+    localizacao = update.message.location
+    try:
+        df = carregar_dados()
+        resposta = servicos.gerar_resposta_equipes_proximas(df, localizacao.latitude, localizacao.longitude)
+        envio.agendar_texto(update, context, resposta, parse_mode=ParseMode.MARKDOWN, reply_markup=ReplyKeyboardRemove())
+    except Exception as e:
+        await update.message.reply_text(f"Ocorreu um erro ao buscar as equipes: {e}", reply_markup=ReplyKeyboardRemove())
+    return ConversationHandler.END
+
+async def responder_por_texto(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Recebe o número de uma OS/Instalação e lista as equipes mais próximas dela."""
+    await responder_por_os(update, context, update.message.text)
+    return ConversationHandler.END
+
+async def responder_por_os(update: Update, context: ContextTypes.DEFAULT_TYPE, id_referencia: str):
+    try:
+        df = carregar_dados()
+        resposta = servicos.gerar_resposta_equipes_proximas_da_os(df, id_referencia)
+        envio.agendar_texto(update, context, resposta, parse_mode=ParseMode.MARKDOWN, reply_markup=ReplyKeyboardRemove())
+    except Exception as e:
+        await update.message.reply_text(f"Ocorreu um erro ao buscar as equipes: {e}", reply_markup=ReplyKeyboardRemove())
+
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Cancela a operação."""
+    await update.message.reply_text(text="Operação cancelada.", reply_markup=ReplyKeyboardRemove())
+    return ConversationHandler.END
+
+handler = ConversationHandler(
+    entry_points=[CommandHandler(COMMAND_NAME, start_equipe_proxima)],
+    states={
+        AGUARDANDO_REFERENCIA: [
+            MessageHandler(filters.LOCATION, responder_por_localizacao),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, responder_por_texto),
+        ],
+    },
+    fallbacks=[CommandHandler("cancel", cancel)],
+)
@@ -16,6 +16,8 @@ finally:
 
 from analysis.data_loader import carregar_dados
 from analysis import inconsistencias
+from analysis.renderizacao import renderizar_bloco
+from bot import envio
 
 COMMAND_NAME = "inconsistencias"
 
@@ -29,15 +31,16 @@ def _formatar_inconsistencias_texto(df_resultado: pd.DataFrame, titulo: str) ->
     resposta = f"\n*{titulo} ({len(df_resultado)} encontrada(s)):*\n"
     resposta += "-----------------------------------\n"
     
-    for _, linha in df_resultado.iterrows():
-        resposta += f"  - *OS:* `{linha['Ordem de Serviço']}`\n"
-        resposta += f"    - *Equipe:* {linha['Recurso']}\n"
-        resposta += f"    - *Cidade:* {linha['Cidade']}\n"
-        resposta += f"    - *Tipo de OS:* {linha['Tipo de Atividade']}\n"
-        # Mostra os campos problemáticos
-        if 'Observação' in linha:
-            resposta += f"    - *Observação:* _{linha['Observação']}_\n"
-        resposta += "\n"
+    modelo = (
+        "  - *OS:* `{Ordem de Serviço}`\n"
+        "    - *Equipe:* {Recurso}\n"
+        "    - *Cidade:* {Cidade}\n"
+        "    - *Tipo de OS:* {Tipo de Atividade}\n"
+    )
+    # Mostra os campos problemáticos
+    if 'Observação' in df_resultado.columns:
+        modelo += "    - *Observação:* _{Observação}_\n"
+    resposta += renderizar_bloco(df_resultado, modelo + "\n")
         
     return resposta
 
@@ -85,8 +88,8 @@ async def send_inconsistency_report(update: Update, context: ContextTypes.DEFAUL
 
         # Apaga a mensagem do menu ("Executando verificação...")
         await query.delete_message()
-        # Envia a resposta final como uma nova mensagem
-        await context.bot.send_message(chat_id=chat_id, text=resposta_final, parse_mode=ParseMode.MARKDOWN)
+        # Envia a resposta final como uma nova mensagem (dividida em partes se passar do limite do Telegram)
+        envio.agendar_texto(update, context, resposta_final, parse_mode=ParseMode.MARKDOWN)
             
     except Exception as e:
         await context.bot.send_message(chat_id=chat_id, text=f"Ocorreu um erro ao gerar o relatório: {e}")
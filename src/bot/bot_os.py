@@ -0,0 +1,48 @@
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from telegram.constants import ParseMode
+import os
+import sys
+from logging_utils import log_command
+
+# Garante que os módulos da pasta 'analysis' possam ser importados
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis.data_loader import carregar_dados
+from analysis import servicos
+from bot import envio
+
+COMMAND_NAME = "os"
+
+async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Consulta uma Ordem de Serviço pelo número
+    """
+    log_command(update)
+    chat_id = update.effective_chat.id
+
+    if not context.args:
+        await update.message.reply_text("Por favor, forneça o número da OS.\nExemplo: `/os 12345678`", parse_mode='Markdown')
+        return
+
+    numero_os = context.args[0]
+    try:
+        df = carregar_dados()
+        if df.empty:
+            await context.bot.send_message(chat_id=chat_id, text="A base de dados não pôde ser carregada.")
+            return
+
+        # A busca usa o índice de OS do snapshot (acesso direto, sem varrer a base)
+        resposta = servicos.buscar_ordem_servico(df, numero_os)
+        envio.agendar_texto(update, context, resposta, parse_mode=ParseMode.MARKDOWN)
+
+    except Exception as e:
+        await context.bot.send_message(chat_id=chat_id, text=f"Ocorreu um erro ao buscar a OS: {e}")
+
+# Exporta o handler para que o main.py possa registrá-lo
+handler = CommandHandler(COMMAND_NAME, command_handler)
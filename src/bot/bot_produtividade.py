@@ -20,6 +20,8 @@ finally:
 
 from analysis.data_loader import carregar_dados
 from analysis import produtividade
+from analysis.consulta import FiltroConsulta
+from bot import envio
 
 COMMAND_NAME = "produtividade"
 
@@ -82,7 +84,8 @@ async def show_team_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     seccional_filtro = None if seccional_escolhida.upper() == 'TODAS' else seccional_escolhida
     processo_filtro = None if processo_escolhido.upper() == 'TODOS' else processo_escolhido
     
-    lista_equipes = produtividade.obter_equipes_por_filtro(df, seccional_filtro, processo_filtro)
+    filtro = FiltroConsulta(seccional_equipe=seccional_filtro, processo=processo_filtro)
+    lista_equipes = produtividade.obter_equipes_por_filtro(df, filtro)
 
     if not lista_equipes:
         await query.edit_message_text(text="Nenhuma equipe encontrada para os filtros selecionados.")
@@ -111,23 +114,10 @@ async def show_team_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
     return SELECTING_EQUIPE
 
-async def generate_team_report_and_map(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Recebe a equipe, gera o resumo em texto E o mapa, e envia ambos."""
-    query = update.callback_query
-    await query.answer()
-    
-    equipe_escolhida = query.data.split(':')[1]
-    await query.edit_message_text(text=f"Gerando resumo e mapa para a equipe `{equipe_escolhida}`...", parse_mode='Markdown')
+async def _enviar_resumo_e_mapa(bot, chat_id: int, equipe_escolhida: str, resposta_texto: str, mapa_html) -> None:
+    """Envia o resumo pela fila do chat e, depois dele, o mapa da equipe."""
+    await envio.enviar_texto(bot, chat_id, resposta_texto, parse_mode=ParseMode.MARKDOWN)
 
-    df = carregar_dados()
-    
-    # Gera e envia o resumo em texto
-    resposta_texto = produtividade.gerar_resumo_por_equipe(df, equipe_escolhida)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=resposta_texto, parse_mode=ParseMode.MARKDOWN)
-    
-    # Gera o mapa
-    mapa_html = produtividade.gerar_mapa_por_equipe_html(df, equipe_escolhida)
-    
     if mapa_html:
         caminho_raiz_projeto = os.path.dirname(os.path.dirname(caminho_src))
         caminho_data = os.path.join(caminho_raiz_projeto, "Data")
@@ -135,13 +125,33 @@ async def generate_team_report_and_map(update: Update, context: ContextTypes.DEF
         
         with open(caminho_saida_mapa, 'w', encoding='utf-8') as f: f.write(mapa_html)
             
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Localização das atividades da equipe no mapa: 👇")
+        await bot.send_message(chat_id=chat_id, text="Localização das atividades da equipe no mapa: 👇")
         with open(caminho_saida_mapa, 'rb') as mapa_file:
-            await context.bot.send_document(chat_id=update.effective_chat.id, document=mapa_file)
+            await bot.send_document(chat_id=chat_id, document=mapa_file)
         
         os.remove(caminho_saida_mapa)
     else:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="_Nenhuma atividade com coordenadas encontradas para esta equipe._", parse_mode=ParseMode.MARKDOWN)
+        await bot.send_message(chat_id=chat_id, text="_Nenhuma atividade com coordenadas encontradas para esta equipe._", parse_mode=ParseMode.MARKDOWN)
+
+async def generate_team_report_and_map(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Recebe a equipe, gera o resumo em texto E o mapa, e envia ambos."""
+    query = update.callback_query
+    await query.answer()
+    
+    equipe_escolhida = query.data.split(':')[1]
+    await query.edit_message_text(text=f"Gerando resumo e mapa para a equipe `{equipe_escolhida}`...", parse_mode='Markdown')
+
+    df = carregar_dados()
+    
+    # Gera o resumo em texto e o mapa
+    resposta_texto = produtividade.gerar_resumo_por_equipe(df, equipe_escolhida)
+    mapa_html = produtividade.gerar_mapa_por_equipe_html(df, equipe_escolhida)
+
+    # O envio (resumo e, em seguida, o mapa) segue em segundo plano, sem segurar os outros chats
+    context.application.create_task(
+        _enviar_resumo_e_mapa(context.bot, update.effective_chat.id, equipe_escolhida, resposta_texto, mapa_html),
+        update=update,
+    )
         
     context.user_data.clear()
     return ConversationHandler.END
@@ -162,7 +172,8 @@ async def generate_summary_html_report(update: Update, context: ContextTypes.DEF
         seccional_filtro = None if seccional == 'TODAS' else seccional
         processo_filtro = None if processo == 'TODOS' else processo
 
-        relatorio_html = produtividade.gerar_relatorio_principal_html(df, seccional=seccional_filtro, processo=processo_filtro)
+        filtro = FiltroConsulta(seccional=seccional_filtro, processo=processo_filtro)
+        relatorio_html = produtividade.gerar_relatorio_principal_html(df, filtro)
         
         caminho_raiz_projeto = os.path.dirname(os.path.dirname(caminho_src))
         caminho_data = os.path.join(caminho_raiz_projeto, "Data")
@@ -24,11 +24,25 @@ async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     log_command(update)
     chat_id = update.effective_chat.id
     
+    texto_uso = (
+        "Por favor, forneça o número da OS ou da Instalação e, opcionalmente, quantos serviços "
+        f"mostrar (1 a {servicos.K_PROXIMIDADE_MAXIMO}) e o raio máximo em km.\n"
+        "Exemplo: `/proximidade 12345678` ou `/proximidade 12345678 5 10`"
+    )
     if not context.args:
-        await update.message.reply_text("Por favor, forneça o número da OS ou da Instalação.\nExemplo: `/proximidade 12345678`", parse_mode='Markdown')
+        await update.message.reply_text(texto_uso, parse_mode='Markdown')
         return
-        
+
     id_referencia = context.args[0]
+    try:
+        k = int(context.args[1]) if len(context.args) > 1 else servicos.K_PROXIMIDADE_PADRAO
+        raio_km = float(context.args[2].replace(',', '.')) if len(context.args) > 2 else None
+        if not 1 <= k <= servicos.K_PROXIMIDADE_MAXIMO or (raio_km is not None and raio_km <= 0):
+            raise ValueError("k ou raio fora dos limites")
+    except ValueError:
+        await update.message.reply_text(texto_uso, parse_mode='Markdown')
+        return
+
     await context.bot.send_message(chat_id=chat_id, text=f"Buscando serviços próximos à referência '{id_referencia}', por favor aguarde...")
     
     try:
@@ -38,7 +52,7 @@ async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Chama a nova função de análise para gerar o mapa
-        resultado_mapa = servicos.gerar_mapa_proximidade(df, id_referencia)
+        resultado_mapa = servicos.gerar_mapa_proximidade(df, id_referencia, k=k, raio_km=raio_km)
         
         # Verifica se a função retornou um HTML ou uma mensagem de erro em texto
         if resultado_mapa.strip().startswith('<'): # É um HTML
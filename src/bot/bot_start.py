@@ -16,7 +16,7 @@ finally:
     if 'sys' in locals(): del sys
 
 from bot.logging_utils import log_command
-from analysis.data_loader import carregar_dados
+from analysis.data_loader import obter_metadados
 
 COMMAND_NAME = "start"
 
@@ -30,15 +30,16 @@ async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # --- LÓGICA DO SELO DE VALIDADE (CORRIGIDA) ---
     texto_status_dados = ""
     try:
-        df = carregar_dados()
-        if not df.empty and 'Data_Extracao' in df.columns:
-            # Pega a data da extração mais recente (que vem sem fuso, ou 'naive')
-            ultima_extracao_naive = df['Data_Extracao'].max()
+        # Lê apenas o manifesto publicado pelo ETL (sem carregar a base)
+        metadados = obter_metadados()
+        if metadados and metadados['data_extracao'] is not None:
+            # A data da extração vem sem fuso (naive), no horário de São Paulo
+            ultima_extracao_naive = metadados['data_extracao']
             
             fuso_horario_brasil = ZoneInfo("America/Sao_Paulo")
             
             # Torna a data da extração "consciente" do fuso horário
-            ultima_extracao_aware = ultima_extracao_naive.tz_localize(fuso_horario_brasil)
+            ultima_extracao_aware = ultima_extracao_naive.replace(tzinfo=fuso_horario_brasil)
             
             # Pega o 'agora' também com fuso horário
             agora = datetime.now(fuso_horario_brasil)
@@ -54,6 +55,7 @@ async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 emoji_status = "✅"
                 status = f"Dados atualizados (última atualização há {minutos_atras} minutos)."
+            status += f" Base com {metadados['linhas']} atividades."
             
             texto_status_dados = f"{emoji_status} *Status da Base:* {status}\n"
         else:
@@ -0,0 +1,213 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import timedelta
+from typing import Dict, List, Optional
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from analysis.renderizacao import entidade_aberta
+
+logger = logging.getLogger(__name__)
+
+# Envio centralizado das respostas de texto do bot. Cada mensagem é dividida
+# em partes de até LIMITE_CARACTERES (em quebras de linha, sem cortar
+# entidades Markdown) e entra na fila do seu chat. Um trabalhador por chat
+# envia as partes em ordem, respeitando os limites do Telegram (por chat e
+# global) e repetindo o envio quando o Telegram pede para esperar (RetryAfter).
+# Os handlers usam 'agendar_texto', que não espera o envio terminar.
+
+LIMITE_CARACTERES = 4096
+# Limites de envio do Telegram: ~1 mensagem/s por chat e ~30 mensagens/s no total
+INTERVALO_POR_CHAT_SEGUNDOS = 1.0
+INTERVALO_GLOBAL_SEGUNDOS = 1 / 30
+# Tentativas por parte e espera inicial (dobra a cada falha de rede)
+MAXIMO_TENTATIVAS = 5
+ESPERA_INICIAL_SEGUNDOS = 1.0
+# Fila acima deste tamanho gera um aviso no log
+PROFUNDIDADE_ALERTA = 20
+# Quantas latências recentes entram nas métricas
+AMOSTRAS_LATENCIA = 1000
+
+
+def _pedacos(texto: str, capacidade: int):
+    """Linhas de 'texto' (com a quebra); linhas maiores que 'capacidade' são cortadas em espaços."""
+    for linha in texto.splitlines(keepends=True):
+        while len(linha) > capacidade:
+            corte = linha.rfind(' ', 0, capacidade)
+            corte = corte if corte > 0 else capacidade
+            yield linha[:corte]
+            linha = linha[corte:]
+        yield linha
+
+
+def dividir_mensagem(texto: str, limite: int = LIMITE_CARACTERES) -> List[str]:
+    """
+    Divide 'texto' em partes de até 'limite' caracteres, nas quebras de
+    linha. Uma entidade Markdown aberta no fim de uma parte (ex.: bloco de
+    código) é fechada nela e reaberta no início da seguinte.
+    """
+    if len(texto) <= limite:
+        return [texto]
+
+    # Reserva espaço para fechar e reabrir um bloco de código ('\n```' + '```\n')
+    capacidade = limite - 8
+    partes, atual = [], ''
+    for pedaco in _pedacos(texto, capacidade):
+        if atual and len(atual) + len(pedaco) > capacidade:
+            partes.append(atual)
+            atual = ''
+        atual += pedaco
+    if atual:
+        partes.append(atual)
+
+    resultado, reabrir = [], ''
+    for parte in partes:
+        parte = reabrir + parte.rstrip('\n')
+        aberta = entidade_aberta(parte)
+        if aberta == '```':
+            parte, reabrir = parte + '\n```', '```\n'
+        elif aberta:
+            parte, reabrir = parte + aberta, aberta
+        else:
+            reabrir = ''
+        if parte.strip():
+            resultado.append(parte)
+    return resultado
+
+
+def _segundos(espera) -> float:
+    """'retry_after' do Telegram (int ou timedelta, conforme a versão) em segundos."""
+    return espera.total_seconds() if isinstance(espera, timedelta) else float(espera)
+
+
+class EnviadorMensagens:
+    """Filas de envio por chat, com controle de taxa, novas tentativas e métricas."""
+
+    def __init__(self):
+        self._filas: Dict[int, deque] = {}
+        self._trabalhadores: Dict[int, asyncio.Task] = {}
+        self._ultimo_envio_chat: Dict[int, float] = {}
+        self._ultimo_envio_global = 0.0
+        self._trava_global: Optional[asyncio.Lock] = None
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+        self._contadores = {'mensagens': 0, 'partes_enviadas': 0, 'falhas': 0, 'retry_after': 0}
+
+    async def enviar(self, bot, chat_id: int, texto: str, parse_mode: Optional[str] = None, **kwargs) -> list:
+        """
+        Coloca 'texto' (dividido em partes) na fila do chat e espera o envio.
+        Argumentos extras (ex.: reply_markup) vão só na última parte. Retorna
+        as mensagens enviadas; se uma parte falhar de vez, levanta o erro.
+        """
+        if self._trava_global is None:
+            self._trava_global = asyncio.Lock()
+        concluido = asyncio.get_running_loop().create_future()
+        fila = self._filas.setdefault(chat_id, deque())
+        fila.append((bot, dividir_mensagem(texto), parse_mode, kwargs, concluido, time.monotonic()))
+        self._contadores['mensagens'] += 1
+        if len(fila) >= PROFUNDIDADE_ALERTA:
+            logger.warning(f"Fila de envio do chat {chat_id} com {len(fila)} mensagens aguardando.")
+
+        trabalhador = self._trabalhadores.get(chat_id)
+        if trabalhador is None or trabalhador.done():
+            self._trabalhadores[chat_id] = asyncio.create_task(self._processar_fila(chat_id))
+        return await concluido
+
+    async def _processar_fila(self, chat_id: int):
+        """Envia, em ordem, as mensagens da fila do chat até esvaziá-la."""
+        fila = self._filas[chat_id]
+        while fila:
+            bot, partes, parse_mode, kwargs, concluido, enfileirada_em = fila.popleft()
+            enviadas = []
+            try:
+                for i, parte in enumerate(partes):
+                    extras = kwargs if i == len(partes) - 1 else {}
+                    enviadas.append(await self._enviar_parte(bot, chat_id, parte, parse_mode, extras))
+                    self._latencias.append(time.monotonic() - enfileirada_em)
+                if not concluido.done():
+                    concluido.set_result(enviadas)
+            except Exception as e:
+                self._contadores['falhas'] += 1
+                logger.error(f"Falha ao enviar mensagem para o chat {chat_id}: {e}")
+                if not concluido.done():
+                    concluido.set_exception(e)
+
+    async def _aguardar_vez(self, chat_id: int):
+        """Espera o intervalo mínimo do chat e o global antes de um envio."""
+        espera_chat = self._ultimo_envio_chat.get(chat_id, 0.0) + INTERVALO_POR_CHAT_SEGUNDOS - time.monotonic()
+        if espera_chat > 0:
+            await asyncio.sleep(espera_chat)
+        async with self._trava_global:
+            espera_global = self._ultimo_envio_global + INTERVALO_GLOBAL_SEGUNDOS - time.monotonic()
+            if espera_global > 0:
+                await asyncio.sleep(espera_global)
+            self._ultimo_envio_global = time.monotonic()
+
+    async def _enviar_parte(self, bot, chat_id: int, texto: str, parse_mode: Optional[str], extras: dict):
+        """Envia uma parte, repetindo após RetryAfter e falhas de rede."""
+        espera = ESPERA_INICIAL_SEGUNDOS
+        for tentativa in range(1, MAXIMO_TENTATIVAS + 1):
+            await self._aguardar_vez(chat_id)
+            try:
+                mensagem = await bot.send_message(chat_id=chat_id, text=texto, parse_mode=parse_mode, **extras)
+                self._ultimo_envio_chat[chat_id] = time.monotonic()
+                self._contadores['partes_enviadas'] += 1
+                return mensagem
+            except RetryAfter as e:
+                self._contadores['retry_after'] += 1
+                logger.warning(f"Limite do Telegram atingido (chat {chat_id}); nova tentativa em {_segundos(e.retry_after)}s.")
+                await asyncio.sleep(_segundos(e.retry_after))
+            except BadRequest as e:
+                # Markdown que o Telegram não conseguiu interpretar: envia a parte como texto simples
+                if parse_mode and "parse entities" in str(e).lower():
+                    logger.warning(f"Markdown inválido no chat {chat_id} ({e}); enviando como texto simples.")
+                    parse_mode = None
+                    continue
+                raise
+            except NetworkError as e:
+                if tentativa == MAXIMO_TENTATIVAS:
+                    raise
+                logger.warning(f"Falha de rede ao enviar para o chat {chat_id} ({e}); nova tentativa em {espera:.0f}s.")
+                await asyncio.sleep(espera)
+                espera *= 2
+        raise RuntimeError(f"Mensagem para o chat {chat_id} não enviada após {MAXIMO_TENTATIVAS} tentativas.")
+
+    def metricas(self) -> Dict[str, object]:
+        """Profundidade das filas, contadores e latência (enfileiramento -> envio) das partes recentes."""
+        latencias = sorted(self._latencias)
+        return {
+            **self._contadores,
+            'filas_ativas': sum(1 for fila in self._filas.values() if fila),
+            'profundidade_total': sum(len(fila) for fila in self._filas.values()),
+            'profundidade_maxima': max((len(fila) for fila in self._filas.values()), default=0),
+            'latencia_media_s': round(sum(latencias) / len(latencias), 3) if latencias else None,
+            'latencia_p95_s': round(latencias[int(0.95 * (len(latencias) - 1))], 3) if latencias else None,
+            'latencia_maxima_s': round(latencias[-1], 3) if latencias else None,
+        }
+
+
+# Instância única do processo do bot
+_enviador = EnviadorMensagens()
+
+
+async def enviar_texto(bot, chat_id: int, texto: str, parse_mode: Optional[str] = None, **kwargs) -> list:
+    """Envia 'texto' ao chat pela fila compartilhada (ver 'EnviadorMensagens.enviar')."""
+    return await _enviador.enviar(bot, chat_id, texto, parse_mode=parse_mode, **kwargs)
+
+
+def agendar_texto(update, context, texto: str, parse_mode: Optional[str] = None, **kwargs) -> asyncio.Task:
+    """
+    Agenda o envio de 'texto' ao chat do 'update' sem esperar por ele: o
+    handler termina logo e a fila do chat respeita os limites do Telegram em
+    segundo plano, sem segurar as atualizações dos outros chats. Uma falha
+    no envio vai para o error handler da aplicação.
+    """
+    return context.application.create_task(
+        enviar_texto(context.bot, update.effective_chat.id, texto, parse_mode=parse_mode, **kwargs),
+        update=update,
+    )
+
+
+def metricas() -> Dict[str, object]:
+    """Métricas do envio compartilhado."""
+    return _enviador.metricas()
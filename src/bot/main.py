@@ -3,6 +3,7 @@ import sys
 import importlib
 import logging
 import traceback
+import pandas as pd
 from telegram import Update
 from telegram.ext import Application, ContextTypes
 from dotenv import load_dotenv
@@ -23,6 +24,14 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+# Copy-on-Write: todos os handlers recebem cópias rasas do mesmo snapshot em
+# cache (ver analysis.data_loader.carregar_dados), sem duplicar a base a cada
+# comando; uma escrita feita por um handler copia só o que foi alterado e nunca
+# chega ao DataFrame compartilhado. Ativado aqui, uma vez, para o processo do bot.
+pd.set_option("mode.copy_on_write", True)
+
+from bot.observador_dados import iniciar_observador
+
 
 ## --- NOVA FUNÇÃO: O TRATADOR DE ERROS GLOBAL --- ##
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -67,6 +76,9 @@ def run_bot():
     # Esta linha garante que qualquer erro em qualquer comando será capturado.
     application.add_error_handler(error_handler)
 
+    # --- OBSERVADOR DE DADOS: carrega novos snapshots em segundo plano ---
+    iniciar_observador(application)
+
     # --- LÓGICA DE REGISTRO DE COMANDOS (MAIS LIMPA) ---
     bot_dir = os.path.dirname(__file__)
     
@@ -0,0 +1,65 @@
+import os
+import sys
+import asyncio
+import logging
+from telegram.ext import Application, ContextTypes
+
+# Garante que os módulos da pasta 'analysis' possam ser importados
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from analysis import cache_relatorios, data_loader
+from bot import alertas_proativos, envio
+
+logger = logging.getLogger(__name__)
+
+# Intervalo padrão (em segundos) entre as verificações de um novo snapshot em 'Data/'
+INTERVALO_PADRAO_SEGUNDOS = 30
+
+
+async def verificar_novo_snapshot(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Job periódico: verifica se o ETL publicou um novo snapshot e, em caso
+    positivo, carrega e pré-calcula os derivados em uma thread separada,
+    trocando a versão atual só quando tudo estiver pronto. Após cada troca,
+    esvazia o cache de relatórios e agenda o envio dos novos alertas de Anexo IV.
+    """
+    try:
+        trocou = await asyncio.to_thread(data_loader.recarregar_se_necessario)
+    except Exception as e:
+        logger.error(f"Falha ao verificar/carregar novo snapshot: {e}")
+        return
+
+    if trocou:
+        estatisticas = data_loader.estatisticas_cache()
+        logger.info(f"Novo snapshot em uso: {estatisticas['snapshot_id']} ({estatisticas})")
+        logger.info(f"Envio de mensagens: {envio.metricas()}")
+        logger.info(f"Cache de relatórios: {cache_relatorios.estatisticas()}")
+        # Os relatórios da versão anterior não serão mais servidos: libera a memória já na troca
+        cache_relatorios.obter_cache().limpar()
+        context.job_queue.run_once(alertas_proativos.enviar_novos_alertas, when=0, name="alertas_anexo_iv")
+
+
+def iniciar_observador(application: Application) -> None:
+    """Agenda o observador no job queue do bot, com uma primeira carga imediata."""
+    if application.job_queue is None:
+        # Instalação sem o extra 'job-queue' (apscheduler), ex.: fora do poetry.lock.
+        # Os handlers voltam a recarregar o snapshot sob demanda e não há alertas proativos.
+        print("[AVISO] JobQueue indisponível (instale as dependências com 'poetry install' ou "
+              "'python-telegram-bot[job-queue]'). Observador de dados e alertas proativos de Anexo IV "
+              "desativados; a base será recarregada sob demanda pelos comandos.")
+        return
+
+    # Lido aqui (e não no import) porque o .env só é carregado dentro de run_bot
+    intervalo = int(os.getenv("INTERVALO_OBSERVADOR_SEGUNDOS") or INTERVALO_PADRAO_SEGUNDOS)
+    application.job_queue.run_repeating(
+        verificar_novo_snapshot,
+        interval=intervalo,
+        first=0,
+        name="observador_snapshot",
+    )
+    print(f"Observador de dados iniciado (verificação a cada {intervalo}s).")
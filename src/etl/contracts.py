@@ -1,17 +1,40 @@
 import pandas as pd
-from pydantic import BaseModel, ValidationError, Field
-from typing import Optional, Any
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import Optional, Any, Dict, List, Tuple
 from datetime import datetime
 
+# Cada campo do contrato pode declarar, em 'json_schema_extra', a regra da coluna:
+#   - 'tipo': formato esperado do texto exportado (ver FORMATOS_POR_TIPO)
+#   - 'anulavel': se a célula pode vir vazia (padrão: True)
+#   - 'faixa': (mínimo, máximo) para tipos numéricos
+#   - 'formato': formato strftime de datas, usado na conversão de tipos
+#   - 'combinar_com': coluna de data à qual uma hora é somada (Início/Fim -> datetime)
+#   - 'posterior_a': coluna que esta hora sucede; se ficar antes dela, a hora virou o dia (+1 dia)
+# O tipo também define o dtype final da coluna (ver etl.conversao).
+def _regra(tipo: str = 'texto', anulavel: bool = True, faixa: Optional[tuple] = None,
+           formato: Optional[str] = None, combinar_com: Optional[str] = None,
+           posterior_a: Optional[str] = None) -> Dict[str, Any]:
+    regra = {'tipo': tipo, 'anulavel': anulavel}
+    if faixa is not None:
+        regra['faixa'] = faixa
+    if formato is not None:
+        regra['formato'] = formato
+    if combinar_com is not None:
+        regra['combinar_com'] = combinar_com
+    if posterior_a is not None:
+        regra['posterior_a'] = posterior_a
+    return regra
+
 class ContratoDadosBrutos(BaseModel):
-    Recurso: Optional[Any] = None
-    Data: Optional[Any] = None
-    Status_da_Atividade: Optional[Any] = Field(alias='Status da Atividade', default=None)
+    Recurso: Optional[Any] = Field(default=None, json_schema_extra=_regra(anulavel=False))
+    Data: Optional[Any] = Field(default=None, json_schema_extra=_regra('data', formato='%d/%m/%y'))
+    Status_da_Atividade: Optional[Any] = Field(alias='Status da Atividade', default=None, json_schema_extra=_regra(anulavel=False))
     Cidade: Optional[Any] = None
-    Início: Optional[Any] = None
-    Fim: Optional[Any] = None
-    Duração: Optional[Any] = None
-    Tempo_de_Deslocamento: Optional[Any] = Field(alias='Tempo de Deslocamento', default=None)
+    Início: Optional[Any] = Field(default=None, json_schema_extra=_regra('hora', combinar_com='Data'))
+    Fim: Optional[Any] = Field(default=None, json_schema_extra=_regra('hora', combinar_com='Data', posterior_a='Início'))
+    Duração: Optional[Any] = Field(default=None, json_schema_extra=_regra('duracao'))
+    Tempo_de_Deslocamento: Optional[Any] = Field(alias='Tempo de Deslocamento', default=None, json_schema_extra=_regra('duracao'))
     Tipo_de_Atividade: Optional[Any] = Field(alias='Tipo de Atividade', default=None) # Apenas uma definição é necessária
     Ordem_de_Serviço: Optional[Any] = Field(alias='Ordem de Serviço', default=None)
     Abrangência: Optional[Any] = None
@@ -21,19 +44,19 @@ class ContratoDadosBrutos(BaseModel):
     Tipo_de_Conclusão_Executada: Optional[Any] = Field(alias='Tipo de Conclusão Executada', default=None)
     Tipo_de_Conclusão: Optional[Any] = Field(alias='Tipo de Conclusão', default=None)
     Tipo_de_Conclusão_Não_Executada: Optional[Any] = Field(alias='Tipo de Conclusão Não Executada', default=None)
-    Latitude: Optional[Any] = None
-    Longitude: Optional[Any] = None
-    Posição_na_Rota: Optional[Any] = Field(alias='Posição na Rota', default=None)
+    Latitude: Optional[Any] = Field(default=None, json_schema_extra=_regra('decimal', faixa=(-90, 90)))
+    Longitude: Optional[Any] = Field(default=None, json_schema_extra=_regra('decimal', faixa=(-180, 180)))
+    Posição_na_Rota: Optional[Any] = Field(alias='Posição na Rota', default=None, json_schema_extra=_regra('inteiro'))
     Status_da_Coordenada: Optional[Any] = Field(alias='Status da Coordenada', default=None)
     Área_de_Deslocamento: Optional[Any] = Field(alias='Área de Deslocamento', default=None)
-    Data_Limite: Optional[Any] = Field(alias='Data Limite', default=None)
-    Data_Abertura: Optional[Any] = Field(alias='Data Abertura', default=None)
-    Valor_Total_Contrato: Optional[Any] = Field(alias='Valor Total Contrato', default=None)
-    Valor: Optional[Any] = None
+    Data_Limite: Optional[Any] = Field(alias='Data Limite', default=None, json_schema_extra=_regra('data_hora', formato='%d/%m/%Y %H:%M:%S'))
+    Data_Abertura: Optional[Any] = Field(alias='Data Abertura', default=None, json_schema_extra=_regra('data_hora', formato='%d/%m/%Y %H:%M:%S'))
+    Valor_Total_Contrato: Optional[Any] = Field(alias='Valor Total Contrato', default=None, json_schema_extra=_regra('decimal'))
+    Valor: Optional[Any] = Field(default=None, json_schema_extra=_regra('decimal'))
     Code: Optional[Any] = None
     Número_Ocorrência: Optional[Any] = Field(alias='Número Ocorrência', default=None)
     Número_da_Nota: Optional[Any] = Field(alias='Número da Nota', default=None)
-    Número_de_Clientes_Interrompidos: Optional[Any] = Field(alias='Número de Clientes Interrompidos', default=None)
+    Número_de_Clientes_Interrompidos: Optional[Any] = Field(alias='Número de Clientes Interrompidos', default=None, json_schema_extra=_regra('inteiro'))
     Medidor_Retirado: Optional[Any] = Field(alias='Medidor Retirado', default=None)
     Medidor_Instalado: Optional[Any] = Field(alias='Medidor Instalado', default=None)
     Observação: Optional[Any] = None
@@ -44,24 +67,134 @@ class ContratoDadosBrutos(BaseModel):
         extra = 'allow'
         populate_by_name = True
 
-def validar_dados(df: pd.DataFrame, modelo_contrato: BaseModel, nome_arquivo: str):
-    """Valida a estrutura de um DataFrame contra um contrato Pydantic."""
+# Expressões regulares (aplicadas ao texto sem espaços nas bordas) de cada tipo do contrato
+FORMATOS_POR_TIPO = {
+    'texto': None,
+    'data': r'\d{2}/\d{2}/\d{2}',                           # 31/01/25
+    'data_hora': r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}',    # 31/01/2025 08:00:00
+    'hora': r'\d{1,2}:\d{2}(:\d{2})?',                      # 08:15 ou 08:15:00
+    'duracao': r'\d{1,3}:\d{2}(:\d{2})?',                   # 01:30 ou 01:30:00
+    'decimal': r'-?\d+([.,]\d+)?',                          # -31,7654, -31.7654 ou 1.234,56 (validado por to_numeric)
+    'inteiro': r'-?\d+',                                    # (validado por to_numeric)
+}
+
+
+def normalizar_decimal(texto: pd.Series) -> pd.Series:
+    """
+    Normaliza números exportados com vírgula ou ponto decimal para o formato
+    do Python. Quando há vírgula, pontos são separadores de milhar
+    ('1.234,56' -> '1234.56'); sem vírgula, o ponto é o separador decimal.
+    """
+    tem_virgula = texto.str.contains(',', regex=False, na=False)
+    return texto.where(~tem_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+
+
+def regras_do_contrato(modelo_contrato: BaseModel) -> Dict[str, Dict[str, Any]]:
+    """Retorna {nome da coluna no arquivo: regra} a partir dos campos do contrato."""
+    regras = {}
+    for nome, campo in modelo_contrato.model_fields.items():
+        coluna = campo.alias or nome
+        regras[coluna] = {**_regra(), **(campo.json_schema_extra or {})}
+    return regras
+
+
+def _avaliar_coluna(serie: pd.Series, regra: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Avalia a regra de uma coluna e retorna duas máscaras (vazias, inválidas).
+    A coluna é fatorada uma única vez: vazio/regex/faixa são testados apenas
+    nos valores distintos e o resultado volta para as linhas pelos códigos.
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    distintos = pd.Series(distintos, dtype=object).astype(str).str.strip()
+
+    vazio_por_valor = (distintos == '').to_numpy()
+    invalido_por_valor = np.zeros(len(distintos), dtype=bool)
+
+    padrao = FORMATOS_POR_TIPO[regra['tipo']]
+    if regra['tipo'] in ('decimal', 'inteiro'):
+        # Para números, a conversão do pandas (em C) substitui a regex
+        numeros = pd.to_numeric(normalizar_decimal(distintos), errors='coerce').to_numpy(dtype=float)
+        invalido_por_valor = np.isnan(numeros) & ~vazio_por_valor
+        if regra['tipo'] == 'inteiro':
+            invalido_por_valor |= ~np.isnan(numeros) & (numeros != np.round(numeros))
+        if 'faixa' in regra:
+            minimo, maximo = regra['faixa']
+            invalido_por_valor |= (numeros < minimo) | (numeros > maximo)
+    elif padrao is not None:
+        invalido_por_valor = ~distintos.str.fullmatch(padrao).to_numpy(dtype=bool) & ~vazio_por_valor
+
+    # Código -1 (NaN) é tratado como célula vazia
+    nulas = codigos < 0
+    codigos_validos = np.where(nulas, 0, codigos)
+    if len(distintos) == 0:
+        return nulas, np.zeros(len(serie), dtype=bool)
+    vazias = nulas | vazio_por_valor[codigos_validos]
+    invalidas = ~nulas & invalido_por_valor[codigos_validos]
+    return vazias, invalidas
+
+
+def validar_dados(df: pd.DataFrame, modelo_contrato: BaseModel, nome_arquivo: str,
+                  max_erros: Optional[int] = 10) -> Dict[str, Any]:
+    """
+    Valida um DataFrame contra um contrato Pydantic de forma colunar:
+    cabeçalhos/aliases são conferidos uma única vez e as regras de tipo,
+    nulidade e formato de cada coluna rodam como máscaras vetorizadas.
+
+    Só problemas estruturais (colunas do contrato ausentes) levantam
+    ValueError. Células fora do contrato não descartam a linha: são apenas
+    registradas (até 'max_erros' exemplos, citando a linha do arquivo com o
+    cabeçalho = linha 1; None = todos) e contadas, e a conversão de tipos as
+    trata como vazias. Retorna {'linhas_com_problemas': n,
+    'problemas_por_coluna': {coluna: n}}.
+    """
     print(f"Iniciando validação do contrato '{modelo_contrato.__name__}' para o arquivo: {nome_arquivo}")
-    
-    df_para_validar = df.astype(object).where(pd.notnull(df), None)
-    
-    erros = []
-    for index, row in df_para_validar.iterrows():
-        try:
-            modelo_contrato.model_validate(row.to_dict())
-        except ValidationError as e:
-            erros.append(f"  - Erro na linha {index + 2}: {e}")
-
-    if erros:
+
+    regras = regras_do_contrato(modelo_contrato)
+
+    # 1. Cabeçalho: todas as colunas do contrato precisam existir no arquivo
+    colunas_ausentes = [col for col in regras if col not in df.columns]
+    if colunas_ausentes:
         print(f"\n❌ ERRO DE CONTRATO no arquivo {nome_arquivo}!")
-        for erro in erros[:10]:
-            print(erro)
+        for col in colunas_ausentes:
+            print(f"  - Erro no cabeçalho: coluna obrigatória '{col}' não encontrada.")
         raise ValueError(f"Validação do contrato '{modelo_contrato.__name__}' falhou.")
-    
-    print(f"✅ Contrato '{modelo_contrato.__name__}' validado com sucesso para {nome_arquivo}.")
-    return True
\ No newline at end of file
+
+    # 2. Regras por coluna, avaliadas como máscaras sobre a coluna inteira.
+    #    Colunas de texto livre e anuláveis não têm o que validar.
+    avisos: List[str] = []
+    problemas_por_coluna: Dict[str, int] = {}
+    linhas_com_problemas = np.zeros(len(df), dtype=bool)
+
+    def _restantes() -> Optional[int]:
+        return None if max_erros is None else max(max_erros - len(avisos), 0)
+
+    for col, regra in regras.items():
+        if regra['tipo'] == 'texto' and regra['anulavel']:
+            continue
+        serie = df[col]
+        vazias, invalidas = _avaliar_coluna(serie, regra)
+        problema = invalidas if regra['anulavel'] else invalidas | vazias
+        if not problema.any():
+            continue
+        problemas_por_coluna[col] = int(problema.sum())
+        linhas_com_problemas |= problema
+
+        if not regra['anulavel']:
+            for index in serie.index[vazias][:_restantes()]:
+                avisos.append(f"  - Linha {index + 2}: coluna '{col}' não pode ser vazia.")
+
+        for index, valor in serie[invalidas].iloc[:_restantes()].items():
+            avisos.append(f"  - Linha {index + 2}: coluna '{col}' com valor '{valor}' fora do formato '{regra['tipo']}'.")
+
+    total_linhas = int(linhas_com_problemas.sum())
+    if total_linhas:
+        print(f"\n⚠️ AVISO DE CONTRATO no arquivo {nome_arquivo}: {total_linhas} linha(s) com células fora do contrato "
+              f"({problemas_por_coluna}); as células inválidas serão tratadas como vazias.")
+        for aviso in avisos:
+            print(aviso)
+        total_celulas = sum(problemas_por_coluna.values())
+        if total_celulas > len(avisos):
+            print(f"  ... e mais {total_celulas - len(avisos)} célula(s).")
+    else:
+        print(f"✅ Contrato '{modelo_contrato.__name__}' validado com sucesso para {nome_arquivo}.")
+    return {'linhas_com_problemas': total_linhas, 'problemas_por_coluna': problemas_por_coluna}
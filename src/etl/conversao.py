@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from typing import Any, Callable, Dict
+
+from etl.contracts import regras_do_contrato, normalizar_decimal
+
+
+def _texto_limpo(serie: pd.Series) -> pd.Series:
+    """Texto sem espaços nas bordas; células vazias viram NaN."""
+    texto = serie.astype(str).str.strip()
+    return texto.mask(serie.isna() | (texto == ''))
+
+
+def _por_valores_distintos(serie: pd.Series, conversor: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """
+    Aplica 'conversor' apenas aos valores distintos da coluna e devolve o
+    resultado às linhas pelos códigos do factorize. Datas e horas de um
+    export se repetem muito (poucos dias, algumas centenas de horários),
+    então cada texto é interpretado uma única vez.
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    convertidos = conversor(pd.Series(distintos, dtype=object)).to_numpy()
+    # O código -1 (célula nula) aponta para o NaT acrescentado no fim
+    convertidos = np.append(convertidos, np.array(['NaT'], dtype=convertidos.dtype))
+    return pd.Series(convertidos[codigos], index=serie.index)
+
+
+def converter_data(serie: pd.Series, regra: Dict[str, Any]) -> pd.Series:
+    """Texto -> datetime64, usando o formato declarado no contrato."""
+    return _por_valores_distintos(
+        serie, lambda distintos: pd.to_datetime(_texto_limpo(distintos), format=regra['formato'], errors='coerce')
+    )
+
+
+def _interpretar_hora(texto: pd.Series) -> pd.Series:
+    texto = _texto_limpo(texto)
+    texto = texto.where(texto.str.count(':') != 1, texto + ':00')
+    return pd.to_timedelta(texto, errors='coerce')
+
+
+def converter_hora(serie: pd.Series, regra: Dict[str, Any]) -> pd.Series:
+    """'HH:MM' ou 'HH:MM:SS' -> timedelta64 desde a meia-noite."""
+    return _por_valores_distintos(serie, _interpretar_hora)
+
+
+def converter_decimal(serie: pd.Series, regra: Dict[str, Any]) -> pd.Series:
+    """Número com vírgula ou ponto decimal -> float64; fora da 'faixa' do contrato vira NaN."""
+    numeros = pd.to_numeric(normalizar_decimal(_texto_limpo(serie)), errors='coerce').astype('float64')
+    if 'faixa' in regra:
+        minimo, maximo = regra['faixa']
+        numeros = numeros.where(numeros.between(minimo, maximo))
+    return numeros
+
+
+def converter_inteiro(serie: pd.Series, regra: Dict[str, Any]) -> pd.Series:
+    """Contagens/posições -> Int64 (inteiro que aceita nulos)."""
+    return converter_decimal(serie, regra).round().astype('Int64')
+
+
+# Tipo do contrato -> conversor. 'texto' mantém a coluna como veio.
+# dtypes finais: data/data_hora -> datetime64, hora/duracao -> timedelta64
+# (hora com 'combinar_com' -> datetime64), decimal -> float64, inteiro -> Int64.
+CONVERSORES_POR_TIPO: Dict[str, Callable[[pd.Series, Dict[str, Any]], pd.Series]] = {
+    'data': converter_data,
+    'data_hora': converter_data,
+    'hora': converter_hora,
+    'duracao': converter_hora,
+    'decimal': converter_decimal,
+    'inteiro': converter_inteiro,
+}
+
+
+def converter_tipos(df: pd.DataFrame, modelo_contrato: BaseModel) -> pd.DataFrame:
+    """
+    Converte, em uma única passada vetorizada, cada coluna para o tipo
+    declarado no contrato. Horas com 'combinar_com' (Início/Fim) viram
+    datetime somando a hora (timedelta) à coluna de data indicada, sem passar
+    por texto. Uma hora com 'posterior_a' que fique antes da coluna de
+    referência (Fim < Início: atividade que virou a meia-noite) ganha um dia.
+    """
+    regras = regras_do_contrato(modelo_contrato)
+    convertido = {}
+
+    for col, regra in regras.items():
+        conversor = CONVERSORES_POR_TIPO.get(regra['tipo'])
+        if conversor is None or col not in df.columns:
+            continue
+        convertido[col] = conversor(df[col], regra)
+
+    for col, regra in regras.items():
+        base = regra.get('combinar_com')
+        if base and col in convertido and base in convertido:
+            convertido[col] = convertido[base] + convertido[col]
+
+    for col, regra in regras.items():
+        referencia = regra.get('posterior_a')
+        if referencia and col in convertido and referencia in convertido:
+            virou_o_dia = convertido[col] < convertido[referencia]
+            convertido[col] = convertido[col].mask(virou_o_dia, convertido[col] + pd.Timedelta(days=1))
+
+    df_convertido = df.copy()
+    for col, serie in convertido.items():
+        df_convertido[col] = serie
+    return df_convertido
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+import os
+import sys
+from datetime import date, datetime
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+
+# --- Bloco de código para encontrar a pasta 'src' e permitir a execução autônoma ---
+try:
+    caminho_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if caminho_src not in sys.path:
+        sys.path.append(caminho_src)
+finally:
+    if 'sys' in locals(): del sys
+
+from etl.publicacao import CAMINHO_DATA, gravar_atomicamente, unir_categorias
+
+# Histórico de todas as extrações, particionado pela data da atividade:
+#   Data/historico/dia=2025-01-31/extracao_<snapshot_id>.parquet   (uma por extração)
+#   Data/historico/dia=2025-01-31/compactado_<snapshot_id>.parquet (extrações até <snapshot_id>)
+# Cada arquivo guarda as linhas daquele dia com a coluna 'Data_Extracao', então
+# "últimos 7 dias" lê só sete diretórios. O compactado guarda cada versão de uma
+# linha uma única vez, com a 'Data_Extracao' em que ela apareceu: a linha numa
+# extração é a sua versão mais recente até aquela extração.
+CAMINHO_HISTORICO = os.path.join(CAMINHO_DATA, "historico")
+PREFIXO_PARTICAO = "dia="
+PARTICAO_SEM_DATA = "dia=sem_data"
+PREFIXO_EXTRACAO = "extracao_"
+PREFIXO_COMPACTADO = "compactado_"
+
+# Identifica uma linha entre extrações (a OS pode se repetir em um arquivo)
+CHAVE_VERSAO = ["Arquivo_Origem", "Ordem de Serviço", "Ocorrencia_OS"]
+
+
+def _id_do_arquivo(nome: str) -> str:
+    """'extracao_<id>.parquet' ou 'compactado_<id>.parquet' -> '<id>'."""
+    return nome.rsplit('_', 1)[1].removesuffix('.parquet')
+
+
+def _dia_da_particao(caminho_particao_dia: str) -> Optional[date]:
+    """'.../dia=2025-01-31' -> date(2025, 1, 31); 'dia=sem_data' -> None."""
+    nome = os.path.basename(caminho_particao_dia)
+    return None if nome == PARTICAO_SEM_DATA else date.fromisoformat(nome[len(PREFIXO_PARTICAO):])
+
+
+def caminho_particao(dia: Optional[date]) -> str:
+    if dia is None:
+        return os.path.join(CAMINHO_HISTORICO, PARTICAO_SEM_DATA)
+    return os.path.join(CAMINHO_HISTORICO, f"{PREFIXO_PARTICAO}{dia.isoformat()}")
+
+
+def listar_particoes(data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> List[str]:
+    """
+    Diretórios de dia dentro de [data_inicio, data_fim] (poda de partições:
+    só o nome do diretório é olhado). Sem limites, inclui também as linhas
+    sem data.
+    """
+    if not os.path.isdir(CAMINHO_HISTORICO):
+        return []
+    particoes = []
+    for nome in sorted(os.listdir(CAMINHO_HISTORICO)):
+        if nome == PARTICAO_SEM_DATA:
+            if data_inicio is None and data_fim is None:
+                particoes.append(os.path.join(CAMINHO_HISTORICO, nome))
+            continue
+        if not nome.startswith(PREFIXO_PARTICAO):
+            continue
+        dia = _dia_da_particao(nome)
+        if (data_inicio is None or dia >= data_inicio) and (data_fim is None or dia <= data_fim):
+            particoes.append(os.path.join(CAMINHO_HISTORICO, nome))
+    return particoes
+
+
+def arquivos_vigentes(caminho_particao_dia: str) -> List[str]:
+    """
+    Arquivos a ler em uma partição: o compactado mais recente e as extrações
+    posteriores a ele. Extrações já incluídas no compactado (ainda não
+    apagadas pela compactação) são ignoradas, então um leitor nunca vê
+    linhas em dobro.
+    """
+    nomes = [n for n in os.listdir(caminho_particao_dia) if n.endswith('.parquet') and not n.startswith('.')]
+    compactados = sorted(n for n in nomes if n.startswith(PREFIXO_COMPACTADO))
+    ultimo_compactado = _id_do_arquivo(compactados[-1]) if compactados else ''
+    vigentes = [compactados[-1]] if compactados else []
+    vigentes += sorted(
+        n for n in nomes if n.startswith(PREFIXO_EXTRACAO) and _id_do_arquivo(n) > ultimo_compactado
+    )
+    return [os.path.join(caminho_particao_dia, n) for n in vigentes]
+
+
+def gravar_extracao(df: pd.DataFrame, snapshot_id: str) -> List[str]:
+    """
+    Acrescenta a extração ao histórico: um arquivo por dia de atividade
+    ('Data'), nomeado pelo id do snapshot. Retorna as partições gravadas.
+    """
+    dias = df['Data'].dt.date
+    particoes = []
+    for dia, linhas in df.groupby(dias, sort=True, dropna=False):
+        dia = None if pd.isna(dia) else dia
+        caminho = os.path.join(caminho_particao(dia), f"{PREFIXO_EXTRACAO}{snapshot_id}.parquet")
+        gravar_atomicamente(caminho, lambda destino: linhas.to_parquet(destino, index=False, engine='pyarrow'))
+        particoes.append(caminho_particao(dia))
+    print(f"Histórico: extração '{snapshot_id}' gravada em {len(particoes)} partição(ões) de dia.")
+    return particoes
+
+
+def descartar_versoes_repetidas(df_dia: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mantém só as linhas que mudaram em relação à versão anterior da mesma
+    linha (CHAVE_VERSAO): uma linha idêntica à última versão guardada, em
+    todas as colunas exceto 'Data_Extracao', é descartada.
+    """
+    if df_dia.empty or not set(CHAVE_VERSAO) <= set(df_dia.columns):
+        return df_dia
+    chave = pd.util.hash_pandas_object(df_dia[CHAVE_VERSAO], index=False).to_numpy()
+    conteudo = pd.util.hash_pandas_object(df_dia.drop(columns=['Data_Extracao']), index=False).to_numpy()
+    extracao = df_dia['Data_Extracao'].to_numpy(dtype='datetime64[ns]')
+
+    # Ordena por linha e, dentro dela, por extração: cada versão fica logo após a anterior
+    ordem = np.lexsort((extracao, chave))
+    chave, conteudo = chave[ordem], conteudo[ordem]
+    repetida = np.zeros(len(df_dia), dtype=bool)
+    repetida[ordem[1:]] = (chave[1:] == chave[:-1]) & (conteudo[1:] == conteudo[:-1])
+    return df_dia[~repetida].reset_index(drop=True)
+
+
+def compactar_particao(caminho_particao_dia: str) -> bool:
+    """
+    Junta o compactado anterior e as extrações do dia em um único arquivo
+    'compactado_<id da última extração>.parquet', sem as versões repetidas,
+    e só então apaga os arquivos de origem. Retorna False se não havia o
+    que compactar.
+    """
+    arquivos = arquivos_vigentes(caminho_particao_dia)
+    if len(arquivos) < 2:
+        return False
+
+    partes = [pd.read_parquet(caminho, engine='pyarrow') for caminho in arquivos]
+    df_dia = descartar_versoes_repetidas(pd.concat(unir_categorias(partes), ignore_index=True))
+
+    ultimo_id = _id_do_arquivo(os.path.basename(arquivos[-1]))
+    destino = os.path.join(caminho_particao_dia, f"{PREFIXO_COMPACTADO}{ultimo_id}.parquet")
+    gravar_atomicamente(destino, lambda caminho: df_dia.to_parquet(caminho, index=False, engine='pyarrow'))
+
+    # A partir daqui os leitores já usam o compactado; os antigos podem sair
+    for caminho in arquivos:
+        if caminho != destino:
+            os.remove(caminho)
+    return True
+
+
+def compactar_historico(ate: Optional[date] = None) -> int:
+    """
+    Compacta as partições de dia (todas, ou só as até 'ate', inclusive).
+    Retorna quantas partições foram compactadas.
+    """
+    compactadas = sum(compactar_particao(particao) for particao in listar_particoes(data_fim=ate))
+    print(f"Histórico: {compactadas} partição(ões) de dia compactada(s).")
+    return compactadas
+
+
+def compactar_dias_fechados(particoes: List[str]) -> int:
+    """
+    Compacta, entre as partições informadas (as que acabaram de receber uma
+    extração), os dias anteriores a hoje (horário de São Paulo), que não
+    recebem mais atividades novas. Dias sem extração nova não são regravados.
+    """
+    hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).date()
+    fechadas = [p for p in particoes if _dia_da_particao(p) is not None and _dia_da_particao(p) < hoje]
+    compactadas = sum(compactar_particao(particao) for particao in fechadas)
+    print(f"Histórico: {compactadas} partição(ões) de dia compactada(s).")
+    return compactadas
+
+
+if __name__ == "__main__":
+    compactar_historico()
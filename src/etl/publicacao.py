@@ -0,0 +1,214 @@
+import pandas as pd
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from pandas.api.types import union_categoricals
+from zoneinfo import ZoneInfo
+
+# --- CONFIGURAÇÃO DE CAMINHOS ---
+CAMINHO_RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_DATA = os.path.join(CAMINHO_RAIZ_PROJETO, "Data")
+
+# Cada publicação gera um arquivo versionado; o manifesto aponta para a versão vigente
+CAMINHO_SNAPSHOTS = os.path.join(CAMINHO_DATA, "snapshots")
+CAMINHO_MANIFESTO = os.path.join(CAMINHO_DATA, "prod_gstc.manifest.json")
+
+# Quantas versões manter em disco (a vigente + anteriores ainda em leitura pelo bot)
+VERSOES_MANTIDAS = 3
+
+
+def _fsync_diretorio(caminho_dir: str):
+    """Garante que a renomeação fique gravada no diretório (sem efeito no Windows)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(caminho_dir, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _permissoes_publicacao(caminho_final: str) -> int:
+    """
+    Permissões do arquivo publicado: as do arquivo que ele substitui ou, se
+    ainda não existir, as de um arquivo novo comum (0666 menos a umask).
+    """
+    try:
+        return os.stat(caminho_final).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def gravar_atomicamente(caminho_final: str, escrever: Callable[[str], None]) -> str:
+    """
+    Grava um arquivo de forma atômica: 'escrever' recebe um caminho temporário
+    no mesmo diretório, o conteúdo é sincronizado em disco (fsync) e só então
+    renomeado para 'caminho_final'. Leitores nunca veem um arquivo pela metade.
+    Retorna o hash SHA-256 do conteúdo gravado.
+    """
+    diretorio = os.path.dirname(caminho_final)
+    os.makedirs(diretorio, exist_ok=True)
+    fd, caminho_temp = tempfile.mkstemp(dir=diretorio, prefix='.tmp_', suffix=os.path.splitext(caminho_final)[1])
+    os.close(fd)
+    try:
+        escrever(caminho_temp)
+        sha = hashlib.sha256()
+        with open(caminho_temp, 'rb+') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloco)
+            os.fsync(f.fileno())
+        # O mkstemp cria o temporário com 0600; sem isto o bot (se rodar com
+        # outro usuário) não conseguiria ler o arquivo publicado
+        os.chmod(caminho_temp, _permissoes_publicacao(caminho_final))
+        os.replace(caminho_temp, caminho_final)
+        _fsync_diretorio(diretorio)
+        return sha.hexdigest()
+    except Exception:
+        if os.path.exists(caminho_temp):
+            os.remove(caminho_temp)
+        raise
+
+
+def unir_categorias(partes: List[pd.DataFrame], colunas: Optional[List[str]] = None) -> List[pd.DataFrame]:
+    """
+    Dá às colunas 'category' de todas as partes o mesmo conjunto de categorias,
+    para que o concat as mantenha como 'category' (categorias diferentes
+    fariam a coluna cair para 'object'). As partes são alteradas no lugar.
+    """
+    colunas = colunas if colunas is not None else (list(partes[0].columns) if partes else [])
+    for col in colunas:
+        if all(col in parte.columns and isinstance(parte[col].dtype, pd.CategoricalDtype) for parte in partes):
+            categorias = union_categoricals([parte[col] for parte in partes]).categories
+            for parte in partes:
+                parte[col] = parte[col].cat.set_categories(categorias)
+    return partes
+
+
+def _estatisticas_colunas(df: pd.DataFrame) -> Dict[str, dict]:
+    """Estatísticas por coluna para o manifesto: tipo, nulos, distintos e mín/máx."""
+    nulos = df.isna().sum()
+    estatisticas = {}
+    for col in df.columns:
+        serie = df[col]
+        info = {'tipo': str(serie.dtype), 'nulos': int(nulos[col])}
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            info['distintos'] = int(serie.cat.categories.size)
+        elif pd.api.types.is_datetime64_any_dtype(serie) or pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_timedelta64_dtype(serie):
+            if serie.notna().any():
+                info['min'] = str(serie.min())
+                info['max'] = str(serie.max())
+        else:
+            info['distintos'] = int(serie.nunique())
+        estatisticas[col] = info
+    return estatisticas
+
+
+def _remover_versoes_antigas(arquivo_vigente: str):
+    """Apaga os snapshots mais antigos, mantendo as últimas VERSOES_MANTIDAS."""
+    arquivos = sorted(
+        (f for f in os.listdir(CAMINHO_SNAPSHOTS) if f.startswith('prod_gstc_') and f.endswith('.parquet')),
+        reverse=True
+    )
+    for nome in arquivos[VERSOES_MANTIDAS:]:
+        if nome != arquivo_vigente:
+            os.remove(os.path.join(CAMINHO_SNAPSHOTS, nome))
+            # As tabelas agregadas da versão saem junto com ela
+            prefixo_agregados = f"agregados_{nome.removeprefix('prod_gstc_').removesuffix('.parquet')}_"
+            for agregado in os.listdir(CAMINHO_SNAPSHOTS):
+                if agregado.startswith(prefixo_agregados):
+                    os.remove(os.path.join(CAMINHO_SNAPSHOTS, agregado))
+            print(f"  - Snapshot antigo '{nome}' removido.")
+
+
+def ler_manifesto() -> Optional[dict]:
+    """Manifesto da versão vigente, ou None se ainda não houve publicação."""
+    if not os.path.exists(CAMINHO_MANIFESTO):
+        return None
+    with open(CAMINHO_MANIFESTO, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def carregar_snapshot(manifesto: dict) -> Optional[pd.DataFrame]:
+    """Lê o arquivo de dados apontado pelo manifesto (None se já foi removido)."""
+    caminho = os.path.join(CAMINHO_DATA, manifesto['arquivo'])
+    if not os.path.exists(caminho):
+        return None
+    return pd.read_parquet(caminho, engine='pyarrow')
+
+
+def publicar_snapshot_versionado(df: pd.DataFrame, delta: Optional[dict] = None,
+                                 versao_transformacao: Optional[str] = None,
+                                 agregados: Optional[Dict[str, pd.DataFrame]] = None,
+                                 validacao: Optional[dict] = None) -> dict:
+    """
+    Publica o snapshot em 'Data/snapshots/prod_gstc_<snapshot_id>.parquet' e,
+    por último, o manifesto que aponta para ele. A troca do manifesto é o
+    único ponto de "commit": leitores veem a versão antiga ou a nova, nunca
+    uma mistura das duas.
+    """
+    fuso_horario_brasil = ZoneInfo("America/Sao_Paulo")
+    agora = datetime.now(fuso_horario_brasil)
+
+    # O id precisa ser conhecido antes da gravação (nome do arquivo); o hash vai no manifesto
+    snapshot_id = agora.strftime('%Y%m%dT%H%M%S%f')
+    nome_arquivo = f"prod_gstc_{snapshot_id}.parquet"
+    caminho_arquivo = os.path.join(CAMINHO_SNAPSHOTS, nome_arquivo)
+
+    hash_conteudo = gravar_atomicamente(
+        caminho_arquivo, lambda caminho: df.to_parquet(caminho, index=False, engine='pyarrow')
+    )
+    print(f"\nSnapshot colunar salvo em: {caminho_arquivo}")
+
+    # Tabelas agregadas da versão: 'agregados_<snapshot_id>_<nome>.parquet'
+    arquivos_agregados = {}
+    for nome, tabela in (agregados or {}).items():
+        caminho_agregado = os.path.join(CAMINHO_SNAPSHOTS, f"agregados_{snapshot_id}_{nome}.parquet")
+        hash_agregado = gravar_atomicamente(
+            caminho_agregado, lambda caminho, tabela=tabela: tabela.to_parquet(caminho, index=False, engine='pyarrow')
+        )
+        arquivos_agregados[nome] = {
+            'arquivo': os.path.relpath(caminho_agregado, CAMINHO_DATA).replace(os.sep, '/'),
+            'hash_sha256': hash_agregado,
+            'linhas': int(len(tabela)),
+        }
+    if arquivos_agregados:
+        resumo = ', '.join(f"{nome} ({agregado['linhas']} linhas)" for nome, agregado in arquivos_agregados.items())
+        print(f"Tabelas agregadas salvas: {resumo}.")
+
+    data_extracao = df['Data_Extracao'].max() if 'Data_Extracao' in df.columns and not df.empty else None
+    manifesto = {
+        'snapshot_id': snapshot_id,
+        'arquivo': os.path.relpath(caminho_arquivo, CAMINHO_DATA).replace(os.sep, '/'),
+        'hash_sha256': hash_conteudo,
+        'linhas': int(len(df)),
+        'data_extracao': data_extracao.isoformat() if pd.notna(data_extracao) else None,
+        'publicado_em': agora.isoformat(),
+        # Resumo lido pelo /start sem precisar carregar a base
+        'linhas_por_seccional': (
+            {str(k): int(v) for k, v in df['Seccional'].value_counts().items() if v > 0}
+            if 'Seccional' in df.columns else {}
+        ),
+        'colunas': _estatisticas_colunas(df),
+        'agregados': arquivos_agregados,
+        # Modo da transformação e linhas inseridas/atualizadas/removidas em relação à versão anterior
+        'delta': delta,
+        # Linhas processadas nesta execução com células fora do contrato (tratadas como vazias), por coluna
+        'validacao': validacao,
+        # Hash do código da transformação; outra versão invalida o modo incremental
+        'versao_transformacao': versao_transformacao,
+    }
+
+    def _escrever_manifesto(caminho: str):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    gravar_atomicamente(CAMINHO_MANIFESTO, _escrever_manifesto)
+    print(f"Manifesto publicado: snapshot '{snapshot_id}' ({manifesto['linhas']} linhas).")
+
+    _remover_versoes_antigas(nome_arquivo)
+    return manifesto
@@ -1,6 +1,10 @@
 import pandas as pd
 import os
 import sys
+import csv
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 
 # --- Bloco de código para encontrar a pasta 'src' e permitir a execução autônoma ---
 try:
@@ -12,7 +16,10 @@ finally:
 
 # --- Imports ajustados para serem absolutos a partir de 'src' ---
 from etl.contracts import ContratoDadosBrutos, validar_dados
-from analysis import mappings
+from etl.conversao import converter_tipos
+from etl import publicacao, historico
+from analysis import mappings, agregados
+from analysis.utils import COLUNAS_DERIVADAS, adicionar_colunas_derivadas
 import numpy as np
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -24,43 +31,224 @@ CAMINHO_DATA = os.path.join(CAMINHO_RAIZ_PROJETO, "Data")
 CAMINHO_PROD_COI = os.path.join(CAMINHO_DATA, "prod_coi.csv")
 CAMINHO_PROD_FISC = os.path.join(CAMINHO_DATA, "prod_fisc.csv")
 
+# O snapshot colunar lido pelo bot é publicado por 'etl.publicacao' (versionado + manifesto).
+# O Excel é apenas uma exportação opcional para consulta humana.
+CAMINHO_EXPORTACAO_EXCEL = os.path.join(CAMINHO_DATA, "prod_gstc.xlsx")
+EXPORTAR_EXCEL = os.getenv("EXPORTAR_EXCEL", "").strip().lower() in ("1", "true", "sim")
 
-def processar_arquivo(caminho_arquivo: str, nome_arquivo: str) -> pd.DataFrame:
-    # ... (esta função continua a mesma)
+# Cada extração também é acrescentada ao histórico particionado por dia (ver etl.historico)
+GRAVAR_HISTORICO = os.getenv("GRAVAR_HISTORICO", "sim").strip().lower() not in ("0", "false", "nao", "não")
+
+# Colunas do export que compõem a base de produção (as demais nem são lidas do CSV)
+COLUNAS_PRODUCAO = [
+    "Recurso", "Data", "Status da Atividade", "Cidade", "Início", "Fim", "Duração", "Tempo de Deslocamento",
+    "Tipo de Atividade", "Ordem de Serviço", "Abrangência", "Tipo de Natureza - Text", "Tipo de Causa - Text",
+    "SubTipo de Causa - Text", "Tipo de Conclusão Executada", "Tipo de Conclusão",
+    "Tipo de Conclusão Não Executada", "Latitude", "Longitude", "Posição na Rota", "Status da Coordenada",
+    "Área de Deslocamento", "Data Limite", "Data Abertura", "Valor Total Contrato", "Valor", "Code",
+    "Número Ocorrência", "Número da Nota", "Número de Clientes Interrompidos", "Medidor Retirado",
+    "Medidor Instalado", "Observação", "Tipo de Indisponibilidade", "Instalação"
+]
+
+# Linhas lidas do CSV por vez; limita o pico de memória da ingestão
+TAMANHO_BLOCO_LEITURA = 200_000
+
+# Modo incremental: cada linha bruta é identificada por (Ordem de Serviço, ocorrência
+# da OS no arquivo) e resumida por um hash; só linhas novas ou alteradas são
+# revalidadas, convertidas e enriquecidas. Desligue com TRANSFORMACAO_INCREMENTAL=nao.
+TRANSFORMACAO_INCREMENTAL = os.getenv("TRANSFORMACAO_INCREMENTAL", "sim").strip().lower() not in ("0", "false", "nao", "não")
+CHAVE_INCREMENTAL = ["Ordem de Serviço", "Ocorrencia_OS"]
+
+# Colunas de controle gravadas no snapshot para o modo incremental (fora do Excel)
+COLUNAS_CONTROLE = ["Arquivo_Origem", "Linha_Origem", "Ocorrencia_OS", "Hash_Linha"]
+
+# No histórico ficam 'Arquivo_Origem' e 'Ocorrencia_OS', que com a OS identificam a linha
+# entre extrações (ver historico.CHAVE_VERSAO); a posição no arquivo e o hash do texto bruto saem
+COLUNAS_FORA_DO_HISTORICO = ["Linha_Origem", "Hash_Linha"]
+
+# Módulos cujo código define o resultado da transformação. Se algum mudar
+# (ex.: novo mapeamento de seccional), o snapshot anterior não serve de base
+# e a transformação volta a ser completa.
+MODULOS_DA_TRANSFORMACAO = [
+    os.path.join(CAMINHO_RAIZ_PROJETO, "src", "etl", nome)
+    for nome in ("contracts.py", "conversao.py", "transform.py")
+] + [os.path.join(CAMINHO_RAIZ_PROJETO, "src", "analysis", nome) for nome in ("mappings.py", "utils.py")]
+
+# Colunas de baixa cardinalidade gravadas como 'category' no snapshot
+COLUNAS_CATEGORICAS = [
+    "Recurso", "Status da Atividade", "Cidade", "Tipo de Atividade", "Abrangência",
+    "Tipo de Natureza - Text", "Tipo de Causa - Text", "SubTipo de Causa - Text",
+    "Tipo de Conclusão Executada", "Tipo de Conclusão", "Tipo de Conclusão Não Executada",
+    "Status da Coordenada", "Área de Deslocamento", "Tipo de Indisponibilidade",
+    "Processo", "Seccional", "Seccional_Equipe", "Anexo IV", "Arquivo_Origem"
+]
+
+
+def resolver_colunas_producao(caminho_arquivo: str) -> Dict[str, int]:
+    """
+    Lê apenas a linha de cabeçalho e devolve {coluna de produção: posição no
+    arquivo}. O export do SIGA traz 'Tipo de Atividade' duas vezes; a
+    primeira ocorrência é descartada e a segunda é a coluna de produção.
+    """
+    with open(caminho_arquivo, newline='', encoding='utf-8-sig') as f:
+        cabecalho = [col.strip() for col in next(csv.reader(f), [])]
+
+    posicoes = {}
+    for coluna in COLUNAS_PRODUCAO:
+        if coluna == "Tipo de Atividade":
+            encontradas = [i for i, col in enumerate(cabecalho) if coluna in col]
+            if len(encontradas) >= 2:
+                print("  - Coluna 'Tipo de Atividade' duplicada foi tratada.")
+            if encontradas:
+                posicoes[coluna] = encontradas[1] if len(encontradas) >= 2 else encontradas[0]
+        elif coluna in cabecalho:
+            posicoes[coluna] = cabecalho.index(coluna)
+    return posicoes
+
+
+def concatenar_partes(partes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena blocos/arquivos já convertidos mantendo as colunas 'category':
+    as categorias de cada parte são unidas antes do concat (que, com
+    categorias diferentes, cairia para 'object').
+    """
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_PRODUCAO)
+    # Partes vazias não têm tipos definidos e rebaixariam as colunas para 'object'
+    partes = [parte for parte in partes if not parte.empty] or partes[:1]
+    publicacao.unir_categorias(partes, COLUNAS_CATEGORICAS)
+    return pd.concat(partes, ignore_index=True)
+
+
+def calcular_chave_linha(ordens: pd.Series, ocorrencia) -> np.ndarray:
+    """
+    Chave uint64 de (Ordem de Serviço, ocorrência da OS no arquivo): o hash
+    da OS deslocado pela ocorrência. Comparar inteiros evita indexar e
+    ordenar as OSs como texto a cada execução.
+    """
+    hash_os = pd.util.hash_array(np.asarray(ordens, dtype=object))
+    return hash_os + np.asarray(ocorrencia, dtype='uint64') * np.uint64(0x9E3779B97F4A7C15)
+
+
+def calcular_versao_transformacao() -> str:
+    """Hash do código que define a transformação (ver MODULOS_DA_TRANSFORMACAO)."""
+    sha = hashlib.sha256()
+    for caminho in MODULOS_DA_TRANSFORMACAO:
+        with open(caminho, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def ingerir_arquivo(caminho_arquivo: str, nome_arquivo: str,
+                    hashes_anteriores: Optional[pd.DataFrame] = None,
+                    tamanho_bloco: int = TAMANHO_BLOCO_LEITURA) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+    """
+    Ingestão em blocos: só as colunas de produção são lidas do CSV, as
+    equipes '-H0' são descartadas ainda no texto bruto e cada linha recebe
+    sua chave (OS + ocorrência) e o hash do conteúdo bruto.
+
+    Com 'hashes_anteriores' (chave + 'Hash_Linha' do snapshot anterior), só
+    as linhas novas ou alteradas seguem para validação e conversão; as
+    demais são devolvidas apenas como posição em 'hashes_anteriores' +
+    'Linha_Origem', para serem reaproveitadas do snapshot anterior.
+    Linhas com células fora do contrato seguem adiante (a conversão trata
+    essas células como vazias) e são contadas em 'contadores'.
+    Retorna (linhas processadas, linhas mantidas, contadores).
+    """
     print(f"\n--- Processando arquivo: {nome_arquivo} ---")
-    df_bruto = pd.read_csv(caminho_arquivo, dtype=str).fillna('')
-    print(f"Arquivo lido com {df_bruto.shape[0]} linhas e {df_bruto.shape[1]} colunas.")
-    validar_dados(df_bruto, ContratoDadosBrutos, nome_arquivo)
-    print("\nTratando colunas duplicadas e selecionando colunas de produção...")
-    coluna_alvo_texto = "Tipo de Atividade"
-    lista_colunas = df_bruto.columns.to_list()
-    indices_encontrados = [i for i, col in enumerate(lista_colunas) if coluna_alvo_texto in col]
-    if len(indices_encontrados) >= 2:
-        idx_primeira = indices_encontrados[0]
-        idx_segunda = indices_encontrados[1]
-        lista_colunas[idx_primeira] = "Tipo de Atividade_DESCARTAR"
-        lista_colunas[idx_segunda] = "Tipo de Atividade"
-        df_bruto.columns = lista_colunas
-        print("  - Coluna 'Tipo de Atividade' duplicada foi tratada.")
-    colunas_producao = [
-        "Recurso", "Data", "Status da Atividade", "Cidade", "Início", "Fim", "Duração", "Tempo de Deslocamento",
-        "Tipo de Atividade", "Ordem de Serviço", "Abrangência", "Tipo de Natureza - Text", "Tipo de Causa - Text",
-        "SubTipo de Causa - Text", "Tipo de Conclusão Executada", "Tipo de Conclusão",
-        "Tipo de Conclusão Não Executada", "Latitude", "Longitude", "Posição na Rota", "Status da Coordenada",
-        "Área de Deslocamento", "Data Limite", "Data Abertura", "Valor Total Contrato", "Valor", "Code",
-        "Número Ocorrência", "Número da Nota", "Número de Clientes Interrompidos", "Medidor Retirado",
-        "Medidor Instalado", "Observação", "Tipo de Indisponibilidade", "Instalação"
-    ]
-    df_producao = df_bruto[colunas_producao].copy()
-    print("Convertendo tipos de dados...")
-    formato_completo = '%d/%m/%Y %H:%M:%S'
-    formato_ano_curto = '%d/%m/%y'
-    for col in ['Data Limite', 'Data Abertura']:
-        df_producao[col] = pd.to_datetime(df_producao[col], format=formato_completo, errors='coerce')
-    df_producao['Data'] = pd.to_datetime(df_producao['Data'], format=formato_ano_curto, errors='coerce')
-    df_producao['Início'] = pd.to_datetime(df_producao['Data'].dt.strftime('%Y-%m-%d') + ' ' + df_producao['Início'].astype(str).str.strip(), errors='coerce')
-    df_producao['Fim'] = pd.to_datetime(df_producao['Data'].dt.strftime('%Y-%m-%d') + ' ' + df_producao['Fim'].astype(str).str.strip(), errors='coerce')
+    posicoes = resolver_colunas_producao(caminho_arquivo)
+    colunas_lidas = sorted(posicoes, key=posicoes.get)  # read_csv devolve na ordem do arquivo
+    colunas_producao = [col for col in COLUNAS_PRODUCAO if col in posicoes]
+    if len(colunas_producao) < len(COLUNAS_PRODUCAO):
+        # Sem as colunas do contrato não há chave nem conversão: falha já no cabeçalho
+        validar_dados(pd.DataFrame(columns=colunas_producao), ContratoDadosBrutos, nome_arquivo)
+
+    indice_anterior, hash_anterior = None, None
+    if hashes_anteriores is not None:
+        indice_anterior = pd.Index(calcular_chave_linha(hashes_anteriores['Ordem de Serviço'], hashes_anteriores['Ocorrencia_OS']))
+        hash_anterior = hashes_anteriores['Hash_Linha'].to_numpy(dtype='uint64')
+
+    leitor = pd.read_csv(
+        caminho_arquivo, dtype=str, header=0, encoding='utf-8-sig',
+        usecols=[posicoes[col] for col in colunas_lidas], chunksize=tamanho_bloco
+    )
+
+    partes, mantidas = [], []
+    ocorrencias_por_os = pd.Series(dtype='int64', index=pd.Index([], dtype='uint64'))
+    contadores = {'lidas': 0, 'moto': 0, 'inseridas': 0, 'atualizadas': 0, 'mantidas': 0, 'removidas': 0,
+                  'linhas_com_problemas': 0, 'problemas_por_coluna': {}}
+    for numero_bloco, bloco in enumerate(leitor, start=1):
+        # O índice continua entre blocos, então os erros citam a linha real do arquivo
+        bloco.columns = colunas_lidas
+        bloco = bloco[colunas_producao]
+        contadores['lidas'] += len(bloco)
+
+        moto = bloco['Recurso'].str.contains('-H0', regex=False, na=False)
+        contadores['moto'] += int(moto.sum())
+        bloco = bloco[~moto]
+
+        # Chave: a OS pode se repetir no arquivo, então entra a ordem da ocorrência (contínua entre blocos)
+        hash_os = pd.Series(pd.util.hash_array(bloco['Ordem de Serviço'].to_numpy(dtype=object)), index=bloco.index)
+        ocorrencia = (hash_os.groupby(hash_os, sort=False).cumcount()
+                      + hash_os.map(ocorrencias_por_os).fillna(0).astype('int64'))
+        ocorrencias_por_os = pd.concat([ocorrencias_por_os, hash_os.value_counts()]).groupby(level=0, sort=False).sum()
+        hash_linha = pd.util.hash_pandas_object(bloco, index=False).to_numpy()
+
+        if indice_anterior is None:
+            alterada = np.ones(len(bloco), dtype=bool)
+            contadores['inseridas'] += len(bloco)
+        else:
+            posicao = indice_anterior.get_indexer(calcular_chave_linha(bloco['Ordem de Serviço'], ocorrencia))
+            existia = posicao >= 0
+            igual = existia & (hash_anterior[np.where(existia, posicao, 0)] == hash_linha)
+            alterada = ~igual
+            contadores['inseridas'] += int((~existia).sum())
+            contadores['atualizadas'] += int((existia & ~igual).sum())
+            contadores['mantidas'] += int(igual.sum())
+            mantidas.append(pd.DataFrame({
+                'Posicao_Anterior': posicao[igual],
+                'Linha_Origem': bloco.index[igual] + 2,
+            }))
+
+        # Células vazias viram '' só nas linhas que seguem adiante (o hash aceita NaN)
+        bloco = bloco[alterada].fillna('')
+        if bloco.empty:
+            continue
+        validacao = validar_dados(bloco, ContratoDadosBrutos, f"{nome_arquivo} (bloco {numero_bloco})")
+        contadores['linhas_com_problemas'] += validacao['linhas_com_problemas']
+        for col, quantidade in validacao['problemas_por_coluna'].items():
+            contadores['problemas_por_coluna'][col] = contadores['problemas_por_coluna'].get(col, 0) + quantidade
+        convertido = converter_tipos(bloco, ContratoDadosBrutos)
+        convertido['Arquivo_Origem'] = nome_arquivo
+        convertido['Linha_Origem'] = bloco.index + 2
+        convertido['Ocorrencia_OS'] = ocorrencia[alterada].to_numpy()
+        convertido['Hash_Linha'] = hash_linha[alterada]
+        partes.append(converter_colunas_categoricas(convertido))
+
+    if hashes_anteriores is not None:
+        contadores['removidas'] = len(hashes_anteriores) - contadores['atualizadas'] - contadores['mantidas']
+
+    df_processado = concatenar_partes(partes)
+    linhas_mantidas = (pd.concat(mantidas, ignore_index=True) if mantidas
+                       else pd.DataFrame({'Posicao_Anterior': [], 'Linha_Origem': []}, dtype='int64'))
+    print(f"Arquivo lido com {contadores['lidas']} linhas ({contadores['moto']} de equipes '-H0' descartadas); "
+          f"{len(df_processado)} processadas e {contadores['mantidas']} reaproveitadas do snapshot anterior.")
+    if contadores['linhas_com_problemas']:
+        print(f"  - {contadores['linhas_com_problemas']} linha(s) com células fora do contrato: "
+              f"{contadores['problemas_por_coluna']}")
     print("Limpeza e conversão de tipos concluída.")
+    return df_processado, linhas_mantidas, contadores
+
+
+def processar_arquivo(caminho_arquivo: str, nome_arquivo: str,
+                      tamanho_bloco: int = TAMANHO_BLOCO_LEITURA) -> pd.DataFrame:
+    """
+    Ingestão completa de um arquivo (ver 'ingerir_arquivo'): cada bloco de
+    'tamanho_bloco' linhas é validado, convertido para os tipos do contrato
+    e compactado (colunas 'category') antes do próximo ser lido, então o
+    pico de memória não cresce com o tamanho do export.
+    """
+    df_producao, _, _ = ingerir_arquivo(caminho_arquivo, nome_arquivo, tamanho_bloco=tamanho_bloco)
     return df_producao
 
 
@@ -104,59 +292,222 @@ def definir_anexo_iv(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def run_transformation():
+def definir_colunas_derivadas(df: pd.DataFrame) -> pd.DataFrame:
+    """Cria as colunas derivadas usadas pela análise (ver 'analysis.utils.adicionar_colunas_derivadas')."""
+    print("\nAdicionando as colunas derivadas de status, chaves de filtro e indicadores...")
+    df = adicionar_colunas_derivadas(df)
+    print(f"  ✅ Colunas {', '.join(COLUNAS_DERIVADAS)} criadas com sucesso.")
+    return df
+
+
+def converter_colunas_categoricas(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas de baixa cardinalidade para 'category' antes da gravação."""
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def publicar_snapshot(df: pd.DataFrame, exportar_excel: bool = False, delta: Optional[dict] = None,
+                      versao_transformacao: Optional[str] = None, validacao: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Publica o snapshot colunar (Parquet versionado + manifesto) consumido
+    pelo bot com suas tabelas agregadas, acrescenta a extração ao histórico (Data/historico) e,
+    opcionalmente, gera a exportação em Excel para consulta humana.
+    """
+    df = converter_colunas_categoricas(df.reset_index(drop=True))
+
+    # Contagens usadas pelos resumos do bot, calculadas uma vez por snapshot
+    tabelas_agregadas = {nome: construtor(df) for nome, construtor in agregados.AGREGADOS.items()}
+    manifesto = publicacao.publicar_snapshot_versionado(
+        df, delta=delta, versao_transformacao=versao_transformacao, agregados=tabelas_agregadas,
+        validacao=validacao
+    )
+
+    # Toda extração também entra no histórico particionado por dia; dias já
+    # encerrados que receberam a extração são compactados em um único arquivo por dia.
+    # O snapshot já está publicado: uma falha no histórico é só registrada.
+    if GRAVAR_HISTORICO:
+        try:
+            particoes = historico.gravar_extracao(df.drop(columns=COLUNAS_FORA_DO_HISTORICO, errors='ignore'),
+                                                  manifesto['snapshot_id'])
+            historico.compactar_dias_fechados(particoes)
+        except Exception as e:
+            print(f"[AVISO] Falha ao atualizar o histórico (o snapshot '{manifesto['snapshot_id']}' foi publicado): {e}")
+
+    if exportar_excel:
+        df_excel = df.drop(columns=COLUNAS_CONTROLE + COLUNAS_DERIVADAS, errors='ignore')
+        publicacao.gravar_atomicamente(CAMINHO_EXPORTACAO_EXCEL, lambda caminho: df_excel.to_excel(caminho, index=False))
+        print(f"Exportação Excel salva em: {CAMINHO_EXPORTACAO_EXCEL}")
+
+    return df
+
+
+def transformar_arquivo(caminho_arquivo: str, nome_arquivo: str,
+                        hashes_anteriores: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+    """
+    Etapa por arquivo, executada em um processo do pool: ingestão (exclusão
+    das equipes '-H0', validação e conversão de tipos) e enriquecimento das
+    linhas novas ou alteradas. Nada aqui depende dos outros arquivos, então
+    cada export roda em paralelo.
+    """
+    df, linhas_mantidas, contadores = ingerir_arquivo(caminho_arquivo, nome_arquivo, hashes_anteriores)
+
+    # --- CHAMADA DAS FUNÇÕES DE ENRIQUECIMENTO ---
+    df = definir_processo(df)
+    df = definir_seccional(df)
+    df = definir_seccional_equipe(df)
+    df = definir_anexo_iv(df)
+    df = definir_colunas_derivadas(df)
+
+    # Categorias reduzem o volume devolvido ao processo principal (pickle)
+    return converter_colunas_categoricas(df), linhas_mantidas, contadores
+
+
+def transformar_em_paralelo(caminhos_arquivos: List[str],
+                            hashes_por_arquivo: Optional[Dict[str, pd.DataFrame]] = None) -> list:
+    """
+    Roda 'transformar_arquivo' em um pool de processos, um por arquivo de
+    origem. Os resultados voltam na ordem de 'caminhos_arquivos'; a falha de
+    qualquer arquivo interrompe a transformação.
     """
-    Executa a validação e transformação para ambos os arquivos e os concatena.
+    hashes_por_arquivo = hashes_por_arquivo or {}
+    argumentos = [
+        (caminho, os.path.basename(caminho), hashes_por_arquivo.get(os.path.basename(caminho)))
+        for caminho in caminhos_arquivos
+    ]
+    if len(argumentos) == 1:
+        return [transformar_arquivo(*argumentos[0])]
+
+    processos = min(len(argumentos), os.cpu_count() or 1)
+    print(f"\nTransformando {len(argumentos)} arquivo(s) em {processos} processo(s) paralelos...")
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(transformar_arquivo, *args) for args in argumentos]
+        return [futuro.result() for futuro in futuros]
+
+
+def carregar_base_incremental(versao_transformacao: str) -> Optional[pd.DataFrame]:
+    """
+    Snapshot vigente, se puder servir de base para o modo incremental: precisa
+    ter as colunas de controle e ter sido gerado pela mesma versão do código
+    da transformação. Caso contrário, retorna None (transformação completa).
     """
+    manifesto = publicacao.ler_manifesto()
+    if manifesto is None:
+        print("\n[INCREMENTAL] Nenhum snapshot anterior; transformação completa.")
+        return None
+    if manifesto.get('versao_transformacao') != versao_transformacao:
+        print("\n[INCREMENTAL] Código da transformação mudou desde o último snapshot; transformação completa.")
+        return None
+    anterior = publicacao.carregar_snapshot(manifesto)
+    if anterior is None or not set(COLUNAS_CONTROLE).issubset(anterior.columns):
+        print("\n[INCREMENTAL] Snapshot anterior sem colunas de controle; transformação completa.")
+        return None
+    print(f"\n[INCREMENTAL] Base: snapshot '{manifesto['snapshot_id']}' ({len(anterior)} linhas).")
+    return anterior
+
+
+def mesclar_com_anterior(hashes_anteriores: Optional[pd.DataFrame], anterior: Optional[pd.DataFrame],
+                         df_processado: pd.DataFrame, linhas_mantidas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Junta as linhas inalteradas (lidas do snapshot anterior pela posição) com
+    as processadas nesta execução, na ordem das linhas do arquivo atual.
+    """
+    if anterior is None or linhas_mantidas.empty:
+        return df_processado
+    # 'hashes_anteriores' mantém o índice do snapshot anterior: posição -> rótulo da linha
+    rotulos = hashes_anteriores.index[linhas_mantidas['Posicao_Anterior'].to_numpy()]
+    reaproveitadas = anterior.loc[rotulos].drop(columns=['Data_Extracao'], errors='ignore').reset_index(drop=True)
+    reaproveitadas['Linha_Origem'] = linhas_mantidas['Linha_Origem'].to_numpy()
+    df = concatenar_partes([reaproveitadas, df_processado])
+    return df.sort_values('Linha_Origem', kind='stable', ignore_index=True)
+
+
+def run_transformation(exportar_excel: bool = EXPORTAR_EXCEL, arquivos_fonte: Optional[List[Tuple[str, bool]]] = None,
+                       incremental: bool = TRANSFORMACAO_INCREMENTAL):
+    """
+    Executa a validação, transformação e enriquecimento de cada arquivo de
+    origem em paralelo (um processo por arquivo); só a concatenação e a
+    publicação rodam em série. 'arquivos_fonte' é uma lista de
+    (caminho, obrigatório); o padrão é prod_coi.csv (obrigatório) e
+    prod_fisc.csv (opcional).
+
+    No modo incremental, o snapshot vigente é a base: só linhas novas ou
+    alteradas (pelo hash do texto bruto) são reprocessadas, e o manifesto
+    registra quantas linhas foram inseridas, atualizadas e removidas.
+    O resultado é publicado como snapshot Parquet; o Excel é apenas opcional.
+    """
+    if arquivos_fonte is None:
+        arquivos_fonte = [(CAMINHO_PROD_COI, True), (CAMINHO_PROD_FISC, False)]
+
     try:
-        if not os.path.exists(CAMINHO_PROD_COI):
-            print(f"❌ ERRO CRÍTICO: O arquivo principal {os.path.basename(CAMINHO_PROD_COI)} não foi encontrado.")
+        caminhos_arquivos = []
+        for caminho, obrigatorio in arquivos_fonte:
+            if os.path.exists(caminho):
+                caminhos_arquivos.append(caminho)
+            elif obrigatorio:
+                print(f"❌ ERRO CRÍTICO: O arquivo principal {os.path.basename(caminho)} não foi encontrado.")
+                return pd.DataFrame()
+            else:
+                print(f"\n[AVISO] O arquivo {os.path.basename(caminho)} não foi encontrado.")
+        if not caminhos_arquivos:
+            print("❌ ERRO CRÍTICO: Nenhum arquivo de origem foi encontrado.")
             return pd.DataFrame()
-        
-        df_coi = processar_arquivo(CAMINHO_PROD_COI, "prod_coi.csv")
-        lista_de_dataframes = [df_coi]
 
-        if os.path.exists(CAMINHO_PROD_FISC):
-            df_fisc = processar_arquivo(CAMINHO_PROD_FISC, "prod_fisc.csv")
-            lista_de_dataframes.append(df_fisc)
-        else:
-            print(f"\n[AVISO] O arquivo {os.path.basename(CAMINHO_PROD_FISC)} não foi encontrado.")
+        versao_transformacao = calcular_versao_transformacao()
+        anterior = carregar_base_incremental(versao_transformacao) if incremental else None
+        hashes_por_arquivo = None
+        if anterior is not None:
+            colunas_hash = CHAVE_INCREMENTAL + ['Hash_Linha']
+            hashes_por_arquivo = {
+                str(nome): grupo[colunas_hash]
+                for nome, grupo in anterior.groupby('Arquivo_Origem', observed=True)
+            }
+            # Arquivos sem linhas no snapshot anterior são processados por inteiro
+            hashes_por_arquivo.update({
+                os.path.basename(caminho): anterior[colunas_hash].iloc[:0]
+                for caminho in caminhos_arquivos if os.path.basename(caminho) not in hashes_por_arquivo
+            })
+
+        resultados = transformar_em_paralelo(caminhos_arquivos, hashes_por_arquivo)
 
         print("\nConcatenando os dataframes de produção...")
-        prod_gstc_df = pd.concat(lista_de_dataframes, ignore_index=True)
-        print(f"DataFrame antes da exclusão final: {prod_gstc_df.shape[0]} linhas.")
-
-        linhas_antes = len(prod_gstc_df)
-        prod_gstc_df = prod_gstc_df[~prod_gstc_df['Recurso'].str.contains('-H0', na=False)]
-        linhas_depois = len(prod_gstc_df)
-        print(f"\nExcluindo equipes de 'CORTE MOTO' (Recurso com '-H0')...")
-        print(f"  - {linhas_antes - linhas_depois} linhas foram removidas.")
-        
+        delta = {'modo': 'incremental' if anterior is not None else 'completo',
+                 'inseridas': 0, 'atualizadas': 0, 'removidas': 0}
+        validacao = {'linhas_com_problemas': 0, 'problemas_por_coluna': {}}
+        lista_de_dataframes = []
+        for caminho, (df_processado, linhas_mantidas, contadores) in zip(caminhos_arquivos, resultados):
+            hashes_anteriores = (hashes_por_arquivo or {}).get(os.path.basename(caminho))
+            lista_de_dataframes.append(mesclar_com_anterior(hashes_anteriores, anterior, df_processado, linhas_mantidas))
+            for chave in ('inseridas', 'atualizadas', 'removidas'):
+                delta[chave] += contadores[chave]
+            validacao['linhas_com_problemas'] += contadores['linhas_com_problemas']
+            for col, quantidade in contadores['problemas_por_coluna'].items():
+                validacao['problemas_por_coluna'][col] = validacao['problemas_por_coluna'].get(col, 0) + quantidade
+        if anterior is not None:
+            # Linhas de arquivos que deixaram de ser exportados também saem do snapshot
+            nomes_atuais = {os.path.basename(caminho) for caminho in caminhos_arquivos}
+            delta['removidas'] += int((~anterior['Arquivo_Origem'].astype(str).isin(nomes_atuais)).sum())
+        del anterior
+
+        prod_gstc_df = concatenar_partes(lista_de_dataframes)
         print(f"DataFrame final criado com {prod_gstc_df.shape[0]} linhas e {prod_gstc_df.shape[1]} colunas.")
+        print(f"  - Alterações ({delta['modo']}): {delta['inseridas']} inseridas, "
+              f"{delta['atualizadas']} atualizadas, {delta['removidas']} removidas.")
 
         fuso_horario_brasil = ZoneInfo("America/Sao_Paulo")
         agora_brasil = datetime.now(fuso_horario_brasil)
         print(f"\nData e hora da execução (Fuso de São Paulo): {agora_brasil.strftime('%d/%m/%Y %H:%M:%S')}")
-        
+
         prod_gstc_df['Data_Extracao'] = agora_brasil
         print("  - Coluna 'Data_Extracao' adicionada ao DataFrame.")
 
-        # --- CHAMADA DAS FUNÇÕES DE ENRIQUECIMENTO ---
-        prod_gstc_df = definir_processo(prod_gstc_df)
-        prod_gstc_df = definir_seccional(prod_gstc_df)
-        prod_gstc_df = definir_seccional_equipe(prod_gstc_df) # <-- NOVA FUNÇÃO CHAMADA AQUI
-        prod_gstc_df = definir_anexo_iv(prod_gstc_df)
-
-        print("\nVerificando se alguma coluna está 100% vazia no DataFrame final...")
-        # ... (código de verificação de colunas vazias)
-        
-        print("\nPreparando colunas de data/hora para exportação para Excel...")
+        print("\nPreparando colunas de data/hora para o snapshot...")
         prod_gstc_df['Data_Extracao'] = prod_gstc_df['Data_Extracao'].dt.tz_localize(None)
         print("  - Fuso horário removido da coluna 'Data_Extracao'.")
-        
-        caminho_saida = os.path.join(CAMINHO_DATA, "prod_gstc.xlsx")
-        prod_gstc_df.to_excel(caminho_saida, index=False)
-        print(f"\nArquivo final salvo em: {caminho_saida}")
+
+        prod_gstc_df = publicar_snapshot(prod_gstc_df, exportar_excel=exportar_excel, delta=delta,
+                                         versao_transformacao=versao_transformacao, validacao=validacao)
 
         return prod_gstc_df
 
@@ -0,0 +1,32 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from etl.contracts import ContratoDadosBrutos, regras_do_contrato, validar_dados
+
+
+def _bloco_valido(linhas: int = 3) -> pd.DataFrame:
+    valores = {col: '' for col in regras_do_contrato(ContratoDadosBrutos)}
+    valores.update({'Recurso': 'EQUIPE-01', 'Status da Atividade': 'Concluído',
+                    'Data': '31/01/25', 'Início': '08:00', 'Latitude': '-30,05'})
+    return pd.DataFrame([valores] * linhas)
+
+
+def test_celulas_invalidas_sao_contadas_sem_falhar():
+    bloco = _bloco_valido()
+    bloco.loc[0, 'Latitude'] = '200'
+    bloco.loc[0, 'Data'] = 'lixo'
+    bloco.loc[2, 'Recurso'] = ''
+
+    resultado = validar_dados(bloco, ContratoDadosBrutos, "teste.csv")
+
+    assert resultado == {'linhas_com_problemas': 2,
+                         'problemas_por_coluna': {'Recurso': 1, 'Data': 1, 'Latitude': 1}}
+
+
+def test_coluna_ausente_falha():
+    with pytest.raises(ValueError):
+        validar_dados(_bloco_valido().drop(columns=['Latitude']), ContratoDadosBrutos, "teste.csv")
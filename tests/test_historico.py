@@ -0,0 +1,49 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from etl import historico
+
+
+def _extracao(data_extracao: str, status_por_os: dict) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Arquivo_Origem': 'prod_coi.csv',
+        'Ordem de Serviço': list(status_por_os),
+        'Ocorrencia_OS': 0,
+        'Data': pd.Timestamp('2025-01-31'),
+        'Status da Atividade': pd.Categorical(list(status_por_os.values())),
+        'Data_Extracao': pd.Timestamp(data_extracao),
+    })
+
+
+def test_compactacao_guarda_cada_versao_uma_vez(tmp_path, monkeypatch):
+    monkeypatch.setattr(historico, 'CAMINHO_HISTORICO', str(tmp_path))
+    extracoes = [
+        ('20250131T080000000000', _extracao('2025-01-31 08:00', {'OS1': 'Pendente', 'OS2': 'Pendente'})),
+        ('20250131T120000000000', _extracao('2025-01-31 12:00', {'OS1': 'Concluído', 'OS2': 'Pendente'})),
+        ('20250131T180000000000', _extracao('2025-01-31 18:00', {'OS1': 'Pendente', 'OS2': 'Pendente'})),
+    ]
+    for snapshot_id, df in extracoes:
+        particoes = historico.gravar_extracao(df, snapshot_id)
+
+    assert historico.compactar_dias_fechados(particoes) == 1
+
+    arquivos = historico.arquivos_vigentes(particoes[0])
+    assert [os.path.basename(a) for a in arquivos] == ['compactado_20250131T180000000000.parquet']
+    compactado = pd.read_parquet(arquivos[0])
+    versoes = compactado.groupby('Ordem de Serviço')['Status da Atividade'].apply(list).to_dict()
+    # OS2 nunca mudou; OS1 voltou a 'Pendente' depois de 'Concluído', então a volta é uma nova versão
+    assert versoes == {'OS1': ['Pendente', 'Concluído', 'Pendente'], 'OS2': ['Pendente']}
+
+
+def test_dia_corrente_nao_e_compactado(tmp_path, monkeypatch):
+    monkeypatch.setattr(historico, 'CAMINHO_HISTORICO', str(tmp_path))
+    hoje = pd.Timestamp.now(tz='America/Sao_Paulo').normalize().tz_localize(None)
+    for snapshot_id in ('20250131T080000000000', '20250131T120000000000'):
+        df = _extracao('2025-01-31 08:00', {'OS1': 'Pendente'}).assign(Data=hoje)
+        particoes = historico.gravar_extracao(df, snapshot_id)
+
+    assert historico.compactar_dias_fechados(particoes) == 0
+    assert len(historico.arquivos_vigentes(particoes[0])) == 2
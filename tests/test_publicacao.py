@@ -0,0 +1,45 @@
+import os
+import sys
+import stat
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from etl.publicacao import gravar_atomicamente
+
+
+def _escrever_texto(conteudo: str):
+    def _escrever(caminho: str):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+    return _escrever
+
+
+def _modo(caminho) -> int:
+    return stat.S_IMODE(os.stat(caminho).st_mode)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="permissões POSIX")
+def test_arquivo_novo_segue_a_umask(tmp_path):
+    umask_original = os.umask(0o022)
+    try:
+        destino = tmp_path / "prod_gstc.manifest.json"
+        gravar_atomicamente(str(destino), _escrever_texto("{}"))
+    finally:
+        os.umask(umask_original)
+
+    assert _modo(destino) == 0o644
+    assert destino.read_text(encoding='utf-8') == "{}"
+    assert not [nome for nome in os.listdir(tmp_path) if nome.startswith('.tmp_')]
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="permissões POSIX")
+def test_substituicao_mantem_as_permissoes_do_arquivo_anterior(tmp_path):
+    destino = tmp_path / "snapshot.parquet"
+    destino.write_text("versão anterior", encoding='utf-8')
+    os.chmod(destino, 0o640)
+
+    gravar_atomicamente(str(destino), _escrever_texto("versão nova"))
+
+    assert _modo(destino) == 0o640
+    assert destino.read_text(encoding='utf-8') == "versão nova"